@@ -9,6 +9,7 @@ from app.core.config import settings
 from app.models.models import User
 from app.models.schemas import UserCreate, UserResponse, Token, UserLogin
 from app.core.deps import get_current_active_user
+from app.services.metrics_service import record_event
 
 router = APIRouter()
 
@@ -46,6 +47,9 @@ async def register(
     db.commit()
     db.refresh(db_user)
     
+    # 增量更新统计汇总
+    record_event("new_users")
+    
     return db_user
 
 
@@ -1,25 +1,33 @@
-from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status
+from typing import List, Literal, Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response, status
+from sqlalchemy import and_, or_
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
+from app.core.concurrency import check_version, commit_versioned, entity_etag, entity_state, version_conflict
 from app.core.database import get_db
-from app.core.deps import get_current_active_user, verify_project_access
-from app.models.models import User, Project, List, Card, CardLabel, CardAssignment
-from app.models.schemas import CardCreate, CardResponse, CardUpdate, CardMoveRequest, CardLabelCreate, CardLabelResponse, CardAssignmentCreate, CardAssignmentResponse
+from app.core.deps import get_current_active_user, get_read_db, verify_project_access
+from app.models.models import User, Project, ProjectMember, List, Card, CardLabel, CardAssignment
+from app.models.schemas import CardQueryResponse, CardCreate, CardResponse, CardUpdate, CardMoveRequest, CardLabelCreate, CardLabelResponse, CardAssignmentCreate, CardAssignmentResponse, CardUpdateMessage
+from app.api.v1.websocket.manager import publish_change
 from app.core.redis import cache
+from app.core.http_cache import cached_json_response
+from app.core.serialization import dumps, nested_row, user_columns
 from app.services.activity_service import log_activity
-from datetime import datetime
-import json
+from app.services.version_service import project_etag
+from app.utils.pagination import encode_cursor, decode_cursor
+from datetime import date, datetime
 
 router = APIRouter()
 
 
-@router.get("/", response_model=List[CardResponse])
+@router.get("/", response_model=list[CardResponse])
 async def get_cards(
     list_id: int,
+    if_none_match: Optional[str] = Header(None),
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
-    """获取列表的卡片"""
+    """获取列表的卡片（支持 ETag/If-None-Match）"""
     # 验证列表存在和访问权限
     lst = db.query(List).filter(List.id == list_id).first()
     if not lst:
@@ -30,36 +38,142 @@ async def get_cards(
     
     verify_project_access(lst.project_id, current_user, db)
     
-    # 尝试从缓存获取
-    cache_key = f"cards:list:{list_id}"
-    cached_cards = cache.get(cache_key)
-    
-    if cached_cards:
-        return json.loads(cached_cards)
-    
-    # 从数据库获取
-    cards = db.query(Card).filter(Card.list_id == list_id).order_by(Card.position).all()
-    
-    # 缓存结果
-    cards_data = []
-    for card in cards:
-        card_dict = {
+    def build() -> bytes:
+        # 从数据库按列获取卡片、标签和分配
+        cards_data = [
+            dict(row._mapping, labels=[], assignments=[])
+            for row in db.query(
+                Card.id,
+                Card.title,
+                Card.description,
+                Card.position,
+                Card.due_date,
+                Card.list_id,
+                Card.version_id,
+                Card.created_at,
+                Card.updated_at
+            ).filter(Card.list_id == list_id).order_by(Card.position)
+        ]
+        cards_by_id = {card["id"]: card for card in cards_data}
+        
+        if cards_by_id:
+            for row in db.query(CardLabel.id, CardLabel.card_id, CardLabel.label, CardLabel.color).filter(
+                CardLabel.card_id.in_(cards_by_id)
+            ):
+                cards_by_id[row.card_id]["labels"].append(dict(row._mapping))
+            
+            for row in db.query(
+                CardAssignment.id,
+                CardAssignment.card_id,
+                CardAssignment.user_id,
+                CardAssignment.assigned_at,
+                *user_columns(User, "user")
+            ).join(User, User.id == CardAssignment.user_id).filter(CardAssignment.card_id.in_(cards_by_id)):
+                cards_by_id[row.card_id]["assignments"].append(nested_row(row))
+        return dumps(cards_data)
+    
+    return cached_json_response(
+        f"cards:list:{list_id}",
+        build,
+        if_none_match=if_none_match,
+        etag=project_etag(lst.project_id),
+        ttl=300,  # 5分钟缓存
+        replica_etag=lambda: project_etag(lst.project_id, db)
+    )
+
+
+@router.get("/query", response_model=CardQueryResponse)
+async def query_cards(
+    assignee_id: Optional[int] = None,
+    label: Optional[str] = Query(None, max_length=50),
+    due_from: Optional[date] = None,
+    due_to: Optional[date] = None,
+    project_id: Optional[int] = None,
+    updated_since: Optional[datetime] = None,
+    sort: Literal["updated", "due"] = "updated",
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=200),
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """按负责人、标签、截止日期范围、项目和更新时间查询卡片（键集分页）
+
+    sort=updated 按 (updated_at, id) 倒序，sort=due 按 (due_date, id) 正序且只返回有截止日期的卡片。
+    不指定项目时在用户拥有或参与的所有项目中查询，例如 assignee_id=自己 即"我的任务"。
+    """
+    query = db.query(Card, List.project_id).join(List, List.id == Card.list_id)
+    
+    if project_id is not None:
+        verify_project_access(project_id, current_user, db)
+        query = query.filter(List.project_id == project_id)
+    else:
+        owned = db.query(Project.id).filter(Project.owner_id == current_user.id)
+        joined = db.query(ProjectMember.project_id).filter(ProjectMember.user_id == current_user.id)
+        query = query.filter(List.project_id.in_(owned.union(joined)))
+    
+    # 负责人和标签用 EXISTS，分别走 (user_id, card_id) 和 (label, card_id) 索引
+    if assignee_id is not None:
+        query = query.filter(
+            db.query(CardAssignment.id).filter(
+                CardAssignment.user_id == assignee_id,
+                CardAssignment.card_id == Card.id
+            ).exists()
+        )
+    if label:
+        query = query.filter(
+            db.query(CardLabel.id).filter(
+                CardLabel.label == label,
+                CardLabel.card_id == Card.id
+            ).exists()
+        )
+    if due_from is not None:
+        query = query.filter(Card.due_date >= due_from)
+    if due_to is not None:
+        query = query.filter(Card.due_date <= due_to)
+    if updated_since is not None:
+        query = query.filter(Card.updated_at >= updated_since)
+    
+    if sort == "due":
+        after = decode_cursor(cursor, (date, int))
+        query = query.filter(Card.due_date.isnot(None))
+        if after:
+            query = query.filter(or_(
+                Card.due_date > after[0],
+                and_(Card.due_date == after[0], Card.id > after[1])
+            ))
+        query = query.order_by(Card.due_date, Card.id)
+    else:
+        after = decode_cursor(cursor, (datetime, int))
+        if after:
+            query = query.filter(or_(
+                Card.updated_at < after[0],
+                and_(Card.updated_at == after[0], Card.id < after[1])
+            ))
+        query = query.order_by(Card.updated_at.desc(), Card.id.desc())
+    
+    rows = query.limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    
+    items = [
+        {
             "id": card.id,
             "title": card.title,
             "description": card.description,
-            "position": card.position,
-            "due_date": card.due_date.isoformat() if card.due_date else None,
             "list_id": card.list_id,
-            "created_at": card.created_at.isoformat(),
-            "updated_at": card.updated_at.isoformat(),
-            "labels": [],
-            "assignments": []
+            "project_id": pid,
+            "due_date": card.due_date,
+            "updated_at": card.updated_at
         }
-        cards_data.append(card_dict)
+        for card, pid in rows
+    ]
     
-    cache.set(cache_key, json.dumps(cards_data), ttl=300)  # 5分钟缓存
+    next_cursor = None
+    if has_more:
+        last = rows[-1][0]
+        next_cursor = encode_cursor([last.due_date if sort == "due" else last.updated_at, last.id])
     
-    return cards
+    return {"items": items, "next_cursor": next_cursor}
 
 
 @router.post("/", response_model=CardResponse)
@@ -100,6 +214,7 @@ async def create_card(
         action="create",
         entity_type="card",
         entity_id=new_card.id,
+        project_id=lst.project_id,
         old_values=None,
         new_values={"title": new_card.title, "description": new_card.description, "list_id": list_id}
     )
@@ -115,6 +230,7 @@ async def create_card(
 @router.get("/{card_id}", response_model=CardResponse)
 async def get_card(
     card_id: int,
+    response: Response,
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
@@ -131,6 +247,7 @@ async def get_card(
     lst = db.query(List).filter(List.id == card.list_id).first()
     verify_project_access(lst.project_id, current_user, db)
     
+    response.headers["ETag"] = entity_etag(card)
     return card
 
 
@@ -138,10 +255,12 @@ async def get_card(
 async def update_card(
     card_id: int,
     card_update: CardUpdate,
+    response: Response,
+    if_match: Optional[str] = Header(None),
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
-    """更新卡片"""
+    """更新卡片（If-Match 或 version_id 与当前版本不一致时返回409）"""
     # 获取卡片
     card = db.query(Card).filter(Card.id == card_id).first()
     if not card:
@@ -154,9 +273,10 @@ async def update_card(
     lst = db.query(List).filter(List.id == card.list_id).first()
     project_id = lst.project_id
     verify_project_access(project_id, current_user, db)
+    check_version(card, if_match, card_update.version_id)
     
     # 更新卡片信息
-    update_data = card_update.dict(exclude_unset=True)
+    update_data = card_update.dict(exclude_unset=True, exclude={"version_id"})
     changes = {}
     for field, value in update_data.items():
         if getattr(card, field) != value:
@@ -164,7 +284,7 @@ async def update_card(
         setattr(card, field, value)
     
     if changes:
-        db.commit()
+        commit_versioned(db, card)
         db.refresh(card)
         
         # 记录活动
@@ -174,15 +294,22 @@ async def update_card(
             action="update",
             entity_type="card",
             entity_id=card.id,
+            project_id=project_id,
             old_values=changes,
             new_values=update_data
         )
+        
+        await publish_change("card_updated", CardUpdateMessage(
+            project_id=project_id, list_id=card.list_id, card_id=card.id, action="updated",
+            version_id=card.version_id, data=entity_state(card)
+        ), current_user.id)
     
     # 清除缓存
     cache.delete(f"cards:list:{card.list_id}")
     cache.delete(f"lists:project:{project_id}")
     cache.delete(f"project:{project_id}")
     
+    response.headers["ETag"] = entity_etag(card)
     return card
 
 
@@ -222,6 +349,7 @@ async def delete_card(
         action="delete",
         entity_type="card",
         entity_id=card_id,
+        project_id=project_id,
         old_values={"title": card_title, "list_id": list_id},
         new_values=None
     )
@@ -237,10 +365,12 @@ async def delete_card(
 @router.post("/move")
 async def move_card(
     move_data: CardMoveRequest,
+    response: Response,
+    if_match: Optional[str] = Header(None),
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
-    """移动卡片到不同列表"""
+    """移动卡片到不同列表（卡片已不在源列表，或 If-Match/version_id 与当前版本不一致时返回409）"""
     # 验证源列表存在
     source_list = db.query(List).filter(List.id == move_data.source_list_id).first()
     if not source_list:
@@ -269,6 +399,11 @@ async def move_card(
             detail="Card not found"
         )
     
+    # 卡片已被其他人移走时客户端看到的是旧状态
+    if card.list_id != move_data.source_list_id:
+        raise version_conflict(card)
+    check_version(card, if_match, move_data.version_id)
+    
     # 记录移动前的信息
     old_list_id = card.list_id
     old_position = card.position
@@ -276,7 +411,7 @@ async def move_card(
     # 更新卡片位置和列表
     card.list_id = move_data.target_list_id
     card.position = move_data.new_position
-    db.commit()
+    commit_versioned(db, card)
     
     # 记录活动
     log_activity(
@@ -285,10 +420,19 @@ async def move_card(
         action="move",
         entity_type="card",
         entity_id=card.id,
+        project_id=target_list.project_id,
         old_values={"list_id": old_list_id, "position": old_position},
         new_values={"list_id": move_data.target_list_id, "position": move_data.new_position}
     )
     
+    message = CardUpdateMessage(
+        project_id=target_list.project_id, list_id=card.list_id, card_id=card.id, action="moved",
+        version_id=card.version_id, data=entity_state(card)
+    )
+    await publish_change("card_moved", message, current_user.id)
+    if source_list.project_id != target_list.project_id:
+        await publish_change("card_moved", message, current_user.id, project_id=source_list.project_id)
+    
     # 清除缓存
     cache.delete(f"cards:list:{old_list_id}")
     cache.delete(f"cards:list:{move_data.target_list_id}")
@@ -297,7 +441,8 @@ async def move_card(
     cache.delete(f"project:{source_list.project_id}")
     cache.delete(f"project:{target_list.project_id}")
     
-    return {"message": "Card moved successfully"}
+    response.headers["ETag"] = entity_etag(card)
+    return {"message": "Card moved successfully", "version_id": card.version_id}
 
 
 # 卡片标签管理
@@ -403,26 +548,21 @@ async def assign_card(
             detail="User not found"
         )
     
-    # 检查是否已经分配
-    existing_assignment = db.query(CardAssignment).filter(
-        CardAssignment.card_id == card_id,
-        CardAssignment.user_id == assignment_data.user_id
-    ).first()
-    
-    if existing_assignment:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Card already assigned to this user"
-        )
-    
-    # 创建分配
+    # 创建分配（重复分配由唯一约束 unique_card_assignment 拒绝，并发请求也不会插入两条）
     new_assignment = CardAssignment(
         card_id=card_id,
         user_id=assignment_data.user_id
     )
     
     db.add(new_assignment)
-    db.commit()
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Card already assigned to this user"
+        )
     db.refresh(new_assignment)
     
     # 清除缓存
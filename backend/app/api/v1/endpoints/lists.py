@@ -1,56 +1,58 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
+from typing import List, Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Response, status
 from sqlalchemy.orm import Session
+from app.core.concurrency import check_version, commit_versioned, entity_etag, entity_state
 from app.core.database import get_db
-from app.core.deps import get_current_active_user, verify_project_access
+from app.core.deps import get_current_active_user, get_read_db, verify_project_access
 from app.models.models import User, Project, List
-from app.models.schemas import ListCreate, ListResponse, ListUpdate
+from app.models.schemas import ListCreate, ListResponse, ListUpdate, ListUpdateMessage
+from app.api.v1.websocket.manager import publish_change
 from app.core.redis import cache
+from app.core.http_cache import cached_json_response
+from app.core.serialization import dumps
 from app.services.activity_service import log_activity
+from app.services.version_service import project_etag
 from datetime import datetime
 
 router = APIRouter()
 
 
-@router.get("/", response_model=List[ListResponse])
+@router.get("/", response_model=list[ListResponse])
 async def get_lists(
     project_id: int,
+    if_none_match: Optional[str] = Header(None),
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
-    """获取项目的列表"""
+    """获取项目的列表（支持 ETag/If-None-Match）"""
     # 验证访问权限
     verify_project_access(project_id, current_user, db)
     
-    # 尝试从缓存获取
-    cache_key = f"lists:project:{project_id}"
-    cached_lists = cache.get(cache_key)
-    
-    if cached_lists:
-        import json
-        return json.loads(cached_lists)
-    
-    # 从数据库获取
-    lists = db.query(List).filter(List.project_id == project_id).order_by(List.position).all()
-    
-    # 缓存结果
-    import json
-    lists_data = []
-    for lst in lists:
-        list_dict = {
-            "id": lst.id,
-            "name": lst.name,
-            "position": lst.position,
-            "project_id": lst.project_id,
-            "created_at": lst.created_at.isoformat(),
-            "updated_at": lst.updated_at.isoformat(),
-            "cards": []
-        }
-        lists_data.append(list_dict)
-    
-    cache.set(cache_key, json.dumps(lists_data), ttl=300)  # 5分钟缓存
-    
-    return lists
+    def build() -> bytes:
+        # 从数据库按列获取（卡片通过 /cards/?list_id= 按列表获取）
+        lists_data = [
+            dict(row._mapping, cards=[])
+            for row in db.query(
+                List.id,
+                List.name,
+                List.position,
+                List.project_id,
+                List.card_count,
+                List.version_id,
+                List.created_at,
+                List.updated_at
+            ).filter(List.project_id == project_id).order_by(List.position)
+        ]
+        return dumps(lists_data)
+    
+    return cached_json_response(
+        f"lists:project:{project_id}",
+        build,
+        if_none_match=if_none_match,
+        etag=project_etag(project_id),
+        ttl=300,  # 5分钟缓存
+        replica_etag=lambda: project_etag(project_id, db)
+    )
 
 
 @router.post("/", response_model=ListResponse)
@@ -90,6 +92,7 @@ async def create_list(
         action="create",
         entity_type="list",
         entity_id=new_list.id,
+        project_id=project_id,
         old_values=None,
         new_values={"name": new_list.name, "position": new_list.position}
     )
@@ -104,6 +107,7 @@ async def create_list(
 @router.get("/{list_id}", response_model=ListResponse)
 async def get_list(
     list_id: int,
+    response: Response,
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
@@ -119,6 +123,7 @@ async def get_list(
     # 验证访问权限
     verify_project_access(lst.project_id, current_user, db)
     
+    response.headers["ETag"] = entity_etag(lst)
     return lst
 
 
@@ -126,10 +131,12 @@ async def get_list(
 async def update_list(
     list_id: int,
     list_update: ListUpdate,
+    response: Response,
+    if_match: Optional[str] = Header(None),
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
-    """更新列表"""
+    """更新列表（If-Match 或 version_id 与当前版本不一致时返回409）"""
     # 获取列表
     lst = db.query(List).filter(List.id == list_id).first()
     if not lst:
@@ -140,9 +147,10 @@ async def update_list(
     
     # 验证访问权限
     verify_project_access(lst.project_id, current_user, db)
+    check_version(lst, if_match, list_update.version_id)
     
     # 更新列表信息
-    update_data = list_update.dict(exclude_unset=True)
+    update_data = list_update.dict(exclude_unset=True, exclude={"version_id"})
     changes = {}
     for field, value in update_data.items():
         if getattr(lst, field) != value:
@@ -150,7 +158,7 @@ async def update_list(
         setattr(lst, field, value)
     
     if changes:
-        db.commit()
+        commit_versioned(db, lst)
         db.refresh(lst)
         
         # 记录活动
@@ -160,14 +168,21 @@ async def update_list(
             action="update",
             entity_type="list",
             entity_id=lst.id,
+            project_id=lst.project_id,
             old_values=changes,
             new_values=update_data
         )
+        
+        await publish_change("list_updated", ListUpdateMessage(
+            project_id=lst.project_id, list_id=lst.id, action="updated",
+            version_id=lst.version_id, data=entity_state(lst)
+        ), current_user.id)
     
     # 清除缓存
     cache.delete(f"lists:project:{lst.project_id}")
     cache.delete(f"project:{lst.project_id}")
     
+    response.headers["ETag"] = entity_etag(lst)
     return lst
 
 
@@ -205,6 +220,7 @@ async def delete_list(
         action="delete",
         entity_type="list",
         entity_id=list_id,
+        project_id=project_id,
         old_values={"name": list_name, "project_id": project_id},
         new_values=None
     )
@@ -220,10 +236,13 @@ async def delete_list(
 async def move_list(
     list_id: int,
     new_position: int,
+    response: Response,
+    version_id: Optional[int] = None,
+    if_match: Optional[str] = Header(None),
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
-    """移动列表位置"""
+    """移动列表位置（If-Match 或 version_id 与当前版本不一致时返回409）"""
     # 获取列表
     lst = db.query(List).filter(List.id == list_id).first()
     if not lst:
@@ -236,12 +255,13 @@ async def move_list(
     
     # 验证访问权限
     verify_project_access(project_id, current_user, db)
+    check_version(lst, if_match, version_id)
     
     old_position = lst.position
     
     # 更新位置
     lst.position = new_position
-    db.commit()
+    commit_versioned(db, lst)
     
     # 记录活动
     log_activity(
@@ -250,12 +270,19 @@ async def move_list(
         action="move",
         entity_type="list",
         entity_id=lst.id,
+        project_id=project_id,
         old_values={"position": old_position},
         new_values={"position": new_position}
     )
     
+    await publish_change("list_updated", ListUpdateMessage(
+        project_id=project_id, list_id=lst.id, action="moved",
+        version_id=lst.version_id, data=entity_state(lst)
+    ), current_user.id)
+    
     # 清除缓存
     cache.delete(f"lists:project:{project_id}")
     cache.delete(f"project:{project_id}")
     
-    return {"message": "List moved successfully"}
\ No newline at end of file
+    response.headers["ETag"] = entity_etag(lst)
+    return {"message": "List moved successfully", "version_id": lst.version_id}
\ No newline at end of file
@@ -0,0 +1,59 @@
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from app.core.deps import get_current_active_user
+from app.models.models import User
+from app.models.schemas import NotificationPageResponse, UnreadCountResponse
+from app.services.notification_service import notification_store
+
+router = APIRouter()
+
+
+@router.get("/", response_model=NotificationPageResponse)
+async def get_notifications(
+    cursor: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100),
+    unread_only: bool = False,
+    current_user: User = Depends(get_current_active_user)
+):
+    """获取当前用户的通知（游标分页）"""
+    try:
+        cursor_id = int(cursor) if cursor else None
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+
+    return notification_store.get_page(
+        current_user.id,
+        cursor=cursor_id,
+        limit=limit,
+        unread_only=unread_only
+    )
+
+
+@router.get("/unread-count", response_model=UnreadCountResponse)
+async def get_unread_count(
+    current_user: User = Depends(get_current_active_user)
+):
+    """获取未读通知数量"""
+    return {"unread_count": notification_store.unread_count(current_user.id)}
+
+
+@router.post("/{notification_id}/read")
+async def mark_notification_read(
+    notification_id: int,
+    current_user: User = Depends(get_current_active_user)
+):
+    """标记通知为已读"""
+    notification_store.mark_read(current_user.id, notification_id)
+    return {"message": "Notification marked as read"}
+
+
+@router.post("/read-all")
+async def mark_all_notifications_read(
+    current_user: User = Depends(get_current_active_user)
+):
+    """标记全部通知为已读"""
+    count = notification_store.mark_all_read(current_user.id)
+    return {"message": "All notifications marked as read", "count": count}
@@ -1,66 +1,87 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
+from typing import List, Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
+from app.core.concurrency import check_version, commit_versioned, entity_etag, entity_state
 from app.core.database import get_db
-from app.core.deps import get_current_active_user, verify_project_access
+from app.core.deps import get_current_active_user, get_read_db, verify_project_access
 from app.models.models import User, Project, List, Card, ProjectMember
-from app.models.schemas import ProjectCreate, ProjectResponse, ProjectUpdate, ProjectMemberCreate, ProjectMemberResponse
+from app.models.schemas import ProjectCreate, ProjectResponse, ProjectPageResponse, ActivityPageResponse, ProjectChangesResponse, ProjectImportResponse, ProjectUpdate, ProjectMemberCreate, ProjectMemberResponse, ProjectStatisticsResponse, ProjectUpdateMessage
+from app.api.v1.websocket.manager import publish_change
 from app.core.redis import cache
-from app.services.activity_service import log_activity
+from app.core.http_cache import cached_json_response
+from app.core.serialization import dumps, json_response, nested_row, user_columns
+from app.services.activity_service import log_activity, get_board_activities, cached_activity_page
+from app.services import statistics_service
+from app.services.export_service import ProjectImporter, iter_project_export, parse_line
+from app.services.version_service import get_changes_since, project_etag
+from app.utils.pagination import encode_cursor, decode_cursor
 from datetime import datetime
 
 router = APIRouter()
 
+# 项目列表/详情返回的项目字段（与 ProjectResponse 一致）
+PROJECT_COLUMNS = (
+    Project.id,
+    Project.name,
+    Project.description,
+    Project.owner_id,
+    Project.card_count,
+    Project.done_card_count,
+    Project.version_id,
+    Project.created_at,
+    Project.updated_at
+)
 
-@router.get("/", response_model=List[ProjectResponse])
+
+@router.get("/", response_model=ProjectPageResponse)
 async def get_projects(
-    skip: int = 0,
-    limit: int = 100,
+    cursor: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100),
+    if_none_match: Optional[str] = Header(None),
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
-    """获取用户的项目列表"""
-    # 尝试从缓存获取
-    cache_key = f"projects:user:{current_user.id}:{skip}:{limit}"
-    cached_projects = cache.get(cache_key)
-    
-    if cached_projects:
-        import json
-        return json.loads(cached_projects)
-    
-    # 从数据库获取用户有权限的项目
-    projects = db.query(Project).join(ProjectMember).filter(
-        (Project.owner_id == current_user.id) | 
-        (ProjectMember.user_id == current_user.id)
-    ).offset(skip).limit(limit).all()
-    
-    # 缓存结果
-    import json
-    projects_data = []
-    for project in projects:
-        project_dict = {
-            "id": project.id,
-            "name": project.name,
-            "description": project.description,
-            "owner_id": project.owner_id,
-            "created_at": project.created_at.isoformat(),
-            "updated_at": project.updated_at.isoformat(),
-            "owner": {
-                "id": project.owner.id,
-                "email": project.owner.email,
-                "username": project.owner.username,
-                "full_name": project.owner.full_name,
-                "avatar_url": project.owner.avatar_url,
-                "created_at": project.owner.created_at.isoformat(),
-                "updated_at": project.owner.updated_at.isoformat()
-            },
-            "members": []
-        }
-        projects_data.append(project_dict)
-    
-    cache.set(cache_key, json.dumps(projects_data), ttl=300)  # 5分钟缓存
-    
-    return projects
+    """获取用户的项目列表（按 (created_at, id) 倒序的游标分页）"""
+    after = decode_cursor(cursor, (datetime, int))
+    
+    def build() -> bytes:
+        # 从数据库按列获取用户拥有或参与的项目（连同所有者）
+        joined = db.query(ProjectMember.project_id).filter(ProjectMember.user_id == current_user.id)
+        query = db.query(*PROJECT_COLUMNS, *user_columns(User, "owner")).join(
+            User, User.id == Project.owner_id
+        ).filter(
+            (Project.owner_id == current_user.id) |
+            (Project.id.in_(joined))
+        )
+        if after:
+            query = query.filter(
+                (Project.created_at < after[0]) |
+                ((Project.created_at == after[0]) & (Project.id < after[1]))
+            )
+        rows = query.order_by(Project.created_at.desc(), Project.id.desc()).limit(limit + 1).all()
+        
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor([rows[-1].created_at, rows[-1].id])
+        
+        projects_data = []
+        for row in rows:
+            project_dict = nested_row(row)
+            project_dict["members"] = []
+            projects_data.append(project_dict)
+        return dumps({"items": projects_data, "next_cursor": next_cursor})
+    
+    # 跨项目的列表没有单一版本号，ETag 使用缓存内容的哈希（每个游标窗口一个缓存键）
+    return cached_json_response(
+        f"projects:user:{current_user.id}:{cursor or 'first'}:{limit}",
+        build,
+        if_none_match=if_none_match,
+        ttl=300  # 5分钟缓存
+    )
 
 
 @router.post("/", response_model=ProjectResponse)
@@ -113,6 +134,7 @@ async def create_project(
         action="create",
         entity_type="project",
         entity_id=new_project.id,
+        project_id=new_project.id,
         old_values=None,
         new_values={"name": new_project.name, "description": new_project.description}
     )
@@ -123,89 +145,188 @@ async def create_project(
     return new_project
 
 
+@router.post("/import", response_model=ProjectImportResponse)
+async def import_project(
+    request: Request,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """
+    从NDJSON导出文件导入为新项目（请求体按行流式读取，分块批量写入）
+
+    请求体在事件循环上读取，解析和数据库写入在线程池中执行，导入大文件时不阻塞其他请求。
+    """
+    importer = ProjectImporter(db, current_user)
+
+    def feed_lines(lines):
+        for line in lines:
+            record = parse_line(line)
+            if record is not None:
+                importer.feed(record)
+
+    buffer = b""
+    try:
+        async for chunk in request.stream():
+            buffer += chunk
+            *lines, buffer = buffer.split(b"\n")
+            if lines:
+                await run_in_threadpool(feed_lines, lines)
+        await run_in_threadpool(feed_lines, [buffer])
+        result = await run_in_threadpool(importer.finish)
+    except Exception:
+        await run_in_threadpool(db.rollback)
+        raise
+    
+    def log_import():
+        # 记录活动
+        log_activity(
+            db=db,
+            user_id=current_user.id,
+            action="import",
+            entity_type="project",
+            entity_id=result["project_id"],
+            project_id=result["project_id"],
+            old_values=None,
+            new_values={"cards": result["cards"]}
+        )
+        
+        # 清除缓存
+        cache.clear_pattern(f"projects:user:{current_user.id}:*")
+    
+    await run_in_threadpool(log_import)
+    return result
+
+
+@router.get("/{project_id}/export")
+async def export_project(
+    project_id: int,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """流式导出项目的列表、卡片、标签、分配和活动日志（NDJSON，每行一条记录）"""
+    # 验证访问权限
+    verify_project_access(project_id, current_user, db)
+    
+    return StreamingResponse(
+        iter_project_export(db, project_id),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="project-{project_id}.ndjson"'}
+    )
+
+
 @router.get("/{project_id}", response_model=ProjectResponse)
 async def get_project(
+    project_id: int,
+    if_none_match: Optional[str] = Header(None),
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_read_db)
+):
+    """获取项目详情（支持 ETag/If-None-Match）"""
+    # 验证访问权限
+    verify_project_access(project_id, current_user, db)
+    
+    def build() -> bytes:
+        # 从数据库按列获取项目和所有者
+        row = db.query(*PROJECT_COLUMNS, *user_columns(User, "owner")).join(
+            User, User.id == Project.owner_id
+        ).filter(Project.id == project_id).first()
+        if not row:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Project not found"
+            )
+        
+        project_data = nested_row(row)
+        
+        # 获取项目成员
+        member_rows = db.query(
+            ProjectMember.id,
+            ProjectMember.project_id,
+            ProjectMember.user_id,
+            ProjectMember.role,
+            ProjectMember.joined_at,
+            *user_columns(User, "user")
+        ).join(User, User.id == ProjectMember.user_id).filter(
+            ProjectMember.project_id == project_id
+        ).all()
+        project_data["members"] = [nested_row(member_row) for member_row in member_rows]
+        return dumps(project_data)
+    
+    return cached_json_response(
+        f"project:{project_id}",
+        build,
+        if_none_match=if_none_match,
+        etag=project_etag(project_id),
+        ttl=300,  # 5分钟缓存
+        replica_etag=lambda: project_etag(project_id, db)
+    )
+
+
+@router.get("/{project_id}/statistics", response_model=ProjectStatisticsResponse)
+async def get_project_statistics(
     project_id: int,
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
-    """获取项目详情"""
+    """获取项目统计（进度、各列表卡片数、各成员卡片数）"""
     # 验证访问权限
     verify_project_access(project_id, current_user, db)
     
-    # 尝试从缓存获取
-    cache_key = f"project:{project_id}"
-    cached_project = cache.get(cache_key)
+    return statistics_service.get_project_statistics(db, project_id)
+
+
+@router.get("/{project_id}/activities", response_model=ActivityPageResponse)
+async def get_project_activities(
+    project_id: int,
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=100),
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_read_db)
+):
+    """获取项目活动日志（游标分页）"""
+    # 验证访问权限
+    verify_project_access(project_id, current_user, db)
     
-    if cached_project:
-        import json
-        project_data = json.loads(cached_project)
-        return ProjectResponse(**project_data)
+    return cached_activity_page(
+        f"activities:project:{project_id}:{cursor}:{limit}",
+        cursor,
+        lambda: get_board_activities(db, project_id, cursor=cursor, limit=limit)
+    )
+
+
+@router.get("/{project_id}/changes", response_model=ProjectChangesResponse)
+async def get_project_changes(
+    project_id: int,
+    since: int = Query(0, ge=0),
+    limit: int = Query(500, ge=1, le=1000),
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """获取项目自版本号 since 之后的增量变化（删除的实体以墓碑返回）"""
+    # 验证访问权限
+    verify_project_access(project_id, current_user, db)
     
-    # 从数据库获取
-    project = db.query(Project).filter(Project.id == project_id).first()
-    if not project:
+    changes = get_changes_since(db, project_id, since, limit)
+    if since > changes["version"]:
+        # 客户端版本号超前（如数据库回滚），只能全量重新加载
         raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Project not found"
+            status_code=status.HTTP_410_GONE,
+            detail="Version is ahead of project, full reload required"
         )
     
-    # 获取项目成员
-    members = db.query(ProjectMember).filter(ProjectMember.project_id == project_id).all()
-    
-    # 缓存结果
-    import json
-    project_data = {
-        "id": project.id,
-        "name": project.name,
-        "description": project.description,
-        "owner_id": project.owner_id,
-        "created_at": project.created_at.isoformat(),
-        "updated_at": project.updated_at.isoformat(),
-        "owner": {
-            "id": project.owner.id,
-            "email": project.owner.email,
-            "username": project.owner.username,
-            "full_name": project.owner.full_name,
-            "avatar_url": project.owner.avatar_url,
-            "created_at": project.owner.created_at.isoformat(),
-            "updated_at": project.owner.updated_at.isoformat()
-        },
-        "members": []
-    }
-    
-    for member in members:
-        member_data = {
-            "id": member.id,
-            "project_id": member.project_id,
-            "user_id": member.user_id,
-            "role": member.role,
-            "joined_at": member.joined_at.isoformat(),
-            "user": {
-                "id": member.user.id,
-                "email": member.user.email,
-                "username": member.user.username,
-                "full_name": member.user.full_name,
-                "avatar_url": member.user.avatar_url,
-                "created_at": member.user.created_at.isoformat(),
-                "updated_at": member.user.updated_at.isoformat()
-            }
-        }
-        project_data["members"].append(member_data)
-    
-    cache.set(cache_key, json.dumps(project_data), ttl=300)  # 5分钟缓存
-    
-    return project
+    return json_response(dumps(changes))
 
 
 @router.put("/{project_id}", response_model=ProjectResponse)
 async def update_project(
     project_id: int,
     project_update: ProjectUpdate,
+    response: Response,
+    if_match: Optional[str] = Header(None),
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
-    """更新项目"""
+    """更新项目（If-Match 或 version_id 与当前版本不一致时返回409，If-Match 使用 GET 返回的项目ETag）"""
     # 验证访问权限
     verify_project_access(project_id, current_user, db)
     
@@ -222,9 +343,10 @@ async def update_project(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Only project owner can update the project"
         )
+    check_version(project, if_match, project_update.version_id)
     
     # 更新项目信息
-    update_data = project_update.dict(exclude_unset=True)
+    update_data = project_update.dict(exclude_unset=True, exclude={"version_id"})
     changes = {}
     for field, value in update_data.items():
         if getattr(project, field) != value:
@@ -232,7 +354,7 @@ async def update_project(
         setattr(project, field, value)
     
     if changes:
-        db.commit()
+        commit_versioned(db, project)
         db.refresh(project)
         
         # 记录活动
@@ -242,14 +364,20 @@ async def update_project(
             action="update",
             entity_type="project",
             entity_id=project.id,
+            project_id=project.id,
             old_values=changes,
             new_values=update_data
         )
+        
+        await publish_change("project_updated", ProjectUpdateMessage(
+            project_id=project.id, action="updated", version_id=project.version_id, data=entity_state(project)
+        ), current_user.id)
     
     # 清除缓存
     cache.delete(f"project:{project_id}")
     cache.clear_pattern(f"projects:user:{current_user.id}:*")
     
+    response.headers["ETag"] = entity_etag(project)
     return project
 
 
@@ -288,6 +416,7 @@ async def delete_project(
         action="delete",
         entity_type="project",
         entity_id=project_id,
+        project_id=project_id,
         old_values={"name": project_name},
         new_values=None
     )
@@ -332,19 +461,7 @@ async def add_project_member(
             detail="User not found"
         )
     
-    # 检查用户是否已经是成员
-    existing_member = db.query(ProjectMember).filter(
-        ProjectMember.project_id == project_id,
-        ProjectMember.user_id == member_data.user_id
-    ).first()
-    
-    if existing_member:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="User is already a project member"
-        )
-    
-    # 添加成员
+    # 添加成员（重复添加由唯一约束 unique_project_member 拒绝，并发请求也不会插入两条）
     new_member = ProjectMember(
         project_id=project_id,
         user_id=member_data.user_id,
@@ -352,7 +469,14 @@ async def add_project_member(
     )
     
     db.add(new_member)
-    db.commit()
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="User is already a project member"
+        )
     db.refresh(new_member)
     
     # 记录活动
@@ -362,6 +486,7 @@ async def add_project_member(
         action="create",
         entity_type="assignment",
         entity_id=new_member.id,
+        project_id=project_id,
         old_values=None,
         new_values={"project_id": project_id, "user_id": member_data.user_id, "role": member_data.role}
     )
@@ -428,6 +553,7 @@ async def remove_project_member(
         action="delete",
         entity_type="assignment",
         entity_id=member.id,
+        project_id=project_id,
         old_values={"project_id": project_id, "user_id": user_id, "role": member.role},
         new_values=None
     )
@@ -0,0 +1,71 @@
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.orm import Session
+from app.core.database import get_db
+from app.core.deps import get_current_active_user, verify_project_access
+from app.models.models import User, Project, ProjectMember, List, Card
+from app.models.schemas import CardSearchResponse
+from app.services.search_service import card_search_index
+
+router = APIRouter()
+
+
+@router.get("/cards", response_model=CardSearchResponse)
+async def search_cards(
+    q: str = Query(..., min_length=1, max_length=100),
+    project_id: Optional[int] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100),
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """搜索卡片标题、描述和标签（只返回有权访问的项目中的卡片）"""
+    try:
+        cursor_id = int(cursor) if cursor else None
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+    
+    if project_id is not None:
+        verify_project_access(project_id, current_user, db)
+        project_ids = [project_id]
+    else:
+        # 用户拥有或参与的项目
+        owned = db.query(Project.id).filter(Project.owner_id == current_user.id)
+        joined = db.query(ProjectMember.project_id).filter(ProjectMember.user_id == current_user.id)
+        project_ids = [pid for (pid,) in owned.union(joined).all()]
+    
+    card_ids = card_search_index.search(q, project_ids, cursor=cursor_id, limit=limit + 1)
+    has_more = len(card_ids) > limit
+    card_ids = card_ids[:limit]
+    if not card_ids:
+        return {"items": [], "next_cursor": None}
+    
+    # 一次查询取回卡片，按索引结果的顺序返回
+    rows = db.query(Card, List.project_id).join(List, List.id == Card.list_id).filter(
+        Card.id.in_(card_ids),
+        List.project_id.in_(project_ids)
+    ).all()
+    cards = {card.id: (card, pid) for card, pid in rows}
+    
+    items = []
+    for card_id in card_ids:
+        if card_id not in cards:
+            continue
+        card, pid = cards[card_id]
+        items.append({
+            "id": card.id,
+            "title": card.title,
+            "description": card.description,
+            "list_id": card.list_id,
+            "project_id": pid,
+            "due_date": card.due_date,
+            "updated_at": card.updated_at
+        })
+    
+    return {
+        "items": items,
+        "next_cursor": str(card_ids[-1]) if has_more else None
+    }
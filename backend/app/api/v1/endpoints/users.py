@@ -1,37 +1,53 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
+from typing import List, Optional
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.orm import Session
 from app.core.database import get_db
-from app.core.deps import get_current_active_user, get_current_superuser
+from app.core.deps import get_current_active_user, get_current_superuser, get_read_db
 from app.models.models import User
-from app.models.schemas import UserResponse, UserUpdate
+from app.models.schemas import UserResponse, UserPageResponse, ActivityPageResponse, UserUpdate, UserStatisticsResponse
 from app.core.redis import cache
+from app.services.statistics_service import get_user_statistics
+from app.services.activity_service import get_user_activities, cached_activity_page
+from app.utils.pagination import encode_cursor, decode_cursor
 
 router = APIRouter()
 
 
-@router.get("/", response_model=List[UserResponse])
+@router.get("/", response_model=UserPageResponse)
 async def get_users(
-    skip: int = 0,
-    limit: int = 100,
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=200),
     current_user: User = Depends(get_current_superuser),
     db: Session = Depends(get_db)
 ):
-    """获取用户列表（仅超级用户）"""
-    # 尝试从缓存获取
-    cache_key = f"users:{skip}:{limit}"
+    """获取用户列表（仅超级用户，按 (created_at, id) 正序的游标分页）"""
+    # 尝试从缓存获取（每个游标窗口一个缓存键）
+    cache_key = f"users:{cursor or 'first'}:{limit}"
     cached_users = cache.get(cache_key)
     
     if cached_users:
         import json
         return json.loads(cached_users)
     
+    after = decode_cursor(cursor, (datetime, int))
+    
     # 从数据库获取
-    users = db.query(User).offset(skip).limit(limit).all()
+    query = db.query(User)
+    if after:
+        query = query.filter(
+            (User.created_at > after[0]) |
+            ((User.created_at == after[0]) & (User.id > after[1]))
+        )
+    users = query.order_by(User.created_at, User.id).limit(limit + 1).all()
+    
+    next_cursor = None
+    if len(users) > limit:
+        users = users[:limit]
+        next_cursor = encode_cursor([users[-1].created_at, users[-1].id])
     
     # 缓存结果
     import json
-    from datetime import datetime
     users_data = []
     for user in users:
         user_dict = {
@@ -46,9 +62,10 @@ async def get_users(
         }
         users_data.append(user_dict)
     
-    cache.set(cache_key, json.dumps(users_data), ttl=300)  # 5分钟缓存
+    page = {"items": users_data, "next_cursor": next_cursor}
+    cache.set(cache_key, json.dumps(page), ttl=300)  # 5分钟缓存
     
-    return users
+    return page
 
 
 @router.get("/{user_id}", response_model=UserResponse)
@@ -129,9 +146,10 @@ async def update_user(
     db.commit()
     db.refresh(user)
     
-    # 清除缓存
+    # 清除缓存（项目列表中嵌入了所有者资料，以内容哈希为ETag，需要一并清除）
     cache.delete(f"user:{user_id}")
     cache.clear_pattern("users:*")
+    cache.clear_pattern("projects:user:*")
     
     return user
 
@@ -165,4 +183,28 @@ async def get_my_profile(
     current_user: User = Depends(get_current_active_user)
 ):
     """获取当前用户个人资料"""
-    return current_user
\ No newline at end of file
+    return current_user
+
+
+@router.get("/me/statistics", response_model=UserStatisticsResponse)
+async def get_my_statistics(
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """获取当前用户统计信息"""
+    return get_user_statistics(db, current_user.id)
+
+
+@router.get("/me/activities", response_model=ActivityPageResponse)
+async def get_my_activities(
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=100),
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_read_db)
+):
+    """获取当前用户的活动日志（游标分页）"""
+    return cached_activity_page(
+        f"activities:user:{current_user.id}:{cursor}:{limit}",
+        cursor,
+        lambda: get_user_activities(db, current_user.id, cursor=cursor, limit=limit)
+    )
@@ -1,14 +1,16 @@
 import json
-from typing import Dict, List
+from typing import Dict, List, Optional, Union
 from fastapi import WebSocket, WebSocketDisconnect, Depends, HTTPException, status, Query
 from fastapi.routing import APIRouter
 from app.core.security import jwt_manager
 from app.core.database import get_db
 from app.models.models import User
 from app.core.deps import get_optional_user
+from app.core.metrics import WEBSOCKET_BROADCAST_DURATION, WEBSOCKET_CONNECTIONS, WEBSOCKET_MESSAGES_SENT
 from app.models.schemas import WebSocketMessage, ProjectUpdateMessage, ListUpdateMessage, CardUpdateMessage
 from datetime import datetime
 import asyncio
+import time
 
 router = APIRouter()
 
@@ -28,6 +30,7 @@ class ConnectionManager:
         if project_id not in self.active_connections:
             self.active_connections[project_id] = []
         self.active_connections[project_id].append(websocket)
+        WEBSOCKET_CONNECTIONS.inc()
         
         # 记录用户连接
         self.user_connections[user_id] = websocket
@@ -59,6 +62,7 @@ class ConnectionManager:
         if project_id in self.active_connections:
             if websocket in self.active_connections[project_id]:
                 self.active_connections[project_id].remove(websocket)
+                WEBSOCKET_CONNECTIONS.dec()
             if not self.active_connections[project_id]:
                 del self.active_connections[project_id]
         
@@ -70,36 +74,47 @@ class ConnectionManager:
         """发送个人消息"""
         try:
             await websocket.send_text(json.dumps(message))
+            WEBSOCKET_MESSAGES_SENT.inc()
         except:
             pass
     
     async def broadcast_to_project(self, project_id: int, message: dict, exclude_user: int = None):
         """向项目所有连接广播消息"""
         if project_id in self.active_connections:
+            start = time.perf_counter()
+            text = json.dumps(message)
             disconnected = []
             for connection in self.active_connections[project_id]:
                 try:
-                    await connection.send_text(json.dumps(message))
+                    await connection.send_text(text)
                 except:
                     disconnected.append(connection)
+            WEBSOCKET_BROADCAST_DURATION.observe(time.perf_counter() - start)
+            WEBSOCKET_MESSAGES_SENT.inc(len(self.active_connections[project_id]) - len(disconnected))
             
             # 清理断开的连接
             for conn in disconnected:
                 self.active_connections[project_id].remove(conn)
+                WEBSOCKET_CONNECTIONS.dec()
     
     async def broadcast_to_all_projects(self, message: dict):
         """向所有项目广播消息"""
         for project_id, connections in self.active_connections.items():
+            start = time.perf_counter()
+            text = json.dumps(message)
             disconnected = []
             for connection in connections:
                 try:
-                    await connection.send_text(json.dumps(message))
+                    await connection.send_text(text)
                 except:
                     disconnected.append(connection)
+            WEBSOCKET_BROADCAST_DURATION.observe(time.perf_counter() - start)
+            WEBSOCKET_MESSAGES_SENT.inc(len(connections) - len(disconnected))
             
             # 清理断开的连接
             for conn in disconnected:
                 connections.remove(conn)
+                WEBSOCKET_CONNECTIONS.dec()
     
     def get_project_connections(self, project_id: int) -> int:
         """获取项目连接数"""
@@ -114,6 +129,21 @@ class ConnectionManager:
 manager = ConnectionManager()
 
 
+async def publish_change(
+    message_type: str,
+    message: Union[ProjectUpdateMessage, ListUpdateMessage, CardUpdateMessage],
+    user_id: int,
+    project_id: Optional[int] = None
+):
+    """接口写入成功后向项目连接推送变化（带实体的 version_id，客户端只应用比本地版本更新的变化）"""
+    await manager.broadcast_to_project(project_id or message.project_id, {
+        "type": message_type,
+        "payload": message.model_dump(mode="json"),
+        "timestamp": datetime.now().isoformat(),
+        "user_id": user_id
+    }, exclude_user=user_id)
+
+
 @router.websocket("/project/{project_id}")
 async def websocket_endpoint(
     websocket: WebSocket,
@@ -1,4 +1,6 @@
-from celery import Celery
+import time
+from celery import Celery, signals
+from kombu import Queue
 from app.core.config import settings
 
 # 创建Celery应用
@@ -6,9 +8,22 @@ celery_app = Celery(
     "taskly_backend",
     broker=settings.celery_broker_url,
     backend=settings.celery_result_backend,
-    include=["app.tasks.email", "app.tasks.notifications"]
+    include=["app.tasks.email", "app.tasks.notifications", "app.tasks.cleanup"]
 )
 
+# 任务优先级（Redis broker 中数值越小优先级越高）
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 5
+PRIORITY_LOW = 9
+PRIORITY_STEPS = list(range(10))
+
+# 任务队列:
+# - notifications  实时通知，对延迟敏感
+# - email          邮件发送
+# - bulk           批量扫描、清理、统计等耗时任务，使用单独的 worker 消费
+# - default        其他任务
+TASK_QUEUES = ("notifications", "email", "bulk", "default")
+
 # Celery配置
 celery_app.conf.update(
     task_serializer="json",
@@ -16,18 +31,49 @@ celery_app.conf.update(
     result_serializer="json",
     timezone="UTC",
     enable_utc=True,
-    task_track_started=True,
     task_time_limit=30 * 60,  # 30分钟
     task_soft_time_limit=25 * 60,  # 25分钟
     worker_prefetch_multiplier=1,
     worker_max_tasks_per_child=1000,
+    # 默认不保存任务结果，需要结果的任务单独声明 ignore_result=False
+    task_ignore_result=True,
+    task_store_errors_even_if_ignored=True,
+    task_track_started=False,
+    result_expires=settings.celery_result_expires,
+    # 队列与优先级
+    task_queues=[
+        Queue(name, routing_key=name, queue_arguments={"x-max-priority": 10})
+        for name in TASK_QUEUES
+    ],
+    task_default_queue="default",
+    task_default_routing_key="default",
+    task_default_priority=PRIORITY_NORMAL,
+    task_queue_max_priority=10,
+    broker_transport_options={
+        "priority_steps": PRIORITY_STEPS,
+        "sep": ":",
+        "queue_order_strategy": "priority",
+    },
 )
 
 # 任务路由
 celery_app.conf.task_routes = {
-    "app.tasks.email.send_email": {"queue": "email"},
-    "app.tasks.notifications.send_notification": {"queue": "notifications"},
-    "app.tasks.notifications.process_activity_log": {"queue": "notifications"},
+    # 实时通知
+    "app.tasks.notifications.send_notification": {"queue": "notifications", "priority": PRIORITY_HIGH},
+    "app.tasks.notifications.send_board_activity_notification": {"queue": "notifications", "priority": PRIORITY_HIGH},
+    "app.tasks.notifications.send_assignment_notification": {"queue": "notifications", "priority": PRIORITY_HIGH},
+    "app.tasks.notifications.process_activity_log": {"queue": "notifications", "priority": PRIORITY_NORMAL},
+    # 邮件
+    "app.tasks.email.send_email": {"queue": "email", "priority": PRIORITY_NORMAL},
+    "app.tasks.email.send_welcome_email": {"queue": "email", "priority": PRIORITY_NORMAL},
+    "app.tasks.email.send_password_reset_email": {"queue": "email", "priority": PRIORITY_HIGH},
+    "app.tasks.email.send_board_invitation_email": {"queue": "email", "priority": PRIORITY_NORMAL},
+    "app.tasks.email.flush_email_outbox": {"queue": "email", "priority": PRIORITY_NORMAL},
+    # 批量任务
+    "app.tasks.notifications.schedule_due_date_reminders": {"queue": "bulk", "priority": PRIORITY_NORMAL},
+    "app.tasks.notifications.send_due_date_notification": {"queue": "bulk", "priority": PRIORITY_NORMAL},
+    "app.tasks.notifications.send_due_date_notifications_batch": {"queue": "bulk", "priority": PRIORITY_NORMAL},
+    "app.tasks.cleanup.*": {"queue": "bulk", "priority": PRIORITY_LOW},
 }
 
 # 定时任务配置
@@ -40,4 +86,48 @@ celery_app.conf.beat_schedule = {
         "task": "app.tasks.cleanup.cleanup_expired_cache",
         "schedule": 12 * 60 * 60.0,  # 每12小时执行一次
     },
-}
\ No newline at end of file
+    "schedule-due-date-reminders": {
+        "task": "app.tasks.notifications.schedule_due_date_reminders",
+        "schedule": 60 * 60.0,  # 每小时扫描一次，当天已提醒的卡片会被去重
+    },
+    "flush-email-outbox": {
+        "task": "app.tasks.email.flush_email_outbox",
+        "schedule": 30.0,  # 每30秒兜底发送一次待发送邮件
+    },
+    "flush-metric-rollups": {
+        "task": "app.tasks.cleanup.flush_metric_rollups",
+        "schedule": 5 * 60.0,  # 每5分钟将实时统计计数写入汇总表
+    },
+    "check-counter-consistency": {
+        "task": "app.tasks.cleanup.check_counter_consistency",
+        "schedule": 24 * 60 * 60.0,  # 每天检查并修复一次计数器偏差
+    },
+}
+
+# 任务耗时指标（按队列）
+_task_started: dict = {}
+
+
+@signals.task_prerun.connect
+def _record_task_start(task_id=None, **kwargs):
+    _task_started[task_id] = time.perf_counter()
+
+
+@signals.task_postrun.connect
+def _record_task_duration(task_id=None, task=None, state=None, **kwargs):
+    start = _task_started.pop(task_id, None)
+    if start is None or task is None:
+        return
+    from app.core.metrics import CELERY_TASK_DURATION
+    queue = (task.request.delivery_info or {}).get("routing_key") or "default"
+    CELERY_TASK_DURATION.labels(queue, task.name, state or "UNKNOWN").observe(time.perf_counter() - start)
+
+
+@signals.worker_init.connect
+def _start_metrics_server(**kwargs):
+    """worker 主进程启动指标HTTP服务（celery_metrics_port 为0时不启动），子进程的指标通过多进程目录合并"""
+    if not settings.celery_metrics_port:
+        return
+    from prometheus_client import start_http_server
+    from app.core.metrics import process_registry
+    start_http_server(settings.celery_metrics_port, registry=process_registry())
@@ -0,0 +1,118 @@
+"""
+乐观并发控制
+
+Project、List、Card 使用 version_id 列（SQLAlchemy version_id_col）：每次通过ORM更新时加1，
+UPDATE/DELETE 语句带上 WHERE version_id = <读取时的值>，两个请求并发修改同一行时后提交的一方得到
+StaleDataError，不需要加行锁。
+
+每个资源只使用一种ETag：列表和卡片为行版本号（"3"）；项目与 GET /projects/{id} 一致，
+为项目数据版本号（W/"p1.42"，项目内任何数据变化都会改变它）。修改成功后响应中返回新的ETag。
+
+客户端通过 If-Match 请求头或请求体中的 version_id 提交读取时的版本，
+与当前版本不一致、或读取之后被其他请求修改时返回409，响应中附带实体的当前状态和ETag；
+If-Match 中的ETag不属于该实体（其他项目或其他资源的ETag、无法解析的值）时返回412。
+"""
+
+import re
+from typing import Any, Dict, Optional
+
+from fastapi import HTTPException, status
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import inspect
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.exc import StaleDataError
+
+from app.models.models import Project
+
+_PROJECT_TAG = re.compile(r"p(\d+)\.(\d+)")
+
+
+def version_etag(version_id: int) -> str:
+    return f'"{version_id}"'
+
+
+def project_version_etag(project_id: int, version: int) -> str:
+    return f'W/"p{project_id}.{version}"'
+
+
+def entity_etag(obj) -> str:
+    """实体资源的ETag（项目使用项目数据版本号，其余使用行版本号）"""
+    if isinstance(obj, Project):
+        return project_version_etag(obj.id, obj.version)
+    return version_etag(obj.version_id)
+
+
+def match_if_match(obj, if_match: Optional[str]) -> Optional[bool]:
+    """
+    If-Match 是否与实体当前版本一致；未提供或为 * 时返回 None
+
+    除实体自己的ETag外也接受行版本号（"3"，与请求体中的 version_id 相同）。
+    有任何一个不属于该实体的ETag时返回412。
+    """
+    if not if_match or if_match.strip() == "*":
+        return None
+    matched = False
+    for tag in if_match.split(","):
+        tag = tag.strip()
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        tag = tag.strip('"')
+        project_tag = _PROJECT_TAG.fullmatch(tag)
+        if project_tag and isinstance(obj, Project) and int(project_tag.group(1)) == obj.id:
+            matched |= int(project_tag.group(2)) == obj.version
+        elif tag.isdigit():
+            matched |= int(tag) == obj.version_id
+        else:
+            raise HTTPException(
+                status_code=status.HTTP_412_PRECONDITION_FAILED,
+                detail=f"If-Match does not refer to this {type(obj).__name__.lower()}",
+                headers={"ETag": entity_etag(obj)}
+            )
+    return matched
+
+
+def entity_state(obj) -> Dict[str, Any]:
+    """实体的列值（不含关系），用于冲突响应和WebSocket推送"""
+    return jsonable_encoder({attr.key: getattr(obj, attr.key) for attr in inspect(obj).mapper.column_attrs})
+
+
+def version_conflict(obj) -> HTTPException:
+    """409响应（附带实体的当前状态和版本号）"""
+    name = type(obj).__name__
+    return HTTPException(
+        status_code=status.HTTP_409_CONFLICT,
+        detail={
+            "message": f"{name} was modified by another request",
+            "version_id": obj.version_id,
+            "current": entity_state(obj)
+        },
+        headers={"ETag": entity_etag(obj)}
+    )
+
+
+def check_version(obj, if_match: Optional[str], version_id: Optional[int] = None):
+    """请求携带的版本（If-Match 优先，其次是请求体中的 version_id）与实体当前版本不一致时返回409"""
+    matched = match_if_match(obj, if_match)
+    if matched is None and version_id is not None:
+        matched = obj.version_id == version_id
+    if matched is False:
+        raise version_conflict(obj)
+
+
+def commit_versioned(db: Session, obj):
+    """
+    提交修改；读取之后实体被其他请求修改或删除时回滚，
+    返回409（附带当前状态）或404
+    """
+    model, obj_id = type(obj), obj.id
+    try:
+        db.commit()
+    except StaleDataError:
+        db.rollback()
+        current = db.query(model).filter(model.id == obj_id).populate_existing().first()
+        if current is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"{model.__name__} not found"
+            )
+        raise version_conflict(current)
@@ -2,21 +2,56 @@ from sqlalchemy import create_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from app.core.config import settings
+from app.core.instrumentation import instrument_engine, pool_class
+from app.core.replicas import RoutingSession, register_replica
 
-# 创建数据库引擎
-engine = create_engine(
-    settings.database_url,
-    pool_pre_ping=True,
-    pool_recycle=300,
-    echo=settings.debug
-)
+
+def _pool_options(database_url: str) -> dict:
+    """连接池参数；SQLite 内存库等不使用 QueuePool 的数据库只保留默认连接池"""
+    poolclass = pool_class(database_url)
+    if poolclass is None:
+        return {}
+    return {
+        "poolclass": poolclass,
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_timeout": settings.db_pool_timeout,
+        "pool_use_lifo": settings.db_pool_use_lifo,
+    }
+
+
+def create_db_engine(database_url: str):
+    """创建数据库引擎（连接池记录获取连接的等待时间、使用中的连接数和超时次数）"""
+    db_engine = create_engine(
+        database_url,
+        pool_pre_ping=True,
+        pool_recycle=settings.db_pool_recycle,
+        echo=settings.debug,
+        **_pool_options(database_url)
+    )
+    instrument_engine(db_engine)
+    return db_engine
+
+
+# 主库引擎
+engine = create_db_engine(settings.database_url)
+
+# 只读副本引擎（只读接口的查询按 RoutingSession 的规则发送到副本）
+replica_engines = [create_db_engine(url) for url in settings.database_replica_urls]
+for index, replica_engine in enumerate(replica_engines):
+    register_replica(replica_engine, name=str(index))
 
 # 创建会话工厂
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+SessionLocal = sessionmaker(class_=RoutingSession, autocommit=False, autoflush=False, bind=engine)
 
 # 创建基础模型类
 Base = declarative_base()
 
+# 注册在写入时维护卡片计数器、搜索索引和项目版本号的会话事件
+import app.services.counter_service  # noqa: E402,F401
+import app.services.search_service  # noqa: E402,F401
+import app.services.version_service  # noqa: E402,F401
+
 
 def get_db():
     """获取数据库会话"""
@@ -2,6 +2,7 @@ from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
 from app.core.database import get_db
+from app.core.replicas import use_replica
 from app.core.security import jwt_manager
 from app.models.models import User
 from typing import Optional
@@ -34,9 +35,20 @@ def get_current_user(
     if user is None:
         raise credentials_exception
     
+    # 记录会话所属用户，写入后该用户的读请求在一段时间内走主库
+    db.info["user_id"] = user.id
     return user
 
 
+def get_read_db(
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+) -> Session:
+    """只读接口的数据库会话：配置了只读副本时查询发送到副本（与 get_current_user 共用同一个会话）"""
+    use_replica(db, current_user.id)
+    return db
+
+
 def get_current_active_user(
     current_user: User = Depends(get_current_user)
 ) -> User:
@@ -0,0 +1,68 @@
+from typing import Callable, Optional
+from fastapi import Response
+
+from app.core.instrumentation import current_stats
+from app.core.redis import cache
+from app.core.replicas import cache_ttl
+from app.core.serialization import json_response
+
+
+def etag_matches(if_none_match: Optional[str], etag: Optional[str]) -> bool:
+    """判断 If-None-Match 是否与ETag匹配（按弱比较，支持多个值和 *）"""
+    if not if_none_match or not etag:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+
+    def opaque(tag: str) -> str:
+        tag = tag.strip()
+        return tag[2:] if tag.startswith("W/") else tag
+
+    return opaque(etag) in {opaque(tag) for tag in if_none_match.split(",")}
+
+
+def not_modified(etag: str) -> Response:
+    """304 Not Modified，不返回响应体"""
+    return Response(status_code=304, headers={"ETag": etag})
+
+
+def cached_json_response(
+    cache_key: str,
+    build: Callable[[], bytes],
+    if_none_match: Optional[str] = None,
+    etag: Optional[str] = None,
+    ttl: int = 300,
+    replica_etag: Optional[Callable[[], Optional[str]]] = None
+) -> Response:
+    """
+    返回带ETag的缓存JSON响应
+
+    etag 由调用方根据项目版本号给出时，If-None-Match 匹配直接返回304，既不查数据库也不读取缓存；
+    缓存中的响应只有在ETag与当前版本一致时才使用。etag 为None时以缓存内容的哈希作为ETag。
+
+    响应体从只读副本读出时，副本可能落后于 etag 对应的版本：此时改用 replica_etag
+    （在同一副本会话中读取的版本号）作为ETag；没有 replica_etag 时不返回版本ETag也不缓存。
+    """
+    if etag is not None:
+        if etag_matches(if_none_match, etag):
+            return not_modified(etag)
+    elif if_none_match:
+        cached_etag = cache.get_etag(cache_key)
+        if etag_matches(if_none_match, cached_etag):
+            return not_modified(cached_etag)
+
+    cached = cache.get_response(cache_key)
+    if cached:
+        body, cached_etag = cached
+        if etag is None or cached_etag == etag:
+            return json_response(body, headers={"ETag": cached_etag})
+
+    stats = current_stats()
+    replica_reads = stats.replica_reads if stats is not None else 0
+    body = build()
+    if etag is not None and stats is not None and stats.replica_reads > replica_reads:
+        etag = replica_etag() if replica_etag is not None else None
+        if etag is None:
+            return json_response(body)
+    etag = cache.set_response(cache_key, body, etag=etag, ttl=cache_ttl(ttl))
+    return json_response(body, headers={"ETag": etag})
@@ -0,0 +1,241 @@
+"""
+幂等键（Idempotency-Key）
+
+客户端为每个写操作生成一个唯一的键，放在 Idempotency-Key 请求头中，超时或断线后重试时复用同一个键：
+- 第一次请求正常执行，响应（5xx 除外）按 用户 + 键 保存在 Redis 中，保留 idempotency_ttl 秒；
+- 之后相同键、相同请求（方法、路径、查询参数和请求体）的重试直接返回保存的响应，
+  带有 Idempotent-Replayed: true 响应头，不执行接口也不访问数据库；
+- 同一个键用于不同的请求时返回422；
+- 第一次请求尚未完成时到达的重试返回409和 Retry-After，客户端稍后再试。
+
+5xx 响应和未处理的异常不保存，之后的重试会重新执行。没有有效的登录令牌或 Redis 不可用时按没有幂等键处理。
+计算请求指纹需要读取完整的请求体，因此流式上传的接口（exclude_paths）、分块传输
+或请求体超过 idempotency_max_body 的请求同样按没有幂等键处理，请求体照常以流的形式交给接口。
+"""
+
+import hashlib
+import json
+import logging
+from typing import Iterable, List, Optional, Tuple
+
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse
+
+from app.core.config import settings
+from app.core.instrumentation import match_route
+from app.core.metrics import IDEMPOTENCY_REQUESTS
+from app.core.redis import redis_client
+from app.core.security import bearer_user_id
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENT_METHODS = {"POST", "PUT", "PATCH"}
+MAX_KEY_LENGTH = 255
+REPLAYED_HEADER = (b"idempotent-replayed", b"true")
+# 这些状态码与请求时的状态有关（登录过期、限流），重试时应重新执行
+UNSTORED_STATUS = {401, 403, 408, 429}
+
+
+def request_fingerprint(scope, body: bytes) -> str:
+    digest = hashlib.sha256()
+    for part in (scope["method"].encode(), scope["path"].encode(), scope.get("query_string", b""), body):
+        digest.update(part)
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class IdempotencyStore:
+    """保存在 Redis 中的幂等记录：执行中为 {"fingerprint"}，完成后加上 status、headers、body"""
+
+    def __init__(self, client, prefix: str = "idempotency"):
+        self.client = client
+        self.prefix = prefix
+
+    def key(self, subject: str, idempotency_key: str) -> str:
+        return f"{self.prefix}:{subject}:{idempotency_key}"
+
+    def begin(self, key: str, fingerprint: str) -> Tuple[bool, Optional[dict]]:
+        """
+        占用键，返回 (是否占用成功, 已有的记录)
+
+        键已被占用时返回已有的记录；Redis 不可用时返回 (False, None)，调用方按没有幂等键处理。
+        """
+        record = json.dumps({"fingerprint": fingerprint})
+        try:
+            for _ in range(2):
+                if self.client.set(key, record, nx=True, ex=settings.idempotency_lock_ttl):
+                    return True, None
+                existing = self.client.get(key)
+                # 读取之前记录恰好过期时再尝试占用一次
+                if existing is not None:
+                    return False, json.loads(existing)
+        except Exception as e:
+            logger.warning(f"Idempotency store unavailable: {e}")
+        return False, None
+
+    def complete(self, key: str, fingerprint: str, status: int, headers: List[Tuple[bytes, bytes]], body: bytes):
+        try:
+            record = {
+                "fingerprint": fingerprint,
+                "status": status,
+                "headers": [[name.decode("latin-1"), value.decode("latin-1")] for name, value in headers],
+                "body": body.decode("utf-8"),
+            }
+            self.client.set(key, json.dumps(record), ex=settings.idempotency_ttl)
+            IDEMPOTENCY_REQUESTS.labels("stored").inc()
+        except Exception as e:
+            logger.warning(f"Failed to store idempotent response for {key}: {e}")
+            self.release(key)
+
+    def release(self, key: str):
+        """放弃占用（请求失败），之后的重试会重新执行"""
+        try:
+            self.client.delete(key)
+        except Exception as e:
+            logger.warning(f"Failed to release idempotency key {key}: {e}")
+
+
+idempotency_store = IdempotencyStore(redis_client)
+
+
+class IdempotencyMiddleware:
+    """
+    幂等键中间件（ASGI）
+
+    只处理 path_prefixes 下（exclude_paths 除外）带 Idempotency-Key 请求头的 POST/PUT/PATCH 请求，其他请求原样转发。
+    """
+
+    def __init__(
+        self,
+        app,
+        path_prefixes: Iterable[str],
+        exclude_paths: Iterable[str] = (),
+        store: IdempotencyStore = idempotency_store
+    ):
+        self.app = app
+        self.path_prefixes = tuple(path_prefixes)
+        self.exclude_paths = set(exclude_paths)
+        self.store = store
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] != "http"
+            or scope["method"] not in IDEMPOTENT_METHODS
+            or not scope["path"].startswith(self.path_prefixes)
+            or scope["path"] in self.exclude_paths
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        headers = Headers(scope=scope)
+        idempotency_key = headers.get("idempotency-key")
+        if idempotency_key is None:
+            await self.app(scope, receive, send)
+            return
+        if not idempotency_key or len(idempotency_key) > MAX_KEY_LENGTH:
+            response = JSONResponse(
+                status_code=400,
+                content={"detail": f"Idempotency-Key must be 1-{MAX_KEY_LENGTH} characters"}
+            )
+            await response(scope, receive, send)
+            return
+        subject = bearer_user_id(headers.get("authorization"))
+        if subject is None or not self._body_within_limit(headers):
+            # 未登录的请求由接口返回401
+            await self.app(scope, receive, send)
+            return
+
+        body = await self._read_body(receive)
+        fingerprint = request_fingerprint(scope, body)
+        key = self.store.key(subject, idempotency_key)
+        acquired, record = self.store.begin(key, fingerprint)
+
+        if record is not None:
+            await self._respond_existing(scope, receive, send, record, fingerprint)
+            return
+
+        body_sent = False
+
+        async def receive_body():
+            nonlocal body_sent
+            if not body_sent:
+                body_sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+
+        if not acquired:
+            await self.app(scope, receive_body, send)
+            return
+
+        status = None
+        response_headers: List[Tuple[bytes, bytes]] = []
+        chunks: List[bytes] = []
+
+        async def send_and_capture(message):
+            nonlocal status, response_headers
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                response_headers = list(message.get("headers", []))
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive_body, send_and_capture)
+        except BaseException:
+            self.store.release(key)
+            raise
+
+        if status is None or status >= 500 or status in UNSTORED_STATUS:
+            self.store.release(key)
+            return
+        self.store.complete(key, fingerprint, status, response_headers, b"".join(chunks))
+
+    @staticmethod
+    def _body_within_limit(headers: Headers) -> bool:
+        """请求体不超过 idempotency_max_body（分块传输的请求体大小未知，按超过处理）"""
+        if "transfer-encoding" in headers:
+            return False
+        content_length = headers.get("content-length")
+        if content_length is None:
+            # 既没有 Content-Length 也不是分块传输：没有请求体
+            return True
+        return content_length.isdigit() and int(content_length) <= settings.idempotency_max_body
+
+    @staticmethod
+    async def _read_body(receive) -> bytes:
+        chunks = []
+        while True:
+            message = await receive()
+            if message["type"] != "http.request":
+                break
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body", False):
+                break
+        return b"".join(chunks)
+
+    async def _respond_existing(self, scope, receive, send, record: dict, fingerprint: str):
+        if record.get("fingerprint") != fingerprint:
+            IDEMPOTENCY_REQUESTS.labels("mismatch").inc()
+            response = JSONResponse(
+                status_code=422,
+                content={"detail": "Idempotency-Key was already used for a different request"}
+            )
+            await response(scope, receive, send)
+            return
+        if "status" not in record:
+            IDEMPOTENCY_REQUESTS.labels("in_progress").inc()
+            response = JSONResponse(
+                status_code=409,
+                content={"detail": "A request with this Idempotency-Key is still in progress"},
+                headers={"Retry-After": "1"}
+            )
+            await response(scope, receive, send)
+            return
+
+        IDEMPOTENCY_REQUESTS.labels("replayed").inc()
+        # 重放的请求不经过路由，先匹配路由使请求统计仍按路由模板归类
+        match_route(scope)
+        headers = [(name.encode("latin-1"), value.encode("latin-1")) for name, value in record["headers"]]
+        await send({"type": "http.response.start", "status": record["status"], "headers": [*headers, REPLAYED_HEADER]})
+        await send({"type": "http.response.body", "body": record["body"].encode("utf-8")})
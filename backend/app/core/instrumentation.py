@@ -0,0 +1,390 @@
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Any, Dict, Optional, Sequence
+import bisect
+import logging
+import random
+import threading
+import time
+
+from sqlalchemy import event, exc
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.pool import QueuePool
+from starlette.routing import Match
+
+from app.core.config import settings
+from app.core.metrics import (
+    DB_POOL_CAPACITY, DB_POOL_CHECKOUT_WAIT, DB_POOL_IN_USE, DB_POOL_TIMEOUTS, HTTP_REQUEST_DURATION,
+    HTTP_REQUEST_QUERIES, record_cache_request
+)
+
+logger = logging.getLogger(__name__)
+slow_query_logger = logging.getLogger("app.sql.slow")
+
+
+class NPlusOneError(RuntimeError):
+    """同一条SQL在一个请求内执行次数超过阈值（仅在 fail_on_n_plus_one 开启时抛出）"""
+
+
+@dataclass
+class RequestStats:
+    """单个请求的数据库、Redis和缓存统计"""
+    queries: int = 0
+    db_time: float = 0.0
+    redis_calls: int = 0
+    redis_time: float = 0.0
+    cache_hits: int = 0
+    cache_misses: int = 0
+    replica_reads: int = 0  # 发送到只读副本的查询数
+    statements: Dict[str, int] = field(default_factory=dict)  # SQL -> 执行次数
+    n_plus_one: Optional[str] = None  # 第一条超过阈值的SQL
+    scope: Optional[dict] = field(default=None, repr=False)  # 请求的 ASGI scope（按路由归类）
+
+
+_current: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+
+def current_stats() -> Optional[RequestStats]:
+    return _current.get()
+
+
+def record_cache(key: str, hit: bool):
+    """记录一次缓存命中或未命中"""
+    record_cache_request(key, hit)
+    stats = _current.get()
+    if stats is not None:
+        if hit:
+            stats.cache_hits += 1
+        else:
+            stats.cache_misses += 1
+
+
+def record_redis(elapsed: float):
+    stats = _current.get()
+    if stats is not None:
+        stats.redis_calls += 1
+        stats.redis_time += elapsed
+
+
+def _sample_parameters(parameters: Any) -> str:
+    text = repr(parameters)
+    return text if len(text) <= 500 else text[:500] + "..."
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_start"].pop()
+
+    if elapsed * 1000 >= settings.slow_query_ms:
+        if random.random() < settings.slow_query_param_sample_rate:
+            slow_query_logger.warning(
+                f"慢查询 {elapsed * 1000:.1f}ms: {statement} 参数: {_sample_parameters(parameters)}"
+            )
+        else:
+            slow_query_logger.warning(f"慢查询 {elapsed * 1000:.1f}ms: {statement}")
+
+    stats = _current.get()
+    if stats is None:
+        return
+    stats.queries += 1
+    stats.db_time += elapsed
+    count = stats.statements.get(statement, 0) + 1
+    stats.statements[statement] = count
+    if count == settings.n_plus_one_threshold and stats.n_plus_one is None:
+        stats.n_plus_one = statement
+        if settings.fail_on_n_plus_one:
+            raise NPlusOneError(f"同一条SQL在一个请求内执行了 {count} 次: {statement}")
+
+
+def _handle_error(exception_context):
+    # 执行失败时不会触发 after_cursor_execute，丢弃对应的开始时间
+    connection = exception_context.connection
+    if connection is not None and connection.info.get("query_start"):
+        connection.info["query_start"].pop()
+
+
+class RecentWait:
+    """
+    最近获取数据库连接的等待时间（指数移动平均，各连接池合计），用于过载保护
+
+    超过 max_age 秒没有新的取连接记录时视为0（连接池空闲）。
+    """
+
+    def __init__(self, alpha: float = 0.2, max_age: float = 5.0):
+        self.alpha = alpha
+        self.max_age = max_age
+        self._value = 0.0
+        self._updated = 0.0
+
+    def observe(self, wait: float):
+        self._value += self.alpha * (wait - self._value)
+        self._updated = time.monotonic()
+
+    @property
+    def value(self) -> float:
+        if time.monotonic() - self._updated > self.max_age:
+            return 0.0
+        return self._value
+
+
+pool_wait = RecentWait()
+
+
+class TimedQueuePool(QueuePool):
+    """记录获取连接等待时间和超时次数的连接池"""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            DB_POOL_TIMEOUTS.inc()
+            logger.warning(
+                f"获取数据库连接超时（{self.timeout()}s）: {self.status()}，考虑调大 db_pool_size / db_max_overflow"
+            )
+            raise
+        finally:
+            wait = time.perf_counter() - start
+            DB_POOL_CHECKOUT_WAIT.observe(wait)
+            pool_wait.observe(wait)
+
+
+def pool_class(database_url: str):
+    """数据库默认使用 QueuePool 时换成 TimedQueuePool（SQLite 内存库等使用其他连接池的保持不变）"""
+    url = make_url(database_url)
+    if url.get_dialect().get_pool_class(url) is QueuePool:
+        return TimedQueuePool
+    return None
+
+
+def _pool_checkout(dbapi_connection, connection_record, connection_proxy):
+    DB_POOL_IN_USE.inc()
+
+
+def _pool_checkin(dbapi_connection, connection_record):
+    DB_POOL_IN_USE.dec()
+
+
+def instrument_engine(engine: Engine):
+    """为引擎注册语句计数、耗时统计、慢查询日志和连接池使用情况"""
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+    event.listen(engine, "checkout", _pool_checkout)
+    event.listen(engine, "checkin", _pool_checkin)
+    if isinstance(engine.pool, QueuePool):
+        DB_POOL_CAPACITY.inc(engine.pool.size() + engine.pool._max_overflow)
+
+
+def warm_up_pool(engine: Engine, connections: int) -> int:
+    """预先建立连接（不超过 pool_size），避免启动后第一批请求同时建连；返回建立的连接数"""
+    if isinstance(engine.pool, QueuePool):
+        connections = min(connections, engine.pool.size())
+    opened = []
+    try:
+        for _ in range(connections):
+            opened.append(engine.connect())
+    except exc.SQLAlchemyError as e:
+        logger.warning(f"数据库连接池预热失败（已建立 {len(opened)} 个连接）: {e}")
+    finally:
+        for connection in opened:
+            connection.close()
+    return len(opened)
+
+
+@lru_cache(maxsize=None)
+def instrumented_redis_class():
+    """记录往返次数和耗时的Redis客户端类（第一次使用时才导入 redis）"""
+    import redis
+
+    class InstrumentedPipeline(redis.client.Pipeline):
+        def execute(self, raise_on_error: bool = True):
+            start = time.perf_counter()
+            try:
+                return super().execute(raise_on_error)
+            finally:
+                record_redis(time.perf_counter() - start)
+
+    class InstrumentedRedis(redis.Redis):
+        def execute_command(self, *args, **options):
+            start = time.perf_counter()
+            try:
+                return super().execute_command(*args, **options)
+            finally:
+                record_redis(time.perf_counter() - start)
+
+        def pipeline(self, transaction: bool = True, shard_hint=None):
+            return InstrumentedPipeline(self.connection_pool, self.response_callbacks, transaction, shard_hint)
+
+    return InstrumentedRedis
+
+
+class Histogram:
+    """固定分桶的直方图（线程安全）"""
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = list(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # 最后一个桶为 +Inf
+        self.count = 0
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        with self._lock:
+            self.counts[bisect.bisect_left(self.buckets, value)] += 1
+            self.count += 1
+            self.sum += value
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            cumulative, buckets = 0, {}
+            for bound, count in zip(self.buckets + ["+Inf"], self.counts):
+                cumulative += count
+                buckets[str(bound)] = cumulative
+            return {"count": self.count, "sum": round(self.sum, 3), "buckets": buckets}
+
+
+DURATION_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+
+class RequestMetrics:
+    """按路由聚合的请求耗时、数据库耗时、语句数和Redis往返次数"""
+
+    def __init__(self):
+        self._routes: Dict[str, Dict[str, Histogram]] = {}
+        self._n_plus_one: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def _route(self, route: str) -> Dict[str, Histogram]:
+        histograms = self._routes.get(route)
+        if histograms is None:
+            with self._lock:
+                histograms = self._routes.setdefault(route, {
+                    "duration_ms": Histogram(DURATION_BUCKETS_MS),
+                    "db_ms": Histogram(DURATION_BUCKETS_MS),
+                    "queries": Histogram(QUERY_BUCKETS),
+                    "redis_calls": Histogram(QUERY_BUCKETS),
+                })
+        return histograms
+
+    def observe(self, route: str, duration: float, stats: RequestStats):
+        histograms = self._route(route)
+        histograms["duration_ms"].observe(duration * 1000)
+        histograms["db_ms"].observe(stats.db_time * 1000)
+        histograms["queries"].observe(stats.queries)
+        histograms["redis_calls"].observe(stats.redis_calls)
+        if stats.n_plus_one is not None:
+            with self._lock:
+                self._n_plus_one[route] = self._n_plus_one.get(route, 0) + 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            routes = dict(self._routes)
+            n_plus_one = dict(self._n_plus_one)
+        return {
+            route: {
+                **{name: histogram.snapshot() for name, histogram in histograms.items()},
+                "n_plus_one": n_plus_one.get(route, 0)
+            }
+            for route, histograms in sorted(routes.items())
+        }
+
+
+request_metrics = RequestMetrics()
+
+
+_route_paths: Dict[Any, str] = {}
+
+
+def _route_path(scope) -> str:
+    """路由模板（如 /api/v1/cards/{card_id}），使用模板而不是实际路径，避免路径参数撑大统计"""
+    endpoint = scope.get("endpoint")
+    if endpoint is None:
+        return "unmatched"
+    path = _route_paths.get(endpoint)
+    if path is None:
+        for route in getattr(scope.get("app"), "routes", ()):
+            if getattr(route, "endpoint", None) is endpoint:
+                path = route.path
+                break
+        else:
+            path = f"{endpoint.__module__}.{endpoint.__name__}"
+        _route_paths[endpoint] = path
+    return path
+
+
+def match_route(scope) -> str:
+    """
+    在路由之前按请求匹配路由，返回路由模板（没有匹配时为 "unmatched"）
+
+    匹配结果（endpoint、path_params）写入 scope，之后的请求统计直接使用；路由器仍会重新匹配一次。
+    """
+    if scope.get("endpoint") is None:
+        for route in getattr(scope.get("app"), "routes", ()):
+            match, child_scope = route.matches(scope)
+            if match == Match.FULL:
+                scope.update(child_scope)
+                break
+    return _route_path(scope)
+
+
+def server_timing(stats: RequestStats, duration: float) -> str:
+    return ", ".join((
+        f'db;dur={stats.db_time * 1000:.1f};desc="{stats.queries} queries, {stats.replica_reads} on replica"',
+        f'redis;dur={stats.redis_time * 1000:.1f};desc="{stats.redis_calls} calls"',
+        f'cache;desc="hit={stats.cache_hits} miss={stats.cache_misses}"',
+        f"app;dur={duration * 1000:.1f}",
+    ))
+
+
+class InstrumentationMiddleware:
+    """
+    请求统计中间件（ASGI）
+
+    为每个请求统计SQL语句数、数据库耗时、Redis往返次数和缓存命中情况，
+    通过 Server-Timing 响应头返回，并按路由聚合到 request_metrics 和 Prometheus 指标。
+    流式响应的响应头先于响应体发送，其中只包含发送响应头之前的统计。
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats(scope=scope)
+        token = _current.set(stats)
+        start = time.perf_counter()
+        status_code = 500  # 没有发出响应就抛出异常时按500统计
+
+        async def send_with_timing(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                if settings.server_timing:
+                    header = server_timing(stats, time.perf_counter() - start)
+                    message = {**message, "headers": [*message.get("headers", []), (b"server-timing", header.encode())]}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+            duration = time.perf_counter() - start
+            method, path = scope["method"], _route_path(scope)
+            route = f"{method} {path}"
+            request_metrics.observe(route, duration, stats)
+            HTTP_REQUEST_DURATION.labels(method, path, str(status_code)).observe(duration)
+            HTTP_REQUEST_QUERIES.labels(method, path).observe(stats.queries)
+            if stats.n_plus_one is not None:
+                logger.warning(
+                    f"疑似N+1查询 {route}: 同一条SQL执行了 {stats.statements[stats.n_plus_one]} 次"
+                    f"（共 {stats.queries} 条）: {stats.n_plus_one}"
+                )
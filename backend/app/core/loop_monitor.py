@@ -0,0 +1,187 @@
+"""
+事件循环延迟监控与阻塞调用检测
+
+- 延迟采样：后台任务每隔 loop_lag_interval 秒 sleep 一次，实际唤醒比预期晚的时间就是事件循环延迟
+  （这段时间里有代码在事件循环上同步执行，例如 async 接口中的同步数据库、Redis 调用或 bcrypt 之类的CPU密集计算）。
+  最近一次的采样值用于过载保护，所有采样写入 taskly_event_loop_lag_seconds 指标。
+- 阻塞定位：监视线程发现采样任务超过 loop_stall_threshold 秒仍未被唤醒时，抓取事件循环线程当前的调用栈，
+  即正在阻塞事件循环的代码，写入日志并计入 taskly_event_loop_stalls。
+- 调试模式（loop_blocking_debug）：在 async 接口里于事件循环线程上执行的同步I/O（SQL、阻塞 socket 的读写、
+  time.sleep）计入 taskly_blocking_calls 并按 路由 + 代码位置 记录一次日志。同步接口在线程池中执行，不会被记录。
+
+日志通过 extra 带上 event、lag_ms、route、location、stack 等字段，使用结构化日志格式时可以直接检索。
+"""
+
+import asyncio
+import contextlib
+import logging
+import os
+import socket
+import sys
+import threading
+import time
+import traceback
+from typing import List, Optional, Set, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.core.config import settings
+from app.core.instrumentation import current_stats, match_route
+from app.core.metrics import BLOCKING_CALLS, EVENT_LOOP_LAG, EVENT_LOOP_STALLS
+
+logger = logging.getLogger(__name__)
+
+STACK_LIMIT = 30  # 日志中保留的调用栈帧数（最内层的帧）
+SOCKET_METHODS = ("connect", "send", "sendall", "recv", "recv_into")
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CORE_DIR = os.path.join(APP_DIR, "core")
+
+
+def _app_location(frames: List[traceback.FrameSummary]) -> str:
+    """调用栈中最内层的业务代码位置（app 目录下、app/core 之外），没有时取 app/core 之外最内层的代码"""
+    fallback = None
+    for frame in reversed(frames):
+        filename = os.path.abspath(frame.filename)
+        if filename.startswith(CORE_DIR):
+            continue
+        if filename.startswith(APP_DIR):
+            return f"{os.path.relpath(filename, os.path.dirname(APP_DIR))}:{frame.lineno} in {frame.name}"
+        fallback = fallback or f"{filename}:{frame.lineno} in {frame.name}"
+    return fallback or "unknown"
+
+
+class LoopLagMonitor:
+    """事件循环延迟采样和阻塞定位（在应用启动时 start，关闭时 stop）"""
+
+    def __init__(self, interval: float, stall_threshold: float):
+        self.interval = interval
+        self.stall_threshold = stall_threshold
+        self.lag = 0.0  # 最近一次采样的延迟（秒）
+        self._task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+        self._loop_thread: Optional[int] = None
+        self._deadline: Optional[float] = None  # 采样任务预期被唤醒的时间
+        self._reported_deadline: Optional[float] = None
+        self._reported_calls: Set[Tuple[str, str, str]] = set()
+        self._detector_installed = False
+
+    def start(self):
+        if self._task is not None or self.interval <= 0:
+            return
+        self._loop_thread = threading.get_ident()
+        self._task = asyncio.get_running_loop().create_task(self._run())
+        if self.stall_threshold > 0:
+            self._stopped.clear()
+            self._watchdog = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+            self._watchdog.start()
+        if settings.loop_blocking_debug:
+            self.install_blocking_detector()
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await self._task
+        self._task = None
+        self._stopped.set()
+        if self._watchdog is not None:
+            self._watchdog.join(timeout=1)
+            self._watchdog = None
+        self._deadline = None
+        self._loop_thread = None
+        self.lag = 0.0
+
+    async def _run(self):
+        while True:
+            self._deadline = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            self.lag = max(0.0, time.monotonic() - self._deadline)
+            EVENT_LOOP_LAG.observe(self.lag)
+            if self.stall_threshold > 0 and self.lag >= self.stall_threshold:
+                logger.warning(
+                    f"事件循环阻塞 {self.lag * 1000:.0f}ms",
+                    extra={"event": "event_loop_stall_end", "lag_ms": round(self.lag * 1000, 1)}
+                )
+
+    def _watch(self):
+        """监视线程：采样任务超时未被唤醒时抓取事件循环线程的调用栈（每次阻塞只记录一次）"""
+        check_interval = min(self.interval, self.stall_threshold) / 2
+        while not self._stopped.wait(check_interval):
+            deadline = self._deadline
+            if deadline is None or deadline == self._reported_deadline:
+                continue
+            overdue = time.monotonic() - deadline
+            if overdue < self.stall_threshold:
+                continue
+            self._reported_deadline = deadline
+            frame = sys._current_frames().get(self._loop_thread)
+            frames = traceback.extract_stack(frame)[-STACK_LIMIT:] if frame is not None else []
+            stack = traceback.format_list(frames)
+            location = _app_location(frames)
+            EVENT_LOOP_STALLS.inc()
+            logger.warning(
+                f"事件循环已阻塞 {overdue * 1000:.0f}ms，阻塞位置 {location}\n" + "".join(stack),
+                extra={"event": "event_loop_stall", "lag_ms": round(overdue * 1000, 1), "location": location, "stack": stack}
+            )
+
+    def install_blocking_detector(self):
+        """调试模式：检测 async 接口中在事件循环上执行的同步I/O（安装后不可卸载，只用于调试）"""
+        if self._detector_installed:
+            return
+        self._detector_installed = True
+
+        @event.listens_for(Engine, "before_cursor_execute")
+        def _sql(conn, cursor, statement, parameters, context, executemany):
+            self.report_blocking_call("sql")
+
+        for name in SOCKET_METHODS:
+            original = getattr(socket.socket, name)
+
+            def blocking_socket_call(sock, *args, _original=original, _name=name, **kwargs):
+                # asyncio 使用的非阻塞 socket（timeout 为0）不算
+                if sock.gettimeout() != 0.0:
+                    self.report_blocking_call(f"socket.{_name}")
+                return _original(sock, *args, **kwargs)
+
+            setattr(socket.socket, name, blocking_socket_call)
+
+        original_sleep = time.sleep
+
+        def blocking_sleep(seconds):
+            self.report_blocking_call("time.sleep")
+            return original_sleep(seconds)
+
+        time.sleep = blocking_sleep
+        logger.warning("已开启阻塞调用检测（loop_blocking_debug），仅用于调试")
+
+    def report_blocking_call(self, kind: str):
+        """记录一次在事件循环线程上、请求处理过程中执行的同步I/O"""
+        if self._loop_thread is None or threading.get_ident() != self._loop_thread:
+            return
+        stats = current_stats()
+        if stats is None or stats.scope is None:
+            return
+        route = f"{stats.scope['method']} {match_route(stats.scope)}"
+        BLOCKING_CALLS.labels(route, kind).inc()
+        frames = traceback.extract_stack()[:-2][-STACK_LIMIT:]
+        location = _app_location(frames)
+        key = (route, kind, location)
+        if key in self._reported_calls:
+            return
+        self._reported_calls.add(key)
+        logger.warning(
+            f"async 接口 {route} 在事件循环上执行了同步I/O（{kind}）: {location}",
+            extra={
+                "event": "blocking_call",
+                "route": route,
+                "kind": kind,
+                "location": location,
+                "stack": traceback.format_list(frames),
+            }
+        )
+
+
+loop_monitor = LoopLagMonitor(settings.loop_lag_interval, settings.loop_stall_threshold)
@@ -0,0 +1,180 @@
+"""
+Prometheus 指标
+
+多个 uvicorn worker（或 Celery 子进程）同时运行时，需要在启动前设置环境变量
+PROMETHEUS_MULTIPROC_DIR 指向一个每次启动都清空的目录：各进程把指标写入该目录下的文件，
+/metrics 抓取时合并所有进程的数据。未设置时只导出当前进程的指标。
+"""
+
+import logging
+import os
+from typing import TYPE_CHECKING, Optional, Tuple
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess
+)
+from prometheus_client.core import GaugeMetricFamily
+
+from app.core.config import settings
+
+if TYPE_CHECKING:
+    import redis
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+POOL_WAIT_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0)
+TASK_BUCKETS = (0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0, 1800.0)
+
+HTTP_REQUEST_DURATION = Histogram(
+    "taskly_http_request_duration_seconds", "HTTP请求耗时（按路由模板）",
+    ["method", "route", "status"], buckets=LATENCY_BUCKETS
+)
+HTTP_REQUEST_QUERIES = Histogram(
+    "taskly_http_request_db_queries", "每个HTTP请求执行的SQL语句数",
+    ["method", "route"], buckets=(0, 1, 2, 5, 10, 20, 50, 100)
+)
+DB_POOL_CHECKOUT_WAIT = Histogram(
+    "taskly_db_pool_checkout_wait_seconds", "从连接池获取数据库连接的等待时间",
+    buckets=POOL_WAIT_BUCKETS
+)
+DB_POOL_TIMEOUTS = Counter(
+    "taskly_db_pool_timeouts", "等待连接超过 db_pool_timeout 而失败的次数"
+)
+DB_POOL_IN_USE = Gauge(
+    "taskly_db_pool_connections_in_use", "已从连接池取出、正在使用的连接数（各进程之和）", multiprocess_mode="livesum"
+)
+DB_POOL_CAPACITY = Gauge(
+    "taskly_db_pool_capacity", "连接池最大连接数 pool_size + max_overflow（各进程之和）", multiprocess_mode="livesum"
+)
+DB_REPLICA_LAG = Gauge(
+    "taskly_db_replica_lag_seconds", "只读副本最近一次测量的复制延迟（-1 表示不可用）", ["replica"],
+    multiprocess_mode="max"
+)
+CACHE_REQUESTS = Counter(
+    "taskly_cache_requests", "缓存读取次数（按键前缀和命中结果）", ["prefix", "result"]
+)
+IDEMPOTENCY_REQUESTS = Counter(
+    "taskly_idempotency_requests", "带 Idempotency-Key 的请求数（stored/replayed/in_progress/mismatch）", ["result"]
+)
+RATE_LIMITED_REQUESTS = Counter(
+    "taskly_rate_limited_requests", "被限流拒绝（429）的请求数（按路由和耗尽的令牌桶 user/route）", ["route", "bucket"]
+)
+RATE_LIMIT_FALLBACK = Gauge(
+    "taskly_rate_limit_fallback", "Redis 不可用、限流改用进程内令牌桶的进程数", multiprocess_mode="livesum"
+)
+LOAD_SHED_REQUESTS = Counter(
+    "taskly_load_shed_requests", "过载保护拒绝（503）的请求数（按原因 loop_lag/pool_wait）", ["reason"]
+)
+LOAD_SHEDDING = Gauge(
+    "taskly_load_shedding", "正在拒绝新请求（过载保护）的进程数", multiprocess_mode="livesum"
+)
+EVENT_LOOP_LAG = Histogram(
+    "taskly_event_loop_lag_seconds", "事件循环延迟采样（定时器实际唤醒比预期晚的时间）",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+)
+EVENT_LOOP_STALLS = Counter(
+    "taskly_event_loop_stalls", "事件循环被阻塞超过 loop_stall_threshold 的次数（每次记录阻塞位置的调用栈）"
+)
+BLOCKING_CALLS = Counter(
+    "taskly_blocking_calls", "async 接口在事件循环上执行的同步I/O次数（仅 loop_blocking_debug 开启时统计）",
+    ["route", "kind"]
+)
+WEBSOCKET_CONNECTIONS = Gauge(
+    "taskly_websocket_connections", "当前WebSocket连接数", multiprocess_mode="livesum"
+)
+WEBSOCKET_BROADCAST_DURATION = Histogram(
+    "taskly_websocket_broadcast_duration_seconds", "一条消息广播到项目所有连接的耗时",
+    buckets=LATENCY_BUCKETS
+)
+WEBSOCKET_MESSAGES_SENT = Counter(
+    "taskly_websocket_messages_sent", "WebSocket发送的消息数（广播按接收连接计数）"
+)
+CELERY_TASK_DURATION = Histogram(
+    "taskly_celery_task_duration_seconds", "Celery任务执行耗时（按队列）",
+    ["queue", "task", "state"], buckets=TASK_BUCKETS
+)
+
+
+def cache_prefix(key: str) -> str:
+    """缓存键的前缀（第一个冒号之前的部分），作为指标标签避免基数过大"""
+    return key.split(":", 1)[0]
+
+
+def record_cache_request(key: str, hit: bool):
+    CACHE_REQUESTS.labels(cache_prefix(key), "hit" if hit else "miss").inc()
+
+
+class CeleryQueueCollector:
+    """
+    抓取时读取 Celery broker（Redis）中各队列积压的消息数
+
+    broker 为每个优先级使用单独的列表（队列名、队列名:1 ... 队列名:9），积压数为各列表长度之和。
+    broker 不可用时不导出该指标，只在 可用/不可用 状态变化时记录一次日志。
+    """
+
+    def __init__(self):
+        self._client: Optional["redis.Redis"] = None
+        self._failing = False
+
+    def _broker(self) -> "redis.Redis":
+        if self._client is None:
+            import redis
+            self._client = redis.Redis.from_url(
+                settings.celery_broker_url, socket_timeout=1, socket_connect_timeout=1
+            )
+        return self._client
+
+    def collect(self):
+        from app.core.celery_app import TASK_QUEUES, PRIORITY_STEPS
+
+        depth = GaugeMetricFamily("taskly_celery_queue_depth", "Celery队列中等待执行的任务数", labels=["queue"])
+        try:
+            pipe = self._broker().pipeline(transaction=False)
+            for queue in TASK_QUEUES:
+                for priority in PRIORITY_STEPS:
+                    pipe.llen(f"{queue}:{priority}" if priority else queue)
+            lengths = pipe.execute()
+        except Exception as e:
+            if not self._failing:
+                self._failing = True
+                logger.warning(f"Celery queue depth unavailable: {e}")
+            return
+        if self._failing:
+            self._failing = False
+            logger.info("Celery queue depth available again")
+        steps = len(PRIORITY_STEPS)
+        for i, queue in enumerate(TASK_QUEUES):
+            depth.add_metric([queue], sum(lengths[i * steps:(i + 1) * steps]))
+        yield depth
+
+
+_queue_registry = CollectorRegistry(auto_describe=False)
+_queue_registry.register(CeleryQueueCollector())
+
+
+def multiprocess_enabled() -> bool:
+    return bool(os.environ.get("PROMETHEUS_MULTIPROC_DIR"))
+
+
+def process_registry() -> CollectorRegistry:
+    """多进程模式下合并所有进程写入的指标，否则使用当前进程的默认注册表"""
+    if multiprocess_enabled():
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return registry
+    return REGISTRY
+
+
+def render_metrics(include_queues: bool = True) -> Tuple[bytes, str]:
+    """生成 Prometheus 文本格式的指标，返回 (内容, Content-Type)"""
+    output = generate_latest(process_registry())
+    if include_queues:
+        output += generate_latest(_queue_registry)
+    return output, CONTENT_TYPE_LATEST
+
+
+def mark_process_dead():
+    """进程退出时清理多进程模式下该进程的实时指标（连接数等）"""
+    if multiprocess_enabled():
+        multiprocess.mark_process_dead(os.getpid())
@@ -0,0 +1,235 @@
+"""
+限流与过载保护
+
+每个请求检查两个令牌桶：用户的总请求速度（rate_limit_user_*）和用户对当前接口的请求速度
+（rate_limit_route_*，可按接口在 rate_limit_routes 中覆盖）。未登录的请求按客户端IP计算。
+两个桶在 Redis 中由一个 Lua 脚本原子地检查和扣减，多个 worker 共享同一个额度；
+Redis 不可用时改用进程内的令牌桶（额度按进程计算），每隔 REDIS_RETRY_INTERVAL 秒重新尝试 Redis。
+令牌不足时返回429和 Retry-After。
+
+过载保护先于限流检查：事件循环延迟（app.core.loop_monitor）或最近获取数据库连接的平均等待
+（app.core.instrumentation.pool_wait）超过阈值时，新请求直接返回503和 Retry-After，
+让已经在处理的请求先完成，而不是所有请求一起变慢。/health 和 /metrics 不受影响。
+"""
+
+import logging
+import math
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse
+
+from app.core.config import settings
+from app.core.instrumentation import match_route, pool_wait
+from app.core.loop_monitor import loop_monitor
+from app.core.metrics import LOAD_SHED_REQUESTS, LOAD_SHEDDING, RATE_LIMIT_FALLBACK, RATE_LIMITED_REQUESTS
+from app.core.redis import redis_client
+from app.core.security import bearer_user_id
+
+logger = logging.getLogger(__name__)
+
+EXEMPT_PATHS = {"/", "/health", "/metrics"}
+REDIS_RETRY_INTERVAL = 5.0
+
+# KEYS: 令牌桶；ARGV: 每个桶的 速度, 容量 依次排列。所有桶都有令牌时各扣一个，
+# 返回 {是否允许, 令牌不足的桶的序号（从1开始，允许时为0）, 需要等待的秒数}
+TOKEN_BUCKET_SCRIPT = """
+local now_parts = redis.call('TIME')
+local now = tonumber(now_parts[1]) + tonumber(now_parts[2]) / 1000000
+local tokens = {}
+local denied, retry_after = 0, 0
+for i, key in ipairs(KEYS) do
+    local rate = tonumber(ARGV[i * 2 - 1])
+    local capacity = tonumber(ARGV[i * 2])
+    local bucket = redis.call('HMGET', key, 'tokens', 'ts')
+    local available = tonumber(bucket[1]) or capacity
+    local elapsed = math.max(0, now - (tonumber(bucket[2]) or now))
+    available = math.min(capacity, available + elapsed * rate)
+    tokens[i] = available
+    if available < 1 and (1 - available) / rate > retry_after then
+        denied, retry_after = i, (1 - available) / rate
+    end
+end
+for i, key in ipairs(KEYS) do
+    local rate = tonumber(ARGV[i * 2 - 1])
+    local capacity = tonumber(ARGV[i * 2])
+    local available = tokens[i]
+    if denied == 0 then
+        available = available - 1
+    end
+    redis.call('HSET', key, 'tokens', tostring(available), 'ts', tostring(now))
+    redis.call('EXPIRE', key, math.ceil(capacity / rate) + 1)
+end
+return {denied == 0 and 1 or 0, denied, tostring(retry_after)}
+"""
+
+
+@dataclass
+class Limit:
+    rate: float  # 每秒补充的令牌数
+    burst: int  # 令牌桶容量
+
+
+@dataclass
+class LocalBucket:
+    tokens: float
+    updated: float
+
+
+class LocalTokenBuckets:
+    """进程内令牌桶（Redis 不可用时使用）"""
+
+    def __init__(self, max_buckets: int = 10000):
+        self.max_buckets = max_buckets
+        self._buckets: Dict[str, LocalBucket] = {}
+        self._lock = threading.Lock()
+
+    def take(self, buckets: List[Tuple[str, Limit]]) -> Tuple[bool, int, float]:
+        now = time.monotonic()
+        with self._lock:
+            states = []
+            denied, retry_after = 0, 0.0
+            for index, (key, limit) in enumerate(buckets, start=1):
+                bucket = self._buckets.get(key)
+                if bucket is None:
+                    bucket = self._buckets[key] = LocalBucket(tokens=limit.burst, updated=now)
+                bucket.tokens = min(limit.burst, bucket.tokens + (now - bucket.updated) * limit.rate)
+                bucket.updated = now
+                states.append(bucket)
+                if bucket.tokens < 1 and (1 - bucket.tokens) / limit.rate > retry_after:
+                    denied, retry_after = index, (1 - bucket.tokens) / limit.rate
+            if denied == 0:
+                for bucket in states:
+                    bucket.tokens -= 1
+            if len(self._buckets) > self.max_buckets:
+                self._evict(now)
+        return denied == 0, denied, retry_after
+
+    def _evict(self, now: float):
+        # 删除长时间没有请求的桶（已经补满，删除后重新创建的效果相同）
+        idle = [key for key, bucket in self._buckets.items() if now - bucket.updated > 60]
+        for key in idle:
+            del self._buckets[key]
+
+
+class RateLimiter:
+    """令牌桶限流：优先使用 Redis（多个 worker 共享额度），失败时使用进程内令牌桶"""
+
+    def __init__(self, client, prefix: str = "ratelimit"):
+        self.client = client
+        self.prefix = prefix
+        self.local = LocalTokenBuckets()
+        self._script = None
+        self._redis_retry_at = 0.0
+
+    def limits(self, route: str) -> Tuple[Limit, Limit]:
+        """(用户总额度, 用户在该接口的额度)，route 为 "方法 路由模板" """
+        user = Limit(settings.rate_limit_user_rate, settings.rate_limit_user_burst)
+        override = settings.rate_limit_routes.get(route)
+        if override:
+            return user, Limit(override[0], int(override[1]))
+        return user, Limit(settings.rate_limit_route_rate, settings.rate_limit_route_burst)
+
+    def take(self, subject: str, route: str) -> Tuple[bool, int, float]:
+        """消耗一个令牌，返回 (是否允许, 令牌不足的桶 1=用户 2=接口, 需要等待的秒数)"""
+        user_limit, route_limit = self.limits(route)
+        buckets = [
+            (f"{self.prefix}:{subject}", user_limit),
+            (f"{self.prefix}:{subject}:{route}", route_limit),
+        ]
+        if time.monotonic() >= self._redis_retry_at:
+            try:
+                result = self._take_redis(buckets)
+                if self._redis_retry_at:
+                    self._redis_retry_at = 0.0
+                    RATE_LIMIT_FALLBACK.set(0)
+                    logger.info("Rate limiter is using Redis again")
+                return result
+            except Exception as e:
+                if not self._redis_retry_at:
+                    RATE_LIMIT_FALLBACK.set(1)
+                    logger.warning(f"Rate limiter falling back to in-process buckets: {e}")
+                self._redis_retry_at = time.monotonic() + REDIS_RETRY_INTERVAL
+        return self.local.take(buckets)
+
+    def _take_redis(self, buckets: List[Tuple[str, Limit]]) -> Tuple[bool, int, float]:
+        if self._script is None:
+            self._script = self.client.register_script(TOKEN_BUCKET_SCRIPT)
+        args = []
+        for _, limit in buckets:
+            args.extend([limit.rate, limit.burst])
+        allowed, denied, retry_after = self._script(keys=[key for key, _ in buckets], args=args)
+        return bool(allowed), int(denied), float(retry_after)
+
+
+rate_limiter = RateLimiter(redis_client)
+
+
+def overload_reason() -> Optional[str]:
+    """当前是否应拒绝新请求，返回原因（loop_lag/pool_wait），正常时返回 None"""
+    if settings.load_shed_loop_lag > 0 and loop_monitor.lag > settings.load_shed_loop_lag:
+        return "loop_lag"
+    if settings.load_shed_pool_wait > 0 and pool_wait.value > settings.load_shed_pool_wait:
+        return "pool_wait"
+    return None
+
+
+class RateLimitMiddleware:
+    """限流与过载保护中间件（ASGI）"""
+
+    def __init__(self, app, limiter: RateLimiter = rate_limiter):
+        self.app = app
+        self.limiter = limiter
+        self._shedding = False
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] == "OPTIONS" or scope["path"] in EXEMPT_PATHS:
+            await self.app(scope, receive, send)
+            return
+
+        if settings.load_shedding_enabled:
+            reason = overload_reason()
+            self._set_shedding(reason is not None)
+            if reason is not None:
+                LOAD_SHED_REQUESTS.labels(reason).inc()
+                response = JSONResponse(
+                    status_code=503,
+                    content={"detail": "Server is overloaded, please retry"},
+                    headers={"Retry-After": "1"}
+                )
+                await response(scope, receive, send)
+                return
+
+        if settings.rate_limit_enabled:
+            route = f"{scope['method']} {match_route(scope)}"
+            subject = bearer_user_id(Headers(scope=scope).get("authorization"))
+            if subject is None:
+                client = scope.get("client")
+                subject = f"ip:{client[0] if client else 'unknown'}"
+            allowed, denied, retry_after = self.limiter.take(subject, route)
+            if not allowed:
+                RATE_LIMITED_REQUESTS.labels(route, "user" if denied == 1 else "route").inc()
+                response = JSONResponse(
+                    status_code=429,
+                    content={"detail": "Too many requests, please slow down"},
+                    headers={"Retry-After": str(max(1, math.ceil(retry_after)))}
+                )
+                await response(scope, receive, send)
+                return
+
+        await self.app(scope, receive, send)
+
+    def _set_shedding(self, shedding: bool):
+        if shedding != self._shedding:
+            self._shedding = shedding
+            LOAD_SHEDDING.set(1 if shedding else 0)
+            if shedding:
+                logger.warning(
+                    f"Load shedding started: event loop lag {loop_monitor.lag:.3f}s, "
+                    f"pool wait {pool_wait.value:.3f}s"
+                )
+            else:
+                logger.info("Load shedding stopped")
@@ -1,15 +1,52 @@
-import redis
+import hashlib
+import threading
+from typing import TYPE_CHECKING
 from app.core.config import settings
+from app.core.instrumentation import record_cache
+
+if TYPE_CHECKING:
+    import redis
+
+
+class LazyRedis:
+    """
+    第一次使用时才创建的Redis客户端
+
+    导入模块时既不导入 redis 库也不创建连接池，属性访问全部转发给实际的客户端。
+    """
+    
+    def __init__(self):
+        self._client = None
+        self._lock = threading.Lock()
+    
+    @property
+    def client(self) -> "redis.Redis":
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    from app.core.instrumentation import instrumented_redis_class
+                    self._client = instrumented_redis_class().from_url(
+                        settings.redis_url,
+                        db=settings.redis_db,
+                        decode_responses=True,
+                        socket_timeout=5,
+                        socket_connect_timeout=5,
+                        retry_on_timeout=True
+                    )
+        return self._client
+    
+    def __getattr__(self, name: str):
+        return getattr(self.client, name)
+    
+    def close(self):
+        """关闭连接池（未创建时不做任何事）"""
+        if self._client is not None:
+            self._client.close()
+            self._client = None
+
 
 # 创建Redis连接
-redis_client = redis.from_url(
-    settings.redis_url,
-    db=settings.redis_db,
-    decode_responses=True,
-    socket_timeout=5,
-    socket_connect_timeout=5,
-    retry_on_timeout=True
-)
+redis_client = LazyRedis()
 
 
 def get_redis():
@@ -20,7 +57,7 @@ def get_redis():
 class RedisCache:
     """Redis缓存管理器"""
     
-    def __init__(self, redis_client: redis.Redis):
+    def __init__(self, redis_client: "redis.Redis"):
         self.client = redis_client
         self.default_ttl = 3600  # 1小时
     
@@ -29,7 +66,10 @@ class RedisCache:
         try:
             if ttl is None:
                 ttl = self.default_ttl
-            return self.client.setex(key, ttl, str(value))
+            # 已编码的JSON字节原样写入
+            if not isinstance(value, (bytes, str)):
+                value = str(value)
+            return self.client.setex(key, ttl, value)
         except Exception as e:
             print(f"Redis set error: {e}")
             return False
@@ -38,6 +78,7 @@ class RedisCache:
         """获取缓存"""
         try:
             value = self.client.get(key)
+            record_cache(key, value is not None)
             return value if value is not None else None
         except Exception as e:
             print(f"Redis get error: {e}")
@@ -62,6 +103,42 @@ class RedisCache:
             print(f"Redis clear pattern error: {e}")
             return 0
 
+    
+    def set_response(self, key: str, body: bytes, etag: str = None, ttl: int = None) -> str:
+        """缓存编码后的响应体和ETag（默认为内容哈希），返回ETag"""
+        if etag is None:
+            etag = f'"{hashlib.sha1(body).hexdigest()}"'
+        try:
+            pipe = self.client.pipeline()
+            pipe.delete(key)
+            pipe.hset(key, mapping={"body": body, "etag": etag})
+            pipe.expire(key, ttl if ttl is not None else self.default_ttl)
+            pipe.execute()
+        except Exception as e:
+            print(f"Redis set response error: {e}")
+        return etag
+    
+    def get_response(self, key: str):
+        """获取缓存的响应，返回 (body, etag)，不存在时返回None"""
+        try:
+            body, etag = self.client.hmget(key, "body", "etag")
+            if body is None or etag is None:
+                record_cache(key, False)
+                return None
+            record_cache(key, True)
+            return body, etag
+        except Exception as e:
+            print(f"Redis get response error: {e}")
+            return None
+    
+    def get_etag(self, key: str):
+        """只获取缓存响应的ETag（用于 If-None-Match 比较，不读取响应体）"""
+        try:
+            return self.client.hget(key, "etag")
+        except Exception as e:
+            print(f"Redis get etag error: {e}")
+            return None
+
 
 # 创建缓存实例
 cache = RedisCache(redis_client)
\ No newline at end of file
@@ -0,0 +1,189 @@
+"""
+只读副本路由
+
+配置 database_replica_urls 后，只读接口（依赖 get_read_db）的查询发送到副本，其余查询和所有写入仍走主库：
+- 用户提交写入后的 replica_sticky_seconds 秒内，该用户的读请求全部走主库（读到自己的写入）；
+- 每个副本连接在取出时（最多每 replica_lag_check_interval 秒一次）测量复制延迟，
+  延迟超过 replica_max_lag_seconds 或无法连接的副本暂时不再使用，没有可用副本时回到主库；
+- 从副本读出的数据写入缓存时，缓存时间缩短为 replica_cache_ttl，避免把延迟的数据长时间缓存。
+"""
+
+import logging
+import math
+import random
+import threading
+import time
+from dataclasses import dataclass
+from typing import List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import Select
+
+from app.core.config import settings
+from app.core.instrumentation import current_stats
+from app.core.metrics import DB_REPLICA_LAG
+
+logger = logging.getLogger(__name__)
+
+STICKY_KEY = "replica:sticky:user:{user_id}"
+
+
+@dataclass
+class Replica:
+    name: str
+    engine: Engine
+    lag: float = 0.0  # 最近一次测量的复制延迟（秒），无法连接或复制中断时为 inf
+    checked_at: float = 0.0
+
+    def available(self) -> bool:
+        # 延迟过大的副本在下一个检查周期后重新尝试
+        if self.lag <= settings.replica_max_lag_seconds:
+            return True
+        return time.monotonic() - self.checked_at >= settings.replica_lag_check_interval
+
+
+_replicas: List[Replica] = []
+_lock = threading.Lock()
+
+
+def replicas_enabled() -> bool:
+    return bool(_replicas)
+
+
+def _measure_lag(dbapi_connection, dialect_name: str) -> float:
+    """查询副本的复制延迟（秒）；不是副本或不支持的数据库（如 SQLite）返回0，复制中断返回 inf"""
+    cursor = dbapi_connection.cursor()
+    try:
+        if dialect_name == "mysql":
+            try:
+                cursor.execute("SHOW REPLICA STATUS")
+            except Exception:
+                cursor.execute("SHOW SLAVE STATUS")  # MySQL 8.0.22 之前及 MariaDB
+            row = cursor.fetchone()
+            if row is None:
+                return 0.0
+            status = dict(zip([column[0] for column in cursor.description], row))
+            lag = status.get("Seconds_Behind_Source", status.get("Seconds_Behind_Master"))
+            return math.inf if lag is None else float(lag)
+        if dialect_name == "postgresql":
+            cursor.execute(
+                "SELECT CASE WHEN pg_is_in_recovery() "
+                "THEN COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) ELSE 0 END"
+            )
+            return float(cursor.fetchone()[0])
+        return 0.0
+    finally:
+        cursor.close()
+
+
+def register_replica(engine: Engine, name: str):
+    """登记副本引擎：连接取出时测量延迟，连接失败时暂停使用"""
+    replica = Replica(name=name, engine=engine)
+
+    @event.listens_for(engine, "checkout")
+    def _check_lag(dbapi_connection, connection_record, connection_proxy):
+        # 延迟按连接记录，同时更新副本最近一次的测量值（用于选择副本）
+        now = time.monotonic()
+        if now - connection_record.info.get("lag_checked_at", 0.0) < settings.replica_lag_check_interval:
+            return
+        try:
+            lag = _measure_lag(dbapi_connection, engine.dialect.name)
+        except Exception as e:
+            logger.warning(f"测量副本 {name} 复制延迟失败: {e}")
+            lag = math.inf
+        connection_record.info["lag_checked_at"] = now
+        connection_record.info["replica_lag"] = lag
+        replica.lag, replica.checked_at = lag, now
+        DB_REPLICA_LAG.labels(name).set(lag if lag != math.inf else -1)
+        if lag > settings.replica_max_lag_seconds:
+            logger.warning(f"副本 {name} 复制延迟 {lag}s，超过 {settings.replica_max_lag_seconds}s，暂时改用主库")
+
+    @event.listens_for(engine, "handle_error")
+    def _on_error(exception_context):
+        if exception_context.is_disconnect or exception_context.connection is None:
+            replica.lag, replica.checked_at = math.inf, time.monotonic()
+            DB_REPLICA_LAG.labels(name).set(-1)
+
+    with _lock:
+        _replicas.append(replica)
+
+
+def _choose_replica() -> Optional[Replica]:
+    candidates = [replica for replica in _replicas if replica.available()]
+    return random.choice(candidates) if candidates else None
+
+
+class RoutingSession(Session):
+    """
+    按语句选择引擎的会话
+
+    只有 info["use_replica"] 为真（由 get_read_db 设置）的会话才会把普通 SELECT 发送到副本，
+    一个会话内固定使用同一个副本；flush、SELECT ... FOR UPDATE 以及会话写入之后的查询都走主库。
+    """
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if (
+            self.info.get("use_replica")
+            and not self._flushing
+            and isinstance(clause, Select)
+            and clause._for_update_arg is None
+        ):
+            replica = self.info.get("replica")
+            if replica is None or not replica.available():
+                replica = self.info["replica"] = _choose_replica()
+            if replica is not None:
+                stats = current_stats()
+                if stats is not None:
+                    stats.replica_reads += 1
+                return replica.engine
+        return super().get_bind(mapper=mapper, clause=clause, **kw)
+
+
+def use_replica(db: Session, user_id: int):
+    """允许会话的只读查询使用副本（用户最近有写入时仍走主库）"""
+    if not _replicas:
+        return
+    from app.core.redis import redis_client
+    try:
+        sticky = redis_client.exists(STICKY_KEY.format(user_id=user_id))
+    except Exception as e:
+        logger.warning(f"读取副本粘滞标记失败: {e}")
+        return
+    if not sticky:
+        db.info["use_replica"] = True
+
+
+def cache_ttl(ttl: int) -> int:
+    """当前请求从副本读取过数据时缩短缓存时间"""
+    stats = current_stats()
+    if stats is not None and stats.replica_reads:
+        return min(ttl, settings.replica_cache_ttl)
+    return ttl
+
+
+@event.listens_for(Session, "after_flush")
+def _record_write(session: Session, flush_context):
+    # 写入之后同一会话的查询都走主库
+    session.info["replica_wrote"] = True
+    session.info.pop("use_replica", None)
+
+
+@event.listens_for(Session, "after_commit")
+def _stick_to_primary(session: Session):
+    if not session.info.pop("replica_wrote", False) or not _replicas:
+        return
+    user_id = session.info.get("user_id")
+    if user_id is None:
+        return
+    from app.core.redis import redis_client
+    try:
+        redis_client.set(STICKY_KEY.format(user_id=user_id), 1, px=int(settings.replica_sticky_seconds * 1000))
+    except Exception as e:
+        logger.warning(f"设置副本粘滞标记失败: {e}")
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_write(session: Session):
+    session.info.pop("replica_wrote", None)
@@ -68,4 +68,14 @@ class PasswordManager:
 
 # 创建JWT和密码管理器实例
 jwt_manager = JWTManager(settings.secret_key, settings.algorithm)
-password_manager = PasswordManager()
\ No newline at end of file
+password_manager = PasswordManager()
+
+
+def bearer_user_id(authorization: Optional[str]) -> Optional[str]:
+    """从 Authorization 请求头的 Bearer 令牌中取用户ID（只校验签名和有效期，不查询数据库），令牌无效时返回 None"""
+    if not authorization or not authorization.lower().startswith("bearer "):
+        return None
+    try:
+        return jwt_manager.verify_token(authorization[7:].strip()).get("sub")
+    except Exception:
+        return None
\ No newline at end of file
@@ -0,0 +1,56 @@
+from typing import Any, Dict, Optional, Union
+import orjson
+from fastapi import Response
+from sqlalchemy import literal
+
+
+def dumps(data: Any) -> bytes:
+    """编码为JSON字节（orjson 原生支持 datetime/date，输出与 isoformat() 一致）"""
+    return orjson.dumps(data)
+
+
+def labeled(prefix: str, *columns):
+    """给列加上 "{prefix}__{列名}" 标签，配合 nested_row 组装嵌套对象"""
+    return [column.label(f"{prefix}__{column.key}") for column in columns]
+
+
+def user_columns(model, prefix: str):
+    """用户公开字段（与 UserResponse 一致），model 可以是 User 或 aliased(User)"""
+    return labeled(
+        prefix,
+        model.id,
+        model.email,
+        model.username,
+        model.full_name,
+        model.avatar_url,
+        model.created_at,
+        model.updated_at
+    ) + [
+        # users 表没有 is_active 列，与 UserResponse 的默认值保持一致
+        literal(True).label(f"{prefix}__is_active")
+    ]
+
+
+def nested_row(row) -> Dict[str, Any]:
+    """把按列查询的行转成字典，"owner__id" 这类带标签的列组装为嵌套对象"""
+    data: Dict[str, Any] = {}
+    for key, value in row._mapping.items():
+        nested, sep, field = key.partition("__")
+        if sep:
+            data.setdefault(nested, {})[field] = value
+        else:
+            data[key] = value
+    return data
+
+
+class RawJSONResponse(Response):
+    media_type = "application/json"
+
+
+def json_response(
+    content: Union[bytes, str],
+    status_code: int = 200,
+    headers: Optional[Dict[str, str]] = None
+) -> Response:
+    """直接返回已编码的JSON，不再经过 response_model 校验和重新编码"""
+    return RawJSONResponse(content=content, status_code=status_code, headers=headers)
@@ -0,0 +1,124 @@
+import os
+import queue
+import smtplib
+import threading
+from contextlib import contextmanager
+from typing import Optional
+import logging
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class SMTPConnectionPool:
+    """SMTP连接池
+
+    每个worker进程持有若干已完成 STARTTLS 和登录的连接，
+    取用前通过 NOOP 检查连接是否仍然可用，失效的连接会被丢弃并重建。
+    """
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        username: Optional[str] = None,
+        password: Optional[str] = None,
+        use_tls: bool = True,
+        timeout: int = 10,
+        max_size: int = 4
+    ):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.use_tls = use_tls
+        self.timeout = timeout
+        self.max_size = max_size
+        self._idle: "queue.LifoQueue[smtplib.SMTP]" = queue.LifoQueue(maxsize=max_size)
+        self._slots = threading.BoundedSemaphore(max_size)
+
+    def _connect(self) -> smtplib.SMTP:
+        """创建新的已认证连接"""
+        server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        if self.use_tls:
+            server.starttls()
+        if self.username:
+            server.login(self.username, self.password)
+        return server
+
+    @staticmethod
+    def _is_alive(server: smtplib.SMTP) -> bool:
+        try:
+            return server.noop()[0] == 250
+        except smtplib.SMTPException:
+            return False
+        except OSError:
+            return False
+
+    @staticmethod
+    def _close(server: smtplib.SMTP):
+        try:
+            server.quit()
+        except Exception:
+            server.close()
+
+    @contextmanager
+    def connection(self):
+        """借出一个连接，发送失败时连接不会归还到池中"""
+        self._slots.acquire()
+        server = None
+        try:
+            while server is None:
+                try:
+                    candidate = self._idle.get_nowait()
+                except queue.Empty:
+                    server = self._connect()
+                    break
+                if self._is_alive(candidate):
+                    server = candidate
+                else:
+                    self._close(candidate)
+
+            yield server
+
+            self._idle.put_nowait(server)
+        except Exception:
+            if server is not None:
+                self._close(server)
+            raise
+        finally:
+            self._slots.release()
+
+    def close_all(self):
+        """关闭池中所有空闲连接"""
+        while True:
+            try:
+                self._close(self._idle.get_nowait())
+            except queue.Empty:
+                break
+
+
+_pool: Optional[SMTPConnectionPool] = None
+_pool_pid: Optional[int] = None
+_pool_lock = threading.Lock()
+
+
+def get_smtp_pool() -> SMTPConnectionPool:
+    """获取当前进程的SMTP连接池（fork之后会重新创建）"""
+    global _pool, _pool_pid
+    pid = os.getpid()
+    if _pool is None or _pool_pid != pid:
+        with _pool_lock:
+            if _pool is None or _pool_pid != pid:
+                _pool = SMTPConnectionPool(
+                    host=settings.smtp_server,
+                    port=settings.smtp_port,
+                    username=settings.smtp_username,
+                    password=settings.smtp_password,
+                    use_tls=settings.smtp_use_tls,
+                    timeout=settings.smtp_timeout,
+                    max_size=settings.smtp_pool_size
+                )
+                _pool_pid = pid
+    return _pool
@@ -1,14 +1,45 @@
-from fastapi import FastAPI, Depends
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Depends, Request, Response
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.orm.exc import StaleDataError
 from app.core.config import settings
-from app.core.database import engine, Base
+from app.core.idempotency import IdempotencyMiddleware
+from app.core.loop_monitor import loop_monitor
+from app.core.rate_limit import RateLimitMiddleware
+from app.core.database import engine, replica_engines
 from app.core.redis import redis_client
-from app.api.v1.endpoints import auth, projects, lists, cards, users
+from app.core.instrumentation import InstrumentationMiddleware, request_metrics, warm_up_pool
+from app.core.metrics import mark_process_dead, render_metrics
+from app.api.v1.endpoints import auth, projects, lists, cards, users, notifications, search
 from app.api.v1.websocket import websocket_manager
-import uvicorn
 
-# 创建数据库表
-Base.metadata.create_all(bind=engine)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    应用启动与关闭
+
+    导入模块时不连接数据库和Redis，连接在第一次请求时按需建立；
+    表结构由 database_schema.sql 管理，只有开启 auto_create_tables 时才在启动时建表；
+    设置了 db_pool_warmup 时预先建立数据库连接；启动事件循环延迟采样（过载保护使用）。
+    """
+    if settings.auto_create_tables:
+        from app.models.models import Base
+        Base.metadata.create_all(bind=engine)
+    if settings.db_pool_warmup > 0:
+        await run_in_threadpool(warm_up_pool, engine, settings.db_pool_warmup)
+    loop_monitor.start()
+    yield
+    await loop_monitor.stop()
+    redis_client.close()
+    engine.dispose()
+    for replica_engine in replica_engines:
+        replica_engine.dispose()
+    mark_process_dead()
+
 
 # 创建FastAPI应用
 app = FastAPI(
@@ -17,8 +48,20 @@ app = FastAPI(
     description="Taskly Backend API - 高性能任务管理系统",
     docs_url="/docs" if settings.debug else None,
     redoc_url="/redoc" if settings.debug else None,
+    lifespan=lifespan,
 )
 
+# 写请求的幂等键（最内层：CORS 响应头和请求统计同样作用于重放的响应）
+app.add_middleware(
+    IdempotencyMiddleware,
+    path_prefixes=["/api/v1/projects", "/api/v1/lists", "/api/v1/cards"],
+    # 导入接口流式读取请求体，不能整体读入内存计算指纹
+    exclude_paths=["/api/v1/projects/import"],
+)
+
+# 限流与过载保护（在CORS之内，429/503 响应同样带CORS响应头，浏览器可以读取 Retry-After）
+app.add_middleware(RateLimitMiddleware)
+
 # 添加CORS中间件
 app.add_middleware(
     CORSMiddleware,
@@ -26,14 +69,40 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "Server-Timing", "Idempotent-Replayed", "Retry-After"],
 )
 
+# 请求统计（SQL语句数、数据库耗时、Redis往返、缓存命中）
+app.add_middleware(InstrumentationMiddleware)
+
+
+@app.exception_handler(PoolTimeoutError)
+async def pool_timeout_handler(request: Request, exc: PoolTimeoutError):
+    """数据库连接池耗尽时返回503，提示客户端稍后重试"""
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Database is busy, please retry"},
+        headers={"Retry-After": "1"}
+    )
+
+
+@app.exception_handler(StaleDataError)
+async def stale_data_handler(request: Request, exc: StaleDataError):
+    """提交时行版本号不一致（其他请求已修改或删除该行），客户端需要重新读取后再提交"""
+    return JSONResponse(
+        status_code=409,
+        content={"detail": "Resource was modified by another request, reload and retry"}
+    )
+
+
 # 包含API路由
 app.include_router(auth.router, prefix="/api/v1/auth", tags=["认证"])
 app.include_router(users.router, prefix="/api/v1/users", tags=["用户"])
 app.include_router(projects.router, prefix="/api/v1/projects", tags=["项目"])
 app.include_router(lists.router, prefix="/api/v1/lists", tags=["列表"])
 app.include_router(cards.router, prefix="/api/v1/cards", tags=["卡片"])
+app.include_router(notifications.router, prefix="/api/v1/notifications", tags=["通知"])
+app.include_router(search.router, prefix="/api/v1/search", tags=["搜索"])
 
 # 包含WebSocket路由
 app.include_router(websocket_manager.router, prefix="/api/v1/ws", tags=["WebSocket"])
@@ -67,7 +136,23 @@ async def health_check():
         }
 
 
+if settings.metrics_enabled:
+    @app.get("/metrics", include_in_schema=False)
+    def metrics():
+        """Prometheus 指标（多 worker 时需设置 PROMETHEUS_MULTIPROC_DIR）"""
+        content, content_type = render_metrics()
+        return Response(content=content, headers={"Content-Type": content_type})
+
+
+if settings.debug:
+    @app.get("/debug/request-stats")
+    async def request_stats():
+        """按路由聚合的请求统计（仅调试模式）"""
+        return request_metrics.snapshot()
+
+
 if __name__ == "__main__":
+    import uvicorn
     uvicorn.run(
         "main:app",
         host=settings.host,
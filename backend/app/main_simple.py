@@ -1,14 +1,29 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 from app.core.config import settings
-from app.core.database import engine, Base
+from app.core.database import engine, replica_engines
 from app.core.redis import redis_client
+from app.core.instrumentation import warm_up_pool
 from app.api.v1.endpoints import auth, boards, lists, cards, users
 from app.api.v1.websocket import websocket_manager
-import uvicorn
 
-# 创建数据库表
-Base.metadata.create_all(bind=engine)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """应用启动与关闭（与 app.main 相同，只有开启 auto_create_tables 时才建表，按 db_pool_warmup 预热连接池）"""
+    if settings.auto_create_tables:
+        from app.models.models import Base
+        Base.metadata.create_all(bind=engine)
+    if settings.db_pool_warmup > 0:
+        await run_in_threadpool(warm_up_pool, engine, settings.db_pool_warmup)
+    yield
+    redis_client.close()
+    engine.dispose()
+    for replica_engine in replica_engines:
+        replica_engine.dispose()
+
 
 # 创建FastAPI应用
 app = FastAPI(
@@ -17,6 +32,7 @@ app = FastAPI(
     description="Taskly Backend API - 高性能任务管理系统",
     docs_url="/docs" if settings.debug else None,
     redoc_url="/redoc" if settings.debug else None,
+    lifespan=lifespan,
 )
 
 # 添加CORS中间件
@@ -83,6 +99,7 @@ async def health_check():
 
 
 if __name__ == "__main__":
+    import uvicorn
     uvicorn.run(
         "main:app",
         host=settings.host,
@@ -1,4 +1,4 @@
-from sqlalchemy import Boolean, Column, Integer, String, DateTime, Text, ForeignKey, Table, Enum, Date
+from sqlalchemy import BigInteger, Boolean, Column, Integer, String, DateTime, Text, ForeignKey, Table, Enum, Date, Index, UniqueConstraint
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -25,6 +25,11 @@ class User(Base):
     project_memberships = relationship("ProjectMember", back_populates="user")
     card_assignments = relationship("CardAssignment", back_populates="user")
     activity_logs = relationship("ActivityLog", back_populates="user")
+    
+    __table_args__ = (
+        # 用户列表按 (created_at, id) 做游标分页
+        Index("ix_users_created_at_id", "created_at", "id"),
+    )
 
 
 class Project(Base):
@@ -34,6 +39,13 @@ class Project(Base):
     name = Column(String(100), nullable=False)
     description = Column(Text)
     owner_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    # 计数器（由 counter_service 在写入时维护）
+    card_count = Column(Integer, nullable=False, default=0, server_default="0")
+    done_card_count = Column(Integer, nullable=False, default=0, server_default="0")
+    # 数据版本号，项目内每次修改递增（由 version_service 维护，用于ETag和增量同步）
+    version = Column(BigInteger, nullable=False, default=0, server_default="0")
+    # 行版本号，只在项目本身被修改时递增（乐观并发控制，见 app.core.concurrency）
+    version_id = Column(Integer, nullable=False, server_default="1")
     created_at = Column(DateTime, default=func.now())
     updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
     
@@ -42,6 +54,12 @@ class Project(Base):
     members = relationship("ProjectMember", back_populates="project")
     lists = relationship("List", back_populates="project", cascade="all, delete-orphan")
     activity_logs = relationship("ActivityLog", back_populates="project")
+    
+    __table_args__ = (
+        # 项目列表按 (created_at, id) 做游标分页
+        Index("ix_projects_created_at_id", "created_at", "id"),
+    )
+    __mapper_args__ = {"version_id_col": version_id}
 
 
 class ProjectMember(Base):
@@ -56,6 +74,13 @@ class ProjectMember(Base):
     # 关系
     project = relationship("Project", back_populates="members")
     user = relationship("User", back_populates="project_memberships")
+    
+    __table_args__ = (
+        # 同一用户只能加入一次；也用于按项目查询成员和权限检查
+        UniqueConstraint("project_id", "user_id", name="unique_project_member"),
+        # 按用户查询参与的项目
+        Index("ix_project_members_user_project", "user_id", "project_id"),
+    )
 
 
 class List(Base):
@@ -65,12 +90,20 @@ class List(Base):
     project_id = Column(Integer, ForeignKey("projects.id"), nullable=False)
     name = Column(String(100), nullable=False)
     position = Column(Integer, default=0)
+    card_count = Column(Integer, nullable=False, default=0, server_default="0")  # 由 counter_service 维护
+    version_id = Column(Integer, nullable=False, server_default="1")  # 行版本号（乐观并发控制）
     created_at = Column(DateTime, default=func.now())
     updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
     
     # 关系
     project = relationship("Project", back_populates="lists")
     cards = relationship("Card", back_populates="list", cascade="all, delete-orphan")
+    
+    __table_args__ = (
+        # 按项目获取列表并按位置排序
+        Index("ix_lists_project_position", "project_id", "position"),
+    )
+    __mapper_args__ = {"version_id_col": version_id}
 
 
 class Card(Base):
@@ -82,6 +115,7 @@ class Card(Base):
     description = Column(Text)
     due_date = Column(Date)
     position = Column(Integer, default=0)
+    version_id = Column(Integer, nullable=False, server_default="1")  # 行版本号（乐观并发控制）
     created_at = Column(DateTime, default=func.now())
     updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
     
@@ -89,6 +123,31 @@ class Card(Base):
     list = relationship("List", back_populates="cards")
     labels = relationship("CardLabel", back_populates="card", cascade="all, delete-orphan")
     assignments = relationship("CardAssignment", back_populates="card", cascade="all, delete-orphan")
+    
+    __table_args__ = (
+        # 截止日期提醒扫描使用 (due_date, id) 做键集分页
+        Index("ix_cards_due_date_id", "due_date", "id"),
+        # 按列表获取卡片并按位置排序
+        Index("ix_cards_list_position", "list_id", "position"),
+        # 卡片查询接口：按列表过滤并按更新时间排序/增量拉取
+        Index("ix_cards_list_updated", "list_id", "updated_at", "id"),
+        Index("ix_cards_updated_at_id", "updated_at", "id"),
+    )
+    __mapper_args__ = {"version_id_col": version_id}
+
+
+class ProjectWorkload(Base):
+    __tablename__ = "project_workloads"
+    
+    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
+    project_id = Column(Integer, ForeignKey("projects.id", ondelete="CASCADE"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    assigned_cards = Column(Integer, nullable=False, default=0, server_default="0")
+    done_cards = Column(Integer, nullable=False, default=0, server_default="0")
+    
+    __table_args__ = (
+        UniqueConstraint("project_id", "user_id", name="uq_project_workload"),
+    )
 
 
 class CardLabel(Base):
@@ -101,6 +160,13 @@ class CardLabel(Base):
     
     # 关系
     card = relationship("Card", back_populates="labels")
+    
+    __table_args__ = (
+        # 批量加载卡片的标签
+        Index("ix_card_labels_card_id", "card_id"),
+        # 按标签查询卡片
+        Index("ix_card_labels_label_card", "label", "card_id"),
+    )
 
 
 class CardAssignment(Base):
@@ -114,6 +180,30 @@ class CardAssignment(Base):
     # 关系
     card = relationship("Card", back_populates="assignments")
     user = relationship("User", back_populates="card_assignments")
+    
+    __table_args__ = (
+        UniqueConstraint("card_id", "user_id", name="unique_card_assignment"),
+        # "我的任务"：按用户查询被分配的卡片
+        Index("ix_card_assignments_user_card", "user_id", "card_id"),
+    )
+
+
+class ProjectChange(Base):
+    __tablename__ = "project_changes"
+    
+    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
+    project_id = Column(Integer, ForeignKey("projects.id", ondelete="CASCADE"), nullable=False)
+    entity_type = Column(Enum('project', 'member', 'list', 'card', 'label', 'assignment'), nullable=False)
+    entity_id = Column(Integer, nullable=False)
+    version = Column(BigInteger, nullable=False)
+    deleted = Column(Boolean, nullable=False, default=False)  # 删除标记（墓碑）
+    changed_at = Column(DateTime, default=func.now(), onupdate=func.now())
+    
+    __table_args__ = (
+        # 每个实体只保留最近一次变化
+        UniqueConstraint("project_id", "entity_type", "entity_id", name="uq_project_change_entity"),
+        Index("ix_project_changes_project_version", "project_id", "version"),
+    )
 
 
 class ActivityLog(Base):
@@ -131,4 +221,24 @@ class ActivityLog(Base):
     
     # 关系
     project = relationship("Project", back_populates="activity_logs")
-    user = relationship("User", back_populates="activity_logs")
\ No newline at end of file
+    user = relationship("User", back_populates="activity_logs")
+    
+    __table_args__ = (
+        # 活动流按 (created_at, id) 做游标分页
+        Index("ix_activity_logs_project_created", "project_id", "created_at", "id"),
+        Index("ix_activity_logs_user_created", "user_id", "created_at", "id"),
+    )
+
+class MetricRollup(Base):
+    __tablename__ = "metric_rollups"
+    
+    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
+    bucket_type = Column(Enum('hour', 'day'), nullable=False)
+    bucket_start = Column(DateTime, nullable=False)
+    metric = Column(String(50), nullable=False)
+    value = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
+    
+    __table_args__ = (
+        UniqueConstraint("bucket_type", "bucket_start", "metric", name="uq_metric_rollup_bucket"),
+    )
@@ -1,6 +1,6 @@
 from pydantic import BaseModel, EmailStr
-from typing import Optional, List
-from datetime import datetime
+from typing import Any, Dict, Optional, List
+from datetime import datetime, date
 
 
 # 用户相关schemas
@@ -32,6 +32,11 @@ class UserResponse(UserBase):
         from_attributes = True
 
 
+class UserPageResponse(BaseModel):
+    items: List[UserResponse] = []
+    next_cursor: Optional[str] = None
+
+
 class UserLogin(BaseModel):
     email: EmailStr
     password: str
@@ -59,11 +64,15 @@ class ProjectCreate(ProjectBase):
 class ProjectUpdate(BaseModel):
     name: Optional[str] = None
     description: Optional[str] = None
+    version_id: Optional[int] = None  # 读取时的版本号，不一致时返回409（也可以用 If-Match 请求头）
 
 
 class ProjectResponse(ProjectBase):
     id: int
     owner_id: int
+    card_count: int = 0
+    done_card_count: int = 0
+    version_id: int = 1
     created_at: datetime
     updated_at: datetime
     owner: UserResponse
@@ -73,6 +82,11 @@ class ProjectResponse(ProjectBase):
         from_attributes = True
 
 
+class ProjectPageResponse(BaseModel):
+    items: List[ProjectResponse] = []
+    next_cursor: Optional[str] = None
+
+
 class ProjectMemberBase(BaseModel):
     role: str = 'member'
 
@@ -106,11 +120,14 @@ class ListCreate(ListBase):
 class ListUpdate(BaseModel):
     name: Optional[str] = None
     position: Optional[int] = None
+    version_id: Optional[int] = None  # 读取时的版本号，不一致时返回409（也可以用 If-Match 请求头）
 
 
 class ListResponse(ListBase):
     id: int
     project_id: int
+    card_count: int = 0
+    version_id: int = 1
     created_at: datetime
     updated_at: datetime
     cards: List['CardResponse'] = []
@@ -136,11 +153,13 @@ class CardUpdate(BaseModel):
     description: Optional[str] = None
     position: Optional[int] = None
     due_date: Optional[datetime] = None
+    version_id: Optional[int] = None  # 读取时的版本号，不一致时返回409（也可以用 If-Match 请求头）
 
 
 class CardResponse(CardBase):
     id: int
     list_id: int
+    version_id: int = 1
     created_at: datetime
     updated_at: datetime
     labels: List['CardLabelResponse'] = []
@@ -189,26 +208,134 @@ class CardAssignmentResponse(CardAssignmentBase):
 
 # 卡片移动schemas
 class CardMoveRequest(BaseModel):
+    card_id: int
     source_list_id: int
     target_list_id: int
     new_position: int
+    version_id: Optional[int] = None  # 读取时的卡片版本号，不一致时返回409（也可以用 If-Match 请求头）
 
 
 # 活动日志schemas
 class ActivityLogResponse(BaseModel):
     id: int
-    action_type: str
+    project_id: int
+    action: str
     entity_type: str
     entity_id: int
-    changes: Optional[str] = None
+    old_values: Optional[str] = None
+    new_values: Optional[str] = None
     user_id: int
     created_at: datetime
-    user: Optional[UserResponse] = None
     
     class Config:
         from_attributes = True
 
 
+class ActivityPageResponse(BaseModel):
+    items: List[ActivityLogResponse] = []
+    next_cursor: Optional[str] = None
+
+
+# 通知相关schemas
+class NotificationResponse(BaseModel):
+    id: int
+    user_id: int
+    type: str
+    title: str
+    message: str
+    data: dict = {}
+    created_at: datetime
+    read: bool = False
+
+
+class NotificationPageResponse(BaseModel):
+    items: List[NotificationResponse] = []
+    next_cursor: Optional[str] = None
+
+
+class UnreadCountResponse(BaseModel):
+    unread_count: int
+
+
+# 搜索相关schemas
+class CardSearchResult(BaseModel):
+    id: int
+    title: str
+    description: Optional[str] = None
+    list_id: int
+    project_id: int
+    due_date: Optional[date] = None
+    updated_at: datetime
+
+
+class CardSearchResponse(BaseModel):
+    items: List[CardSearchResult] = []
+    next_cursor: Optional[str] = None
+
+
+class CardQueryResponse(BaseModel):
+    items: List[CardSearchResult] = []
+    next_cursor: Optional[str] = None
+
+
+# 增量同步相关schemas
+class EntityChange(BaseModel):
+    entity_type: str
+    entity_id: int
+    version: int
+    deleted: bool
+    data: Optional[Dict[str, Any]] = None
+
+
+class ProjectChangesResponse(BaseModel):
+    project_id: int
+    version: int
+    changes: List[EntityChange] = []
+    has_more: bool = False
+
+
+class ProjectImportResponse(BaseModel):
+    project_id: int
+    lists: int
+    cards: int
+    labels: int
+    assignments: int
+    activities: int
+    skipped_assignments: int
+
+
+# 统计相关schemas
+class ListStatistics(BaseModel):
+    list_id: int
+    name: str
+    position: int
+    card_count: int
+
+
+class MemberStatistics(BaseModel):
+    user_id: int
+    assigned_cards: int
+    completed_cards: int
+
+
+class ProjectStatisticsResponse(BaseModel):
+    project_id: int
+    total_cards: int
+    completed_cards: int
+    progress: float
+    lists: List[ListStatistics] = []
+    members: List[MemberStatistics] = []
+
+
+class UserStatisticsResponse(BaseModel):
+    user_id: int
+    owned_projects: int
+    participated_projects: int
+    assigned_cards: int
+    completed_cards: int
+    total_activities: int
+
+
 # WebSocket消息schemas
 class WebSocketMessage(BaseModel):
     type: str
@@ -220,6 +347,7 @@ class WebSocketMessage(BaseModel):
 class ProjectUpdateMessage(BaseModel):
     project_id: int
     action: str  # created, updated, deleted
+    version_id: int  # 实体的行版本号，客户端只应用比本地更新的版本
     data: dict
 
 
@@ -227,6 +355,7 @@ class ListUpdateMessage(BaseModel):
     project_id: int
     list_id: int
     action: str  # created, updated, deleted, moved
+    version_id: int
     data: dict
 
 
@@ -235,4 +364,10 @@ class CardUpdateMessage(BaseModel):
     list_id: int
     card_id: int
     action: str  # created, updated, deleted, moved
-    data: dict
\ No newline at end of file
+    version_id: int
+    data: dict
+
+# 解析前向引用
+ProjectResponse.model_rebuild()
+ListResponse.model_rebuild()
+CardResponse.model_rebuild()
@@ -1 +0,0 @@
-# Schemas module
\ No newline at end of file
@@ -1,68 +1,113 @@
+from typing import List, Optional, Tuple
+from datetime import datetime
 from sqlalchemy.orm import Session
 from app.models.models import ActivityLog
+from app.utils.pagination import encode_cursor, decode_cursor
 import json
+import logging
+
+logger = logging.getLogger(__name__)
 
 
 def log_activity(
     db: Session,
     user_id: int,
-    action_type: str,
+    action: str,
     entity_type: str,
     entity_id: int,
-    changes: dict = None
+    project_id: int = None,
+    old_values: dict = None,
+    new_values: dict = None
 ):
     """记录活动日志"""
+    from app.services.metrics_service import record_activity
+    
     activity_log = ActivityLog(
-        action_type=action_type,
+        project_id=project_id,
+        user_id=user_id,
+        action=action,
         entity_type=entity_type,
         entity_id=entity_id,
-        changes=json.dumps(changes) if changes else None,
-        user_id=user_id
+        old_values=json.dumps(old_values, ensure_ascii=False, default=str) if old_values else None,
+        new_values=json.dumps(new_values, ensure_ascii=False, default=str) if new_values else None
     )
     
-    db.add(activity_log)
-    db.commit()
+    try:
+        db.add(activity_log)
+        db.commit()
+    except Exception as e:
+        # 活动日志写入失败不影响主流程
+        db.rollback()
+        logger.warning(f"记录活动日志失败: {str(e)}")
+        return None
+    
+    # 增量更新统计汇总
+    record_activity(user_id=user_id, action=action, entity_type=entity_type)
     
     return activity_log
 
 
+def _activity_page(query, cursor: Optional[str], limit: int) -> Tuple[List[ActivityLog], Optional[str]]:
+    """按 (created_at, id) 倒序取一页活动，返回 (活动列表, 下一页游标)"""
+    after = decode_cursor(cursor, (datetime, int))
+    if after:
+        query = query.filter(
+            (ActivityLog.created_at < after[0]) |
+            ((ActivityLog.created_at == after[0]) & (ActivityLog.id < after[1]))
+        )
+    activities = query.order_by(ActivityLog.created_at.desc(), ActivityLog.id.desc()).limit(limit + 1).all()
+    
+    next_cursor = None
+    if len(activities) > limit:
+        activities = activities[:limit]
+        next_cursor = encode_cursor([activities[-1].created_at, activities[-1].id])
+    return activities, next_cursor
+
+
+def cached_activity_page(cache_key: str, cursor: Optional[str], load_page) -> dict:
+    """
+    带缓存地获取一页活动
+
+    活动日志只追加，带游标的窗口（早于游标的活动）内容不会再变化，按游标缓存1小时；
+    第一页随新活动变化，不缓存。
+    """
+    from app.core.redis import cache
+    from app.core.replicas import cache_ttl
+    from app.models.schemas import ActivityLogResponse
+    
+    if cursor:
+        cached_page = cache.get(cache_key)
+        if cached_page:
+            return json.loads(cached_page)
+    
+    activities, next_cursor = load_page()
+    page = {
+        "items": [ActivityLogResponse.model_validate(a).model_dump(mode="json") for a in activities],
+        "next_cursor": next_cursor
+    }
+    if cursor:
+        cache.set(cache_key, json.dumps(page), ttl=cache_ttl(cache.default_ttl))
+    return page
+
+
 def get_user_activities(
     db: Session,
     user_id: int,
-    skip: int = 0,
+    cursor: Optional[str] = None,
     limit: int = 50
 ):
-    """获取用户活动日志"""
-    activities = db.query(ActivityLog).filter(
-        ActivityLog.user_id == user_id
-    ).order_by(ActivityLog.created_at.desc()).offset(skip).limit(limit).all()
-    
-    return activities
+    """获取用户活动日志（游标分页）"""
+    query = db.query(ActivityLog).filter(ActivityLog.user_id == user_id)
+    return _activity_page(query, cursor, limit)
 
 
 def get_board_activities(
     db: Session,
     board_id: int,
-    skip: int = 0,
+    cursor: Optional[str] = None,
     limit: int = 50
 ):
-    """获取看板活动日志"""
-    # 获取看板相关的所有活动
-    from app.models.models import List, Card
-    
-    # 获取看板列表ID
-    list_ids = db.query(List.id).filter(List.board_id == board_id).all()
-    list_ids = [lid[0] for lid in list_ids]
-    
-    # 获取看板卡片ID
-    card_ids = db.query(Card.id).filter(Card.list_id.in_(list_ids)).all()
-    card_ids = [cid[0] for cid in card_ids]
-    
-    # 查询相关活动
-    activities = db.query(ActivityLog).filter(
-        (ActivityLog.entity_type == "board") & (ActivityLog.entity_id == board_id) |
-        (ActivityLog.entity_type == "list") & (ActivityLog.entity_id.in_(list_ids)) |
-        (ActivityLog.entity_type == "card") & (ActivityLog.entity_id.in_(card_ids))
-    ).order_by(ActivityLog.created_at.desc()).offset(skip).limit(limit).all()
-    
-    return activities
\ No newline at end of file
+    """获取看板（项目）活动日志（游标分页）"""
+    # 活动日志记录了所属项目，直接按 project_id 查询，走 (project_id, created_at, id) 索引
+    query = db.query(ActivityLog).filter(ActivityLog.project_id == board_id)
+    return _activity_page(query, cursor, limit)
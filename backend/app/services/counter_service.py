@@ -0,0 +1,262 @@
+from typing import Any, Dict, Optional, Set, Tuple
+from collections import defaultdict
+
+from sqlalchemy import case, event, func, inspect, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.models.models import Card, CardAssignment, List, Project, ProjectWorkload
+
+
+# 视为"已完成"的列表名称
+DONE_LIST_NAMES = ("已完成", "Done", "完成")
+
+
+def is_done_list(name: Optional[str]) -> bool:
+    return name in DONE_LIST_NAMES
+
+
+def _old_value(obj, attr: str):
+    """获取本次flush之前的属性值"""
+    history = inspect(obj).attrs[attr].history
+    if history.deleted:
+        return history.deleted[0]
+    return getattr(obj, attr)
+
+
+def _apply_workload_delta(connection, project_id: int, user_id: int, assigned: int, done: int):
+    """更新用户在项目中的工作量计数，不存在时插入"""
+    if not assigned and not done:
+        return
+    values = {
+        "assigned_cards": ProjectWorkload.assigned_cards + assigned,
+        "done_cards": ProjectWorkload.done_cards + done
+    }
+    where = (ProjectWorkload.project_id == project_id) & (ProjectWorkload.user_id == user_id)
+    if connection.execute(update(ProjectWorkload).where(where).values(**values)).rowcount:
+        return
+    try:
+        # 使用保存点，并发插入同一行时退回到更新
+        with connection.begin_nested():
+            connection.execute(insert(ProjectWorkload).values(
+                project_id=project_id, user_id=user_id, assigned_cards=assigned, done_cards=done
+            ))
+    except IntegrityError:
+        connection.execute(update(ProjectWorkload).where(where).values(**values))
+
+
+def _on_set(target, value, oldvalue, initiator):
+    pass
+
+
+# 修改这些属性时加载旧值，使flush时能够得到修改前的列表/用户/名称
+for _attribute in (Card.list_id, CardAssignment.user_id, List.name):
+    event.listen(_attribute, "set", _on_set, active_history=True)
+
+
+@event.listens_for(Session, "after_flush")
+def _maintain_counters(session: Session, flush_context):
+    """在同一事务内根据本次flush的卡片/分配变化更新计数器"""
+    list_deltas: Dict[int, int] = defaultdict(int)
+    # (card_id, user_id, delta)
+    assignment_deltas = []
+    new_assignments: Set[Tuple[int, int]] = set()
+    # card_id -> (旧列表, 新列表)
+    moved_cards: Dict[int, Tuple[int, int]] = {}
+    renamed_lists: Dict[int, bool] = {}
+    card_lists: Dict[int, int] = {}
+    known_lists: Dict[int, Tuple[int, str]] = {}
+
+    for obj in session.new:
+        if isinstance(obj, Card):
+            list_deltas[obj.list_id] += 1
+            card_lists[obj.id] = obj.list_id
+        elif isinstance(obj, CardAssignment):
+            assignment_deltas.append((obj.card_id, obj.user_id, 1))
+            new_assignments.add((obj.card_id, obj.user_id))
+
+    for obj in session.deleted:
+        if isinstance(obj, Card):
+            list_id = _old_value(obj, "list_id")
+            list_deltas[list_id] -= 1
+            card_lists[obj.id] = list_id
+        elif isinstance(obj, CardAssignment):
+            assignment_deltas.append((_old_value(obj, "card_id"), _old_value(obj, "user_id"), -1))
+        elif isinstance(obj, List):
+            # 已删除的列表无法再查询，记录删除前的信息
+            known_lists[obj.id] = (_old_value(obj, "project_id"), _old_value(obj, "name"))
+
+    for obj in session.dirty:
+        state = inspect(obj)
+        if isinstance(obj, Card) and state.attrs.list_id.history.has_changes():
+            old_list_id = _old_value(obj, "list_id")
+            list_deltas[old_list_id] -= 1
+            list_deltas[obj.list_id] += 1
+            moved_cards[obj.id] = (old_list_id, obj.list_id)
+            card_lists[obj.id] = obj.list_id
+        elif isinstance(obj, CardAssignment) and state.attrs.user_id.history.has_changes():
+            assignment_deltas.append((obj.card_id, _old_value(obj, "user_id"), -1))
+            assignment_deltas.append((obj.card_id, obj.user_id, 1))
+        elif isinstance(obj, List) and state.attrs.name.history.has_changes():
+            was_done = is_done_list(_old_value(obj, "name"))
+            if was_done != is_done_list(obj.name):
+                renamed_lists[obj.id] = is_done_list(obj.name)
+
+    if not (list_deltas or assignment_deltas or renamed_lists):
+        return
+
+    connection = session.connection()
+
+    # 查询涉及的卡片所在列表
+    missing_cards = {card_id for card_id, _, _ in assignment_deltas if card_id not in card_lists}
+    if missing_cards:
+        card_lists.update(connection.execute(
+            select(Card.id, Card.list_id).where(Card.id.in_(missing_cards))
+        ).all())
+
+    # 查询涉及的列表所属项目和名称
+    missing_lists = set(list_deltas) | set(card_lists.values()) | set(renamed_lists)
+    for old_list_id, new_list_id in moved_cards.values():
+        missing_lists |= {old_list_id, new_list_id}
+    missing_lists -= set(known_lists)
+    if missing_lists:
+        for list_id, project_id, name in connection.execute(
+            select(List.id, List.project_id, List.name).where(List.id.in_(missing_lists))
+        ):
+            known_lists[list_id] = (project_id, name)
+
+    # 列表计数
+    project_deltas: Dict[int, list] = defaultdict(lambda: [0, 0])
+    for list_id, delta in list_deltas.items():
+        if not delta or list_id not in known_lists:
+            continue
+        # 计数器是派生数据，显式保留 updated_at（onupdate/ON UPDATE CURRENT_TIMESTAMP）
+        connection.execute(update(List).where(List.id == list_id).values(
+            card_count=List.card_count + delta, updated_at=List.updated_at
+        ))
+        project_id, name = known_lists[list_id]
+        project_deltas[project_id][0] += delta
+        if is_done_list(name):
+            project_deltas[project_id][1] += delta
+
+    # 列表改名导致已完成状态变化
+    for list_id, now_done in renamed_lists.items():
+        sign = 1 if now_done else -1
+        project_id = known_lists[list_id][0]
+        card_count = connection.execute(select(List.card_count).where(List.id == list_id)).scalar() or 0
+        project_deltas[project_id][1] += sign * card_count
+        for user_id, count in connection.execute(
+            select(CardAssignment.user_id, func.count(CardAssignment.id)).join(
+                Card, Card.id == CardAssignment.card_id
+            ).where(Card.list_id == list_id).group_by(CardAssignment.user_id)
+        ):
+            _apply_workload_delta(connection, project_id, user_id, 0, sign * count)
+
+    # 项目计数
+    for project_id, (total, done) in project_deltas.items():
+        if total or done:
+            connection.execute(update(Project).where(Project.id == project_id).values(
+                card_count=Project.card_count + total,
+                done_card_count=Project.done_card_count + done,
+                updated_at=Project.updated_at
+            ))
+
+    # 分配变化
+    for card_id, user_id, delta in assignment_deltas:
+        list_id = card_lists.get(card_id)
+        if list_id not in known_lists:
+            continue
+        project_id, name = known_lists[list_id]
+        _apply_workload_delta(connection, project_id, user_id, delta, delta if is_done_list(name) else 0)
+
+    # 卡片移动：已有的分配随卡片从旧列表转到新列表
+    if moved_cards:
+        for card_id, user_id in connection.execute(
+            select(CardAssignment.card_id, CardAssignment.user_id).where(CardAssignment.card_id.in_(moved_cards))
+        ):
+            if (card_id, user_id) in new_assignments:
+                continue
+            old_list_id, new_list_id = moved_cards[card_id]
+            if old_list_id not in known_lists or new_list_id not in known_lists:
+                continue
+            old_project_id, old_name = known_lists[old_list_id]
+            new_project_id, new_name = known_lists[new_list_id]
+            _apply_workload_delta(connection, old_project_id, user_id, -1, -1 if is_done_list(old_name) else 0)
+            _apply_workload_delta(connection, new_project_id, user_id, 1, 1 if is_done_list(new_name) else 0)
+
+
+def check_counters(db: Session, repair: bool = True, project_id: Optional[int] = None) -> Dict[str, Any]:
+    """重新计算计数器并与存储值比较，repair=True 时修复偏差"""
+    is_done = case((List.name.in_(DONE_LIST_NAMES), 1), else_=0)
+    drift = {"lists": 0, "projects": 0, "workloads": 0}
+
+    # 列表卡片数
+    list_query = db.query(List.id, List.card_count, func.count(Card.id)).outerjoin(
+        Card, Card.list_id == List.id
+    ).group_by(List.id, List.card_count)
+    if project_id is not None:
+        list_query = list_query.filter(List.project_id == project_id)
+    for list_id, stored, actual in list_query:
+        if stored != actual:
+            drift["lists"] += 1
+            if repair:
+                db.execute(update(List).where(List.id == list_id).values(
+                    card_count=actual, updated_at=List.updated_at
+                ))
+
+    # 项目卡片数/已完成数
+    card_totals = db.query(
+        List.project_id.label("project_id"),
+        func.count(Card.id).label("total"),
+        func.coalesce(func.sum(is_done), 0).label("done")
+    ).join(Card, Card.list_id == List.id).group_by(List.project_id).subquery()
+    project_query = db.query(
+        Project.id,
+        Project.card_count,
+        Project.done_card_count,
+        func.coalesce(card_totals.c.total, 0),
+        func.coalesce(card_totals.c.done, 0)
+    ).outerjoin(card_totals, card_totals.c.project_id == Project.id)
+    if project_id is not None:
+        project_query = project_query.filter(Project.id == project_id)
+    for pid, stored_total, stored_done, total, done in project_query:
+        if (stored_total, stored_done) != (total, done):
+            drift["projects"] += 1
+            if repair:
+                db.execute(update(Project).where(Project.id == pid).values(
+                    card_count=total, done_card_count=done, updated_at=Project.updated_at
+                ))
+
+    # 成员工作量
+    actual_query = db.query(
+        List.project_id,
+        CardAssignment.user_id,
+        func.count(CardAssignment.id),
+        func.coalesce(func.sum(is_done), 0)
+    ).join(Card, Card.id == CardAssignment.card_id).join(List, List.id == Card.list_id).group_by(
+        List.project_id, CardAssignment.user_id
+    )
+    stored_query = db.query(ProjectWorkload)
+    if project_id is not None:
+        actual_query = actual_query.filter(List.project_id == project_id)
+        stored_query = stored_query.filter(ProjectWorkload.project_id == project_id)
+
+    actual = {(pid, uid): (assigned, int(done)) for pid, uid, assigned, done in actual_query}
+    stored = {(w.project_id, w.user_id): w for w in stored_query}
+    for key in set(actual) | set(stored):
+        assigned, done = actual.get(key, (0, 0))
+        workload = stored.get(key)
+        if workload is None:
+            drift["workloads"] += 1
+            if repair:
+                db.add(ProjectWorkload(project_id=key[0], user_id=key[1], assigned_cards=assigned, done_cards=done))
+        elif (workload.assigned_cards, workload.done_cards) != (assigned, done):
+            drift["workloads"] += 1
+            if repair:
+                workload.assigned_cards = assigned
+                workload.done_cards = done
+
+    if repair:
+        db.commit()
+
+    return drift
@@ -0,0 +1,328 @@
+from typing import Any, Dict, Iterator, List as ListType, Optional
+from datetime import date, datetime
+import logging
+
+import orjson
+from fastapi import HTTPException, status
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session, aliased
+
+from app.core.serialization import dumps
+from app.models.models import ActivityLog, Card, CardAssignment, CardLabel, List, Project, ProjectMember, User
+from app.services.counter_service import check_counters
+from app.services.search_service import rebuild_search_index
+
+logger = logging.getLogger(__name__)
+
+EXPORT_FORMAT = "taskly-project"
+EXPORT_VERSION = 1
+EXPORT_CHUNK_SIZE = 1000
+
+# 导出时编码为字符串、导入时需要还原的日期时间字段
+_DATETIME_FIELDS = ("created_at", "updated_at", "joined_at", "assigned_at")
+_DATE_FIELDS = ("due_date",)
+
+# 子记录依赖的父记录类型，导入前必须先写入父记录
+_RECORD_ORDER = ("header", "project", "member", "list", "card", "label", "assignment", "activity")
+
+
+def _line(record_type: str, data: Dict[str, Any]) -> bytes:
+    return dumps({"type": record_type, "data": data}) + b"\n"
+
+
+def _stream(db: Session, record_type: str, query) -> Iterator[bytes]:
+    """使用服务端游标分批读取，每行编码为一条NDJSON记录"""
+    result = db.execute(query.execution_options(yield_per=EXPORT_CHUNK_SIZE))
+    for row in result:
+        yield _line(record_type, dict(row._mapping))
+
+
+def iter_project_export(db: Session, project_id: int) -> Iterator[bytes]:
+    """
+    按 项目 -> 成员 -> 列表 -> 卡片 -> 标签 -> 分配 -> 活动 的顺序逐行导出项目（NDJSON）
+
+    用户以邮箱导出，导入到其他环境时按邮箱匹配。每类记录按ID顺序读取，
+    同一时间只有一个游标打开，内存占用与项目大小无关。
+    """
+    project = db.query(
+        Project.id, Project.name, Project.description, Project.created_at, Project.updated_at
+    ).filter(Project.id == project_id).first()
+    if not project:
+        return
+
+    yield _line("header", {"format": EXPORT_FORMAT, "version": EXPORT_VERSION, "exported_at": datetime.utcnow()})
+    yield _line("project", dict(project._mapping))
+
+    project_lists = select(List.id).where(List.project_id == project_id)
+    project_cards = select(Card.id).where(Card.list_id.in_(project_lists))
+
+    yield from _stream(db, "member", select(
+        ProjectMember.role, ProjectMember.joined_at, User.email.label("user_email")
+    ).join(User, User.id == ProjectMember.user_id).where(
+        ProjectMember.project_id == project_id
+    ).order_by(ProjectMember.id))
+
+    yield from _stream(db, "list", select(
+        List.id, List.name, List.position, List.created_at, List.updated_at
+    ).where(List.project_id == project_id).order_by(List.id))
+
+    yield from _stream(db, "card", select(
+        Card.id, Card.list_id, Card.title, Card.description, Card.due_date,
+        Card.position, Card.created_at, Card.updated_at
+    ).where(Card.list_id.in_(project_lists)).order_by(Card.id))
+
+    yield from _stream(db, "label", select(
+        CardLabel.id, CardLabel.card_id, CardLabel.label, CardLabel.color
+    ).where(CardLabel.card_id.in_(project_cards)).order_by(CardLabel.id))
+
+    yield from _stream(db, "assignment", select(
+        CardAssignment.id, CardAssignment.card_id, CardAssignment.assigned_at, User.email.label("user_email")
+    ).join(User, User.id == CardAssignment.user_id).where(
+        CardAssignment.card_id.in_(project_cards)
+    ).order_by(CardAssignment.id))
+
+    actor = aliased(User)
+    yield from _stream(db, "activity", select(
+        ActivityLog.action, ActivityLog.entity_type, ActivityLog.entity_id,
+        ActivityLog.old_values, ActivityLog.new_values, ActivityLog.created_at,
+        actor.email.label("user_email")
+    ).outerjoin(actor, actor.id == ActivityLog.user_id).where(
+        ActivityLog.project_id == project_id
+    ).order_by(ActivityLog.id))
+
+
+def _invalid(detail: str) -> HTTPException:
+    return HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Invalid import: {detail}")
+
+
+def _parse_values(data: Dict[str, Any]) -> Dict[str, Any]:
+    """把导出时编码为字符串的日期时间还原"""
+    try:
+        for field in _DATETIME_FIELDS:
+            if data.get(field):
+                data[field] = datetime.fromisoformat(data[field])
+        for field in _DATE_FIELDS:
+            if data.get(field):
+                data[field] = date.fromisoformat(data[field])
+    except (TypeError, ValueError):
+        raise _invalid("bad date value")
+    return data
+
+
+class ProjectImporter:
+    """
+    逐条接收导出记录，按类型分块批量插入并把旧ID映射为新ID
+
+    插入绕过ORM会话（不触发计数器/搜索/版本监听器），全部记录写入后
+    统一重新计算计数器并重建该项目的搜索索引。整个导入在一个事务中完成。
+    """
+
+    def __init__(self, db: Session, owner: User, chunk_size: int = EXPORT_CHUNK_SIZE):
+        self.db = db
+        self.owner = owner
+        self.chunk_size = chunk_size
+        self.project_id: Optional[int] = None
+        self.id_maps: Dict[str, Dict[int, int]] = {"list": {}, "card": {}, "label": {}, "assignment": {}}
+        self.user_ids: Dict[str, Optional[int]] = {owner.email: owner.id}
+        self.counts: Dict[str, int] = {"lists": 0, "cards": 0, "labels": 0, "assignments": 0, "activities": 0}
+        self.skipped_assignments = 0
+        self._pending_type: Optional[str] = None
+        self._pending: ListType[Dict[str, Any]] = []
+        # 各表已读回的最大新ID（不支持 executemany RETURNING 时用于区分本块插入的行）
+        self._last_ids: Dict[Any, int] = {}
+
+    def feed(self, record: Dict[str, Any]):
+        """接收一条记录，类型切换或缓冲区满时写入数据库"""
+        record_type = record.get("type") if isinstance(record, dict) else None
+        data = record.get("data") if record_type else None
+        if record_type not in _RECORD_ORDER or not isinstance(data, dict):
+            raise _invalid("unknown record")
+        if self._pending_type is not None and (
+            _RECORD_ORDER.index(record_type) < _RECORD_ORDER.index(self._pending_type)
+        ):
+            raise _invalid(f"{record_type} record after {self._pending_type} records")
+
+        if record_type == "header":
+            if data.get("format") != EXPORT_FORMAT or data.get("version") != EXPORT_VERSION:
+                raise _invalid("unsupported format")
+            self._pending_type = record_type
+            return
+        if record_type == "project":
+            if self.project_id is not None:
+                raise _invalid("duplicate project record")
+            self._create_project(data)
+            self._pending_type = record_type
+            return
+        if self.project_id is None:
+            raise _invalid("missing project record")
+
+        if record_type != self._pending_type:
+            self._flush()
+            self._pending_type = record_type
+        self._pending.append(_parse_values(data))
+        if len(self._pending) >= self.chunk_size:
+            self._flush()
+
+    def finish(self) -> Dict[str, Any]:
+        """写入剩余记录并提交，修复计数器、重建搜索索引，返回导入统计"""
+        if self.project_id is None:
+            raise _invalid("missing project record")
+        self._flush()
+        self.db.commit()
+
+        check_counters(self.db, repair=True, project_id=self.project_id)
+        try:
+            rebuild_search_index(self.db, chunk_size=self.chunk_size, project_id=self.project_id)
+        except Exception as e:
+            logger.warning(f"导入后重建搜索索引失败: {str(e)}")
+
+        return {"project_id": self.project_id, **self.counts, "skipped_assignments": self.skipped_assignments}
+
+    def _create_project(self, data: Dict[str, Any]):
+        project = Project(
+            name=data.get("name") or "Imported project",
+            description=data.get("description"),
+            owner_id=self.owner.id
+        )
+        self.db.add(project)
+        self.db.flush()
+        self.project_id = project.id
+        self.db.add(ProjectMember(project_id=project.id, user_id=self.owner.id, role="owner"))
+        self.db.flush()
+
+    def _user_id(self, email: Optional[str]) -> Optional[int]:
+        """按邮箱匹配当前环境的用户，找不到时返回None"""
+        if email not in self.user_ids:
+            self.user_ids[email] = self.db.query(User.id).filter(User.email == email).scalar()
+        return self.user_ids[email]
+
+    def _map(self, entity_type: str, old_id: Any) -> int:
+        new_id = self.id_maps[entity_type].get(old_id)
+        if new_id is None:
+            raise _invalid(f"unknown {entity_type} {old_id}")
+        return new_id
+
+    def _insert(self, model, parent: str, rows: ListType[Dict[str, Any]]) -> ListType[int]:
+        """
+        批量插入并按参数顺序返回新ID
+
+        不支持 executemany RETURNING 的数据库（MySQL）同样整块 executemany，再按ID顺序读回本块的行：
+        单条多行INSERT按行顺序分配递增的自增ID，而 parent 列指向的父记录都是本事务新插入、尚未提交的，
+        其他事务无法在其下插入子记录，所以这些父记录下ID大于上一块的行正好是本块插入的行。
+        """
+        connection = self.db.connection()
+        if connection.dialect.insert_executemany_returning_sort_by_parameter_order:
+            result = connection.execute(insert(model).returning(model.id, sort_by_parameter_order=True), rows)
+            return list(result.scalars())
+
+        connection.execute(insert(model), rows)
+        parent_column = getattr(model, parent)
+        new_ids = list(connection.execute(select(model.id).where(
+            parent_column.in_({row[parent] for row in rows}),
+            model.id > self._last_ids.get(model, 0)
+        ).order_by(model.id)).scalars())
+        if len(new_ids) != len(rows):
+            raise RuntimeError(f"读回的{model.__tablename__}行数与插入行数不一致: {len(new_ids)} != {len(rows)}")
+        self._last_ids[model] = new_ids[-1]
+        return new_ids
+
+    def _insert_mapped(self, entity_type: str, model, parent: str, old_ids: ListType[Any], rows: ListType[Dict[str, Any]]):
+        for old_id, new_id in zip(old_ids, self._insert(model, parent, rows)):
+            self.id_maps[entity_type][old_id] = new_id
+
+    def _flush(self):
+        records, record_type = self._pending, self._pending_type
+        self._pending = []
+        if not records:
+            return
+        # 缺少的时间字段按导入时间填充（批量插入时每行的字段必须一致）
+        now = datetime.now()
+
+        if record_type == "member":
+            existing = {self.owner.id}
+            rows = []
+            for data in records:
+                user_id = self._user_id(data.get("user_email"))
+                if user_id is not None and user_id not in existing:
+                    existing.add(user_id)
+                    role = "admin" if data.get("role") == "owner" else data.get("role", "member")
+                    rows.append({"project_id": self.project_id, "user_id": user_id, "role": role,
+                                 "joined_at": data.get("joined_at") or now})
+            if rows:
+                self.db.connection().execute(insert(ProjectMember), rows)
+        elif record_type == "list":
+            self._insert_mapped("list", List, "project_id", [data.get("id") for data in records], [{
+                "project_id": self.project_id,
+                "name": data.get("name"),
+                "position": data.get("position", 0),
+                "created_at": data.get("created_at") or now,
+                "updated_at": data.get("updated_at") or now
+            } for data in records])
+            self.counts["lists"] += len(records)
+        elif record_type == "card":
+            self._insert_mapped("card", Card, "list_id", [data.get("id") for data in records], [{
+                "list_id": self._map("list", data.get("list_id")),
+                "title": data.get("title"),
+                "description": data.get("description"),
+                "due_date": data.get("due_date"),
+                "position": data.get("position", 0),
+                "created_at": data.get("created_at") or now,
+                "updated_at": data.get("updated_at") or now
+            } for data in records])
+            self.counts["cards"] += len(records)
+        elif record_type == "label":
+            self._insert_mapped("label", CardLabel, "card_id", [data.get("id") for data in records], [{
+                "card_id": self._map("card", data.get("card_id")),
+                "label": data.get("label"),
+                "color": data.get("color") or "#007bff"
+            } for data in records])
+            self.counts["labels"] += len(records)
+        elif record_type == "assignment":
+            old_ids, rows = [], []
+            for data in records:
+                user_id = self._user_id(data.get("user_email"))
+                if user_id is None:
+                    # 当前环境中没有该用户
+                    self.skipped_assignments += 1
+                    continue
+                old_ids.append(data.get("id"))
+                rows.append({
+                    "card_id": self._map("card", data.get("card_id")),
+                    "user_id": user_id,
+                    "assigned_at": data.get("assigned_at") or now
+                })
+            if rows:
+                self._insert_mapped("assignment", CardAssignment, "card_id", old_ids, rows)
+            self.counts["assignments"] += len(rows)
+        elif record_type == "activity":
+            rows = []
+            for data in records:
+                entity_type = data.get("entity_type")
+                if entity_type == "project":
+                    entity_id = self.project_id
+                else:
+                    # 源环境中已删除的实体没有对应的新ID，记为0
+                    entity_id = self.id_maps.get(entity_type, {}).get(data.get("entity_id"), 0)
+                rows.append({
+                    "project_id": self.project_id,
+                    "user_id": self._user_id(data.get("user_email")) or self.owner.id,
+                    "action": data.get("action"),
+                    "entity_type": entity_type,
+                    "entity_id": entity_id,
+                    "old_values": data.get("old_values"),
+                    "new_values": data.get("new_values"),
+                    "created_at": data.get("created_at") or now
+                })
+            self.db.connection().execute(insert(ActivityLog), rows)
+            self.counts["activities"] += len(rows)
+
+
+def parse_line(line: bytes) -> Optional[Dict[str, Any]]:
+    """解析一行NDJSON，空行返回None"""
+    line = line.strip()
+    if not line:
+        return None
+    try:
+        return orjson.loads(line)
+    except orjson.JSONDecodeError:
+        raise _invalid("malformed JSON line")
@@ -0,0 +1,238 @@
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from datetime import date, datetime, timedelta
+from collections import defaultdict
+import logging
+
+from sqlalchemy.orm import Session
+
+from app.core.redis import redis_client
+from app.models.models import ActivityLog, Card, MetricRollup, Project, User
+
+logger = logging.getLogger(__name__)
+
+# 汇总的指标
+METRICS = ("new_users", "new_projects", "new_cards", "active_users", "total_activities")
+
+# Redis中的实时计数:
+# - metrics:rollup:{bucket_type}:{bucket}        哈希, 指标 -> 计数
+# - metrics:rollup:{bucket_type}:{bucket}:users  集合, 当前时间段内活跃的用户ID
+# - metrics:rollup:dirty                         集合, 有新计数、等待写入数据库的时间段
+ROLLUP_KEY = "metrics:rollup:{bucket_type}:{bucket}"
+ROLLUP_USERS_KEY = "metrics:rollup:{bucket_type}:{bucket}:users"
+ROLLUP_DIRTY_KEY = "metrics:rollup:dirty"
+ROLLUP_TTL = 3 * 24 * 60 * 60  # 3天，足够覆盖写入数据库的间隔
+
+BUCKET_TYPES = ("hour", "day")
+
+
+def bucket_start(bucket_type: str, at: datetime) -> datetime:
+    """获取时间点所在时间段的起始时间"""
+    if bucket_type == "hour":
+        return at.replace(minute=0, second=0, microsecond=0)
+    return datetime.combine(at.date(), datetime.min.time())
+
+
+def _bucket_name(bucket_type: str, start: datetime) -> str:
+    return start.strftime("%Y-%m-%dT%H") if bucket_type == "hour" else start.strftime("%Y-%m-%d")
+
+
+def _parse_bucket_name(bucket_type: str, name: str) -> datetime:
+    return datetime.strptime(name, "%Y-%m-%dT%H" if bucket_type == "hour" else "%Y-%m-%d")
+
+
+def record_event(
+    metric: str,
+    amount: int = 1,
+    user_id: Optional[int] = None,
+    at: Optional[datetime] = None
+):
+    """增量记录一个指标事件（同时写入小时和天两个时间段）"""
+    at = at or datetime.now()
+    try:
+        pipe = redis_client.pipeline()
+        for bucket_type in BUCKET_TYPES:
+            bucket = _bucket_name(bucket_type, bucket_start(bucket_type, at))
+            key = ROLLUP_KEY.format(bucket_type=bucket_type, bucket=bucket)
+            pipe.hincrby(key, metric, amount)
+            pipe.expire(key, ROLLUP_TTL)
+            if user_id is not None:
+                users_key = ROLLUP_USERS_KEY.format(bucket_type=bucket_type, bucket=bucket)
+                pipe.sadd(users_key, user_id)
+                pipe.expire(users_key, ROLLUP_TTL)
+            pipe.sadd(ROLLUP_DIRTY_KEY, f"{bucket_type}|{bucket}")
+        pipe.execute()
+    except Exception as e:
+        # 统计失败不影响业务请求，缺失的数据可通过回填修复
+        logger.warning(f"记录统计指标失败: {str(e)}")
+
+
+def record_activity(user_id: int, action: str, entity_type: str, at: Optional[datetime] = None):
+    """根据活动日志事件更新统计汇总"""
+    record_event("total_activities", user_id=user_id, at=at)
+    if action == "create" and entity_type == "card":
+        record_event("new_cards", at=at)
+    elif action == "create" and entity_type == "project":
+        record_event("new_projects", at=at)
+
+
+def _upsert_rollups(db: Session, rows: Iterable[Tuple[str, datetime, str, int]]):
+    """写入汇总行（绝对值覆盖，可重复执行）"""
+    rows = list(rows)
+    if not rows:
+        return
+
+    starts = {start for _, start, _, _ in rows}
+    existing = {
+        (r.bucket_type, r.bucket_start, r.metric): r
+        for r in db.query(MetricRollup).filter(MetricRollup.bucket_start.in_(starts)).all()
+    }
+    for bucket_type, start, metric, value in rows:
+        rollup = existing.get((bucket_type, start, metric))
+        if rollup is None:
+            db.add(MetricRollup(bucket_type=bucket_type, bucket_start=start, metric=metric, value=value))
+        else:
+            rollup.value = value
+
+
+def flush_rollups(db: Session) -> int:
+    """将Redis中有变化的时间段计数写入汇总表，返回写入的时间段数量"""
+    dirty = redis_client.spop(ROLLUP_DIRTY_KEY, redis_client.scard(ROLLUP_DIRTY_KEY) or 1) or []
+    if not dirty:
+        return 0
+
+    buckets = []
+    pipe = redis_client.pipeline()
+    for member in dirty:
+        bucket_type, bucket = member.split("|", 1)
+        buckets.append((bucket_type, bucket))
+        pipe.hgetall(ROLLUP_KEY.format(bucket_type=bucket_type, bucket=bucket))
+        pipe.scard(ROLLUP_USERS_KEY.format(bucket_type=bucket_type, bucket=bucket))
+    results = pipe.execute()
+
+    rows = []
+    for index, (bucket_type, bucket) in enumerate(buckets):
+        counts, active_users = results[index * 2], results[index * 2 + 1]
+        start = _parse_bucket_name(bucket_type, bucket)
+        for metric, value in counts.items():
+            rows.append((bucket_type, start, metric, int(value)))
+        if active_users:
+            rows.append((bucket_type, start, "active_users", int(active_users)))
+
+    try:
+        _upsert_rollups(db, rows)
+        db.commit()
+    except Exception:
+        db.rollback()
+        # 写入失败，放回待写入集合等待下次重试
+        redis_client.sadd(ROLLUP_DIRTY_KEY, *dirty)
+        raise
+
+    return len(buckets)
+
+
+def _compute_day(db: Session, day: date, chunk_size: int) -> Dict[Tuple[str, datetime], Dict[str, Any]]:
+    """从历史数据重新计算某一天的小时/天汇总"""
+    day_start = datetime.combine(day, datetime.min.time())
+    day_end = day_start + timedelta(days=1)
+
+    buckets: Dict[Tuple[str, datetime], Dict[str, Any]] = defaultdict(
+        lambda: {"counts": defaultdict(int), "users": set()}
+    )
+
+    def add(at: datetime, metric: str, user_id: Optional[int] = None):
+        for bucket_type in BUCKET_TYPES:
+            bucket = buckets[(bucket_type, bucket_start(bucket_type, at))]
+            bucket["counts"][metric] += 1
+            if user_id is not None:
+                bucket["users"].add(user_id)
+
+    # 按时间范围分块流式读取，只取需要的列
+    sources = (
+        ("new_users", db.query(User.created_at).filter(User.created_at >= day_start, User.created_at < day_end)),
+        ("new_projects", db.query(Project.created_at).filter(Project.created_at >= day_start, Project.created_at < day_end)),
+        ("new_cards", db.query(Card.created_at).filter(Card.created_at >= day_start, Card.created_at < day_end)),
+    )
+    for metric, query in sources:
+        for (created_at,) in query.yield_per(chunk_size):
+            add(created_at, metric)
+
+    activities = db.query(ActivityLog.created_at, ActivityLog.user_id).filter(
+        ActivityLog.created_at >= day_start,
+        ActivityLog.created_at < day_end
+    )
+    for created_at, user_id in activities.yield_per(chunk_size):
+        add(created_at, "total_activities", user_id)
+
+    # 没有任何数据的一天也写入0值，报告读取时不必区分
+    buckets[("day", day_start)]
+    return buckets
+
+
+def backfill_rollups(
+    db: Session,
+    start_date: date,
+    end_date: date,
+    chunk_size: int = 5000
+) -> Dict[str, Any]:
+    """按天从历史数据回填汇总表（包含起止日期），每天提交一次"""
+    days = 0
+    rows_written = 0
+    hot_since = datetime.now() - timedelta(seconds=ROLLUP_TTL)
+
+    day = start_date
+    while day <= end_date:
+        buckets = _compute_day(db, day, chunk_size)
+
+        rows = []
+        for (bucket_type, start), bucket in buckets.items():
+            counts = dict(bucket["counts"])
+            counts["active_users"] = len(bucket["users"])
+            for metric in METRICS:
+                rows.append((bucket_type, start, metric, counts.get(metric, 0)))
+
+        _upsert_rollups(db, rows)
+        db.commit()
+
+        # 仍在Redis保留期内的时间段，用回填结果重置实时计数，避免之后被旧计数覆盖
+        if datetime.combine(day, datetime.max.time()) >= hot_since:
+            try:
+                pipe = redis_client.pipeline()
+                for (bucket_type, start), bucket in buckets.items():
+                    name = _bucket_name(bucket_type, start)
+                    key = ROLLUP_KEY.format(bucket_type=bucket_type, bucket=name)
+                    users_key = ROLLUP_USERS_KEY.format(bucket_type=bucket_type, bucket=name)
+                    pipe.delete(key, users_key)
+                    if bucket["counts"]:
+                        pipe.hset(key, mapping=dict(bucket["counts"]))
+                        pipe.expire(key, ROLLUP_TTL)
+                    if bucket["users"]:
+                        pipe.sadd(users_key, *bucket["users"])
+                        pipe.expire(users_key, ROLLUP_TTL)
+                pipe.execute()
+            except Exception as e:
+                logger.warning(f"重置实时统计计数失败: {str(e)}")
+
+        days += 1
+        rows_written += len(rows)
+        logger.info(f"回填统计汇总: {day.isoformat()} ({len(rows)} 行)")
+        day += timedelta(days=1)
+
+    return {"days": days, "rows": rows_written}
+
+
+def get_rollups(db: Session, bucket_type: str, start: datetime, end: datetime) -> List[MetricRollup]:
+    """获取时间范围内的汇总行"""
+    return db.query(MetricRollup).filter(
+        MetricRollup.bucket_type == bucket_type,
+        MetricRollup.bucket_start >= start,
+        MetricRollup.bucket_start < end
+    ).order_by(MetricRollup.bucket_start).all()
+
+
+def get_daily_metrics(db: Session, day: date) -> Dict[str, int]:
+    """获取某一天的汇总指标"""
+    day_start = datetime.combine(day, datetime.min.time())
+    rows = get_rollups(db, "day", day_start, day_start + timedelta(days=1))
+    metrics = {metric: 0 for metric in METRICS}
+    metrics.update({row.metric: row.value for row in rows})
+    return metrics
@@ -0,0 +1,161 @@
+from typing import TYPE_CHECKING, Any, Dict, Optional
+from datetime import datetime
+import json
+
+from app.core.redis import redis_client
+
+if TYPE_CHECKING:
+    import redis
+
+
+class NotificationStore:
+    """通知收件箱存储
+
+    每个用户使用三个键:
+    - notifications:{user_id}:inbox   有序集合, member为通知ID, score为自增ID(即时间顺序)
+    - notifications:{user_id}:unread  集合, 保存未读通知ID, 未读数为 SCARD, O(1)
+    - notifications:{user_id}:items   哈希, 通知ID -> 通知JSON(不含已读状态)
+
+    通知ID由全局计数器 seq:notifications 生成，计数器永不过期，
+    不能放在 notifications: 前缀下（cleanup_expired_cache 会给该前缀下没有过期时间的键加上24小时过期，
+    计数器过期后从1重新开始，新通知会覆盖同ID的旧通知并排在最旧的位置）。
+    """
+
+    sequence_key = "seq:notifications"
+    legacy_sequence_key = "notifications:seq"
+
+    def __init__(self, redis_client: "redis.Redis", max_items: int = 100, ttl: int = 30 * 24 * 60 * 60):
+        self.client = redis_client
+        self.max_items = max_items  # 每个用户保留最近的通知数量
+        self.ttl = ttl  # 30天
+        self._sequence_checked = False
+
+    @staticmethod
+    def _inbox_key(user_id: int) -> str:
+        return f"notifications:{user_id}:inbox"
+
+    @staticmethod
+    def _unread_key(user_id: int) -> str:
+        return f"notifications:{user_id}:unread"
+
+    @staticmethod
+    def _items_key(user_id: int) -> str:
+        return f"notifications:{user_id}:items"
+
+    def add(
+        self,
+        user_id: int,
+        notification_type: str,
+        title: str,
+        message: str,
+        data: Dict[str, Any] = None
+    ) -> Dict[str, Any]:
+        """写入一条未读通知并裁剪收件箱"""
+        notification_id = self._next_id()
+        notification = {
+            "id": notification_id,
+            "user_id": user_id,
+            "type": notification_type,
+            "title": title,
+            "message": message,
+            "data": data or {},
+            "created_at": datetime.now().isoformat()
+        }
+
+        inbox_key = self._inbox_key(user_id)
+        unread_key = self._unread_key(user_id)
+        items_key = self._items_key(user_id)
+
+        pipe = self.client.pipeline()
+        pipe.zadd(inbox_key, {notification_id: notification_id})
+        pipe.sadd(unread_key, notification_id)
+        pipe.hset(items_key, notification_id, json.dumps(notification, ensure_ascii=False))
+        # 取出超出保留数量的最旧通知
+        pipe.zrange(inbox_key, 0, -(self.max_items + 1))
+        results = pipe.execute()
+
+        expired_ids = results[-1]
+        pipe = self.client.pipeline()
+        if expired_ids:
+            pipe.zrem(inbox_key, *expired_ids)
+            pipe.srem(unread_key, *expired_ids)
+            pipe.hdel(items_key, *expired_ids)
+        for key in (inbox_key, unread_key, items_key):
+            pipe.expire(key, self.ttl)
+        pipe.execute()
+
+        notification["read"] = False
+        return notification
+
+    def _next_id(self) -> int:
+        if not self._sequence_checked:
+            # 从旧的计数器键继续编号（只在计数器不存在时设置），避免与已有通知的ID重复
+            legacy = self.client.get(self.legacy_sequence_key)
+            if legacy is not None:
+                self.client.set(self.sequence_key, legacy, nx=True)
+            self._sequence_checked = True
+        return int(self.client.incr(self.sequence_key))
+
+    def get_page(
+        self,
+        user_id: int,
+        cursor: Optional[int] = None,
+        limit: int = 20,
+        unread_only: bool = False
+    ) -> Dict[str, Any]:
+        """按时间倒序分页获取通知, cursor为上一页最后一条通知的ID"""
+        inbox_key = self._inbox_key(user_id)
+        unread_key = self._unread_key(user_id)
+        max_score = f"({cursor}" if cursor is not None else "+inf"
+
+        if unread_only:
+            ids = sorted((int(i) for i in self.client.smembers(unread_key)), reverse=True)
+            if cursor is not None:
+                ids = [i for i in ids if i < cursor]
+            ids = ids[:limit + 1]
+        else:
+            ids = [int(i) for i in self.client.zrevrangebyscore(inbox_key, max_score, "-inf", start=0, num=limit + 1)]
+
+        has_more = len(ids) > limit
+        ids = ids[:limit]
+        if not ids:
+            return {"items": [], "next_cursor": None}
+
+        pipe = self.client.pipeline()
+        pipe.hmget(self._items_key(user_id), ids)
+        pipe.smismember(unread_key, ids)
+        raw_items, unread_flags = pipe.execute()
+
+        items = []
+        for raw, unread in zip(raw_items, unread_flags):
+            if raw is None:
+                continue
+            notification = json.loads(raw)
+            notification["read"] = not unread
+            items.append(notification)
+
+        return {
+            "items": items,
+            "next_cursor": str(ids[-1]) if has_more else None
+        }
+
+    def unread_count(self, user_id: int) -> int:
+        """获取未读通知数量"""
+        return int(self.client.scard(self._unread_key(user_id)))
+
+    def mark_read(self, user_id: int, notification_id: int) -> bool:
+        """标记单条通知为已读"""
+        return bool(self.client.srem(self._unread_key(user_id), notification_id))
+
+    def mark_all_read(self, user_id: int) -> int:
+        """标记全部通知为已读"""
+        unread_key = self._unread_key(user_id)
+        pipe = self.client.pipeline()
+        pipe.scard(unread_key)
+        pipe.delete(unread_key)
+        count, _ = pipe.execute()
+        return int(count)
+
+
+# 创建通知存储实例
+notification_store = NotificationStore(redis_client)
@@ -0,0 +1,315 @@
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List as ListType, Optional, Set
+import logging
+import re
+
+from sqlalchemy import event, inspect, select
+from sqlalchemy.orm import Session
+
+from app.core.redis import redis_client
+from app.models.models import Card, CardLabel, List
+
+if TYPE_CHECKING:
+    import redis
+
+logger = logging.getLogger(__name__)
+
+# 中日韩字符（统一表意文字、扩展A、兼容表意文字、假名、谚文）
+_CJK = "\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uac00-\ud7af"
+_TOKEN_RE = re.compile(f"[{_CJK}]+|[0-9a-z]+")
+_CJK_RE = re.compile(f"[{_CJK}]")
+
+
+def tokenize(text: Optional[str]) -> Set[str]:
+    """索引分词：英文/数字按单词，中日韩文本按单字和相邻二字"""
+    tokens: Set[str] = set()
+    if not text:
+        return tokens
+    for run in _TOKEN_RE.findall(text.lower()):
+        if _CJK_RE.match(run):
+            tokens.update(run)
+            tokens.update(run[i:i + 2] for i in range(len(run) - 1))
+        else:
+            tokens.add(run)
+    return tokens
+
+
+def tokenize_query(text: str) -> Set[str]:
+    """查询分词：中日韩文本只用相邻二字（单字查询用单字），减少需要求交集的集合"""
+    tokens: Set[str] = set()
+    for run in _TOKEN_RE.findall(text.lower()):
+        if _CJK_RE.match(run) and len(run) > 1:
+            tokens.update(run[i:i + 2] for i in range(len(run) - 1))
+        else:
+            tokens.add(run)
+    return tokens
+
+
+# KEYS: 查询的各个词在一个项目中的有序集合；ARGV: 上限（"+inf" 或 "(<cursor>"），返回数量，每次读取的数量。
+# 从最小的集合按ID倒序逐块读取候选卡片，用 ZSCORE 检查其他词，凑满一页即返回：
+# 每页的开销与扫描到的候选数量有关，与匹配的卡片总数无关（常见的单个词只读取一页）。
+SEARCH_SCRIPT = """
+local sets = {}
+for i, key in ipairs(KEYS) do
+    local size = redis.call('ZCARD', key)
+    if size == 0 then
+        return {}
+    end
+    sets[i] = {size, key}
+end
+table.sort(sets, function(a, b) return a[1] < b[1] end)
+local max = ARGV[1]
+local limit = tonumber(ARGV[2])
+local chunk = tonumber(ARGV[3])
+local result = {}
+while true do
+    local ids = redis.call('ZREVRANGEBYSCORE', sets[1][2], max, '-inf', 'LIMIT', 0, chunk)
+    for _, id in ipairs(ids) do
+        local matched = true
+        for i = 2, #sets do
+            if not redis.call('ZSCORE', sets[i][2], id) then
+                matched = false
+                break
+            end
+        end
+        if matched then
+            result[#result + 1] = id
+            if #result >= limit then
+                return result
+            end
+        end
+    end
+    if #ids < chunk then
+        return result
+    end
+    max = '(' .. ids[#ids]
+end
+"""
+
+
+class CardSearchIndex:
+    """卡片倒排索引
+
+    索引保存在Redis中，所有API进程和Celery worker共享，按项目分片:
+    - search:v2:p:{project_id}:t:{token}  有序集合, 该项目中包含该词的卡片ID（score 也是卡片ID）
+    - search:v2:card:{card_id}            哈希, 卡片所属项目和已索引的词(用于增量更新时删除旧词)
+    查询在用户有权访问的每个项目中从 cursor 开始按ID倒序取一页（SEARCH_SCRIPT），再合并各项目的结果。
+    """
+
+    prefix = "search:v2"
+    # 旧版本（集合）索引的键，重建索引时删除
+    legacy_patterns = ("search:p:*", "search:card:*")
+    scan_chunk = 200
+
+    def __init__(self, redis_client: "redis.Redis"):
+        self.client = redis_client
+        self._script = None
+
+    def _term_key(self, project_id: int, token: str) -> str:
+        return f"{self.prefix}:p:{project_id}:t:{token}"
+
+    def _card_key(self, card_id: int) -> str:
+        return f"{self.prefix}:card:{card_id}"
+
+    @staticmethod
+    def document_tokens(title: str, description: Optional[str], labels: Iterable[str]) -> Set[str]:
+        tokens = tokenize(title) | tokenize(description)
+        for label in labels:
+            tokens |= tokenize(label)
+        return tokens
+
+    def index_cards(self, documents: ListType[Dict[str, Any]]):
+        """批量写入或更新卡片索引，documents 为 [{"id", "project_id", "title", "description", "labels"}]"""
+        if not documents:
+            return
+
+        pipe = self.client.pipeline()
+        for doc in documents:
+            pipe.hmget(self._card_key(doc["id"]), "project_id", "terms")
+        previous = pipe.execute()
+
+        pipe = self.client.pipeline(transaction=False)
+        for doc, (old_project_id, old_terms) in zip(documents, previous):
+            card_id = doc["id"]
+            project_id = doc["project_id"]
+            tokens = self.document_tokens(doc["title"], doc.get("description"), doc.get("labels", ()))
+            old_tokens = set(old_terms.split(" ")) if old_terms else set()
+
+            if old_project_id is not None and int(old_project_id) != project_id:
+                # 卡片移动到其他项目：删除旧项目中的全部词
+                for token in old_tokens:
+                    pipe.zrem(self._term_key(int(old_project_id), token), card_id)
+                old_tokens = set()
+
+            for token in old_tokens - tokens:
+                pipe.zrem(self._term_key(project_id, token), card_id)
+            for token in tokens - old_tokens:
+                pipe.zadd(self._term_key(project_id, token), {card_id: card_id})
+            pipe.hset(self._card_key(card_id), mapping={
+                "project_id": project_id,
+                "terms": " ".join(sorted(tokens))
+            })
+        pipe.execute()
+
+    def remove_cards(self, card_ids: Iterable[int]):
+        """从索引中删除卡片"""
+        card_ids = list(card_ids)
+        if not card_ids:
+            return
+
+        pipe = self.client.pipeline()
+        for card_id in card_ids:
+            pipe.hmget(self._card_key(card_id), "project_id", "terms")
+        previous = pipe.execute()
+
+        pipe = self.client.pipeline(transaction=False)
+        for card_id, (project_id, terms) in zip(card_ids, previous):
+            if project_id is not None and terms:
+                for token in terms.split(" "):
+                    pipe.zrem(self._term_key(int(project_id), token), card_id)
+            pipe.delete(self._card_key(card_id))
+        pipe.execute()
+
+    def search(
+        self,
+        query: str,
+        project_ids: Iterable[int],
+        cursor: Optional[int] = None,
+        limit: int = 20
+    ) -> ListType[int]:
+        """在指定项目中搜索，返回按ID倒序的卡片ID（cursor为上一页最后一个ID）"""
+        tokens = sorted(tokenize_query(query))
+        project_ids = list(project_ids)
+        if not tokens or not project_ids:
+            return []
+
+        if self._script is None:
+            self._script = self.client.register_script(SEARCH_SCRIPT)
+        max_score = f"({cursor}" if cursor is not None else "+inf"
+
+        # 每个项目最多取 limit 个，合并后取ID最大的 limit 个
+        pipe = self.client.pipeline(transaction=False)
+        for project_id in project_ids:
+            self._script(
+                keys=[self._term_key(project_id, token) for token in tokens],
+                args=[max_score, limit, self.scan_chunk],
+                client=pipe
+            )
+        card_ids = {int(card_id) for members in pipe.execute() for card_id in members}
+        return sorted(card_ids, reverse=True)[:limit]
+
+    def drop_legacy_index(self) -> int:
+        """删除旧版本（集合）索引的键，返回删除的数量"""
+        deleted = 0
+        for pattern in self.legacy_patterns:
+            batch = []
+            for key in self.client.scan_iter(match=pattern, count=1000):
+                batch.append(key)
+                if len(batch) >= 1000:
+                    deleted += self.client.delete(*batch)
+                    batch = []
+            if batch:
+                deleted += self.client.delete(*batch)
+        return deleted
+
+
+# 创建搜索索引实例
+card_search_index = CardSearchIndex(redis_client)
+
+
+def load_card_documents(connection, card_ids: Iterable[int]) -> ListType[Dict[str, Any]]:
+    """从数据库读取需要索引的卡片内容（标题、描述、标签、所属项目）"""
+    card_ids = list(card_ids)
+    if not card_ids:
+        return []
+
+    documents = {
+        card_id: {"id": card_id, "project_id": project_id, "title": title, "description": description, "labels": []}
+        for card_id, project_id, title, description in connection.execute(
+            select(Card.id, List.project_id, Card.title, Card.description).join(
+                List, List.id == Card.list_id
+            ).where(Card.id.in_(card_ids))
+        )
+    }
+    for card_id, label in connection.execute(
+        select(CardLabel.card_id, CardLabel.label).where(CardLabel.card_id.in_(list(documents)))
+    ):
+        documents[card_id]["labels"].append(label)
+    return list(documents.values())
+
+
+def rebuild_search_index(db: Session, chunk_size: int = 1000, project_id: Optional[int] = None) -> int:
+    """按ID分块重建卡片索引（指定 project_id 时只重建该项目），返回索引的卡片数量"""
+    indexed = 0
+    last_id = 0
+    connection = db.connection()
+    while True:
+        query = select(Card.id).where(Card.id > last_id)
+        if project_id is not None:
+            query = query.join(List, List.id == Card.list_id).where(List.project_id == project_id)
+        card_ids = list(connection.execute(query.order_by(Card.id).limit(chunk_size)).scalars())
+        if not card_ids:
+            break
+        card_search_index.index_cards(load_card_documents(connection, card_ids))
+        indexed += len(card_ids)
+        last_id = card_ids[-1]
+        logger.info(f"重建搜索索引: 已索引 {indexed} 张卡片")
+    return indexed
+
+
+_INDEXED_CARD_FIELDS = ("title", "description", "list_id")
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_search_changes(session: Session, flush_context):
+    """收集需要更新索引的卡片，在flush时读取内容，提交后写入索引"""
+    reindex: Set[int] = set()
+    removed: Set[int] = set()
+
+    for obj in session.new:
+        if isinstance(obj, Card):
+            reindex.add(obj.id)
+        elif isinstance(obj, CardLabel):
+            reindex.add(obj.card_id)
+
+    for obj in session.dirty:
+        if isinstance(obj, Card):
+            state = inspect(obj)
+            if any(state.attrs[field].history.has_changes() for field in _INDEXED_CARD_FIELDS):
+                reindex.add(obj.id)
+        elif isinstance(obj, CardLabel):
+            reindex.add(obj.card_id)
+
+    for obj in session.deleted:
+        if isinstance(obj, Card):
+            removed.add(obj.id)
+        elif isinstance(obj, CardLabel):
+            reindex.add(obj.card_id)
+
+    reindex -= removed
+    if not (reindex or removed):
+        return
+
+    pending = session.info.setdefault("search_index", {"documents": {}, "removed": set()})
+    for document in load_card_documents(session.connection(), reindex):
+        pending["documents"][document["id"]] = document
+    for card_id in removed:
+        pending["documents"].pop(card_id, None)
+    pending["removed"] |= removed
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_search_changes(session: Session):
+    pending = session.info.pop("search_index", None)
+    if not pending:
+        return
+    try:
+        card_search_index.index_cards(list(pending["documents"].values()))
+        card_search_index.remove_cards(pending["removed"])
+    except Exception as e:
+        # 索引更新失败不影响业务请求，可通过重建索引修复
+        logger.warning(f"更新搜索索引失败: {str(e)}")
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_search_changes(session: Session):
+    session.info.pop("search_index", None)
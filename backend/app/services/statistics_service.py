@@ -0,0 +1,184 @@
+from typing import Any, Dict, Set
+import json
+
+from sqlalchemy import event, func, inspect, select
+from sqlalchemy.orm import Session
+
+from app.core.redis import cache
+from app.models.models import ActivityLog, Card, CardAssignment, List, Project, ProjectMember, ProjectWorkload
+
+STATS_CACHE_TTL = 600  # 10分钟，数据变化时会主动失效
+PROJECT_STATS_KEY = "stats:project:{project_id}"
+USER_STATS_KEY = "stats:user:{user_id}"
+
+
+def compute_project_statistics(db: Session, project_id: int) -> Dict[str, Any]:
+    """读取项目进度、各列表卡片数和各成员卡片数（来自写入时维护的计数器）"""
+    totals = db.query(Project.card_count, Project.done_card_count).filter(Project.id == project_id).first()
+    total_cards, completed_cards = totals if totals else (0, 0)
+
+    list_rows = db.query(List.id, List.name, List.position, List.card_count).filter(
+        List.project_id == project_id
+    ).order_by(List.position, List.id).all()
+
+    member_rows = db.query(
+        ProjectWorkload.user_id,
+        ProjectWorkload.assigned_cards,
+        ProjectWorkload.done_cards
+    ).filter(
+        ProjectWorkload.project_id == project_id,
+        ProjectWorkload.assigned_cards > 0
+    ).order_by(ProjectWorkload.user_id).all()
+
+    progress = (completed_cards / total_cards * 100) if total_cards > 0 else 0
+
+    return {
+        "project_id": project_id,
+        "total_cards": total_cards,
+        "completed_cards": completed_cards,
+        "progress": round(progress, 2),
+        "lists": [
+            {"list_id": list_id, "name": name, "position": position, "card_count": count}
+            for list_id, name, position, count in list_rows
+        ],
+        "members": [
+            {"user_id": user_id, "assigned_cards": assigned, "completed_cards": completed}
+            for user_id, assigned, completed in member_rows
+        ]
+    }
+
+
+def compute_user_statistics(db: Session, user_id: int) -> Dict[str, Any]:
+    """计算用户统计信息（所有计数在一条语句中完成）"""
+    owned_projects = select(func.count(Project.id)).where(
+        Project.owner_id == user_id
+    ).scalar_subquery()
+    participated_projects = select(func.count(ProjectMember.id)).where(
+        ProjectMember.user_id == user_id
+    ).scalar_subquery()
+    assigned_cards = select(func.coalesce(func.sum(ProjectWorkload.assigned_cards), 0)).where(
+        ProjectWorkload.user_id == user_id
+    ).scalar_subquery()
+    completed_cards = select(func.coalesce(func.sum(ProjectWorkload.done_cards), 0)).where(
+        ProjectWorkload.user_id == user_id
+    ).scalar_subquery()
+    activities = select(func.count(ActivityLog.id)).where(
+        ActivityLog.user_id == user_id
+    ).scalar_subquery()
+
+    row = db.execute(select(
+        owned_projects.label("owned_projects"),
+        participated_projects.label("participated_projects"),
+        assigned_cards.label("assigned_cards"),
+        completed_cards.label("completed_cards"),
+        activities.label("total_activities")
+    )).one()
+
+    return {"user_id": user_id, **{key: int(value) for key, value in row._asdict().items()}}
+
+
+def get_project_statistics(db: Session, project_id: int) -> Dict[str, Any]:
+    """获取项目统计（带缓存）"""
+    cache_key = PROJECT_STATS_KEY.format(project_id=project_id)
+    cached = cache.get(cache_key)
+    if cached:
+        return json.loads(cached)
+
+    stats = compute_project_statistics(db, project_id)
+    cache.set(cache_key, json.dumps(stats, ensure_ascii=False), STATS_CACHE_TTL)
+    return stats
+
+
+def get_user_statistics(db: Session, user_id: int) -> Dict[str, Any]:
+    """获取用户统计（带缓存）"""
+    cache_key = USER_STATS_KEY.format(user_id=user_id)
+    cached = cache.get(cache_key)
+    if cached:
+        return json.loads(cached)
+
+    stats = compute_user_statistics(db, user_id)
+    cache.set(cache_key, json.dumps(stats, ensure_ascii=False), STATS_CACHE_TTL)
+    return stats
+
+
+def invalidate_statistics(project_ids: Set[int] = (), user_ids: Set[int] = ()):
+    """使项目/用户统计缓存失效"""
+    for project_id in project_ids:
+        cache.delete(PROJECT_STATS_KEY.format(project_id=project_id))
+    for user_id in user_ids:
+        cache.delete(USER_STATS_KEY.format(user_id=user_id))
+
+
+def _history_values(obj, attr: str) -> Set[Any]:
+    """获取属性的当前值和本次修改前的值"""
+    history = inspect(obj).attrs[attr].history
+    values = set(history.added or ()) | set(history.deleted or ()) | set(history.unchanged or ())
+    values.add(getattr(obj, attr, None))
+    values.discard(None)
+    return values
+
+
+def _attr_changed(obj, attr: str) -> bool:
+    return inspect(obj).attrs[attr].history.has_changes()
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_statistics_changes(session: Session, flush_context):
+    """在flush时收集受影响的项目和用户，提交成功后再使缓存失效"""
+    pending = session.info.setdefault("stats_invalidate", {"projects": set(), "users": set()})
+    list_ids: Set[int] = set()
+    assignee_card_ids: Set[int] = set()
+    assignee_list_ids: Set[int] = set()
+
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, Card):
+            list_ids |= _history_values(obj, "list_id")
+            # 卡片移动可能改变被分配用户的完成数
+            if obj in session.dirty and _attr_changed(obj, "list_id") and obj.id is not None:
+                assignee_card_ids.add(obj.id)
+        elif isinstance(obj, List):
+            pending["projects"] |= _history_values(obj, "project_id")
+            # 列表改名可能改变"已完成"的判定
+            if obj in session.dirty and _attr_changed(obj, "name") and obj.id is not None:
+                assignee_list_ids.add(obj.id)
+        elif isinstance(obj, Project):
+            if obj.id is not None:
+                pending["projects"].add(obj.id)
+            pending["users"] |= _history_values(obj, "owner_id")
+        elif isinstance(obj, ProjectMember):
+            pending["users"] |= _history_values(obj, "user_id")
+        elif isinstance(obj, CardAssignment):
+            pending["users"] |= _history_values(obj, "user_id")
+            card_id = obj.card_id
+            if card_id is not None:
+                assignee_card_ids.add(card_id)
+        elif isinstance(obj, ActivityLog):
+            if obj.user_id is not None:
+                pending["users"].add(obj.user_id)
+
+    connection = session.connection()
+    if assignee_card_ids:
+        list_ids |= set(connection.execute(
+            select(Card.list_id).where(Card.id.in_(assignee_card_ids))
+        ).scalars())
+    if list_ids:
+        pending["projects"] |= set(connection.execute(
+            select(List.project_id).where(List.id.in_(list_ids))
+        ).scalars())
+    if assignee_card_ids or assignee_list_ids:
+        query = select(CardAssignment.user_id).join(Card, Card.id == CardAssignment.card_id).where(
+            Card.id.in_(assignee_card_ids) | Card.list_id.in_(assignee_list_ids)
+        )
+        pending["users"] |= set(connection.execute(query).scalars())
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(session: Session):
+    pending = session.info.pop("stats_invalidate", None)
+    if pending:
+        invalidate_statistics(pending["projects"], pending["users"])
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_after_rollback(session: Session):
+    session.info.pop("stats_invalidate", None)
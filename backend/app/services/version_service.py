@@ -0,0 +1,306 @@
+from typing import Any, Dict, List as ListType, Optional, Set, Tuple
+from collections import defaultdict
+import logging
+
+from sqlalchemy import event, insert, inspect, select, union, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.core.concurrency import project_version_etag
+from app.core.redis import redis_client
+from app.models.models import Card, CardAssignment, CardLabel, List, Project, ProjectChange, ProjectMember, User
+
+logger = logging.getLogger(__name__)
+
+PROJECT_VERSION_KEY = "version:project:{project_id}"
+PROJECT_VERSION_TTL = 3600  # 版本号以数据库为准，Redis中只是缓存，过期后重新读取
+
+# 只在新版本号更大时写入，避免并发提交的先后顺序导致版本号回退
+_SET_IF_GREATER = """
+local current = tonumber(redis.call('GET', KEYS[1]) or '-1')
+if tonumber(ARGV[1]) > current then
+    redis.call('SET', KEYS[1], ARGV[1], 'EX', ARGV[2])
+end
+return 1
+"""
+_set_if_greater = None
+
+
+def _cache_versions(versions: Dict[int, int]):
+    global _set_if_greater
+    try:
+        if _set_if_greater is None:
+            # 首次使用时注册脚本，导入模块时不创建Redis客户端
+            _set_if_greater = redis_client.register_script(_SET_IF_GREATER)
+        pipe = redis_client.pipeline()
+        for project_id, version in versions.items():
+            _set_if_greater(
+                keys=[PROJECT_VERSION_KEY.format(project_id=project_id)],
+                args=[version, PROJECT_VERSION_TTL],
+                client=pipe
+            )
+        pipe.execute()
+    except Exception as e:
+        logger.warning(f"更新项目版本缓存失败: {str(e)}")
+
+
+def get_project_version(project_id: int) -> Optional[int]:
+    """获取项目当前版本号（Redis缓存，未命中时从数据库读取），获取失败时返回None"""
+    try:
+        version = redis_client.get(PROJECT_VERSION_KEY.format(project_id=project_id))
+        if version is not None:
+            return int(version)
+    except Exception as e:
+        logger.warning(f"读取项目版本失败: {str(e)}")
+        return None
+
+    from app.core.database import SessionLocal
+    with SessionLocal() as db:
+        version = db.query(Project.version).filter(Project.id == project_id).scalar()
+    if version is None:
+        return None
+    _cache_versions({project_id: version})
+    return version
+
+
+def project_etag(project_id: int, db: Optional[Session] = None) -> Optional[str]:
+    """
+    根据项目版本号生成ETag，项目内任何数据变化都会改变它
+
+    传入 db 时从该会话读取版本号（用于从只读副本构建的响应，ETag与副本上的数据一致）。
+    """
+    if db is not None:
+        version = db.query(Project.version).filter(Project.id == project_id).scalar()
+    else:
+        version = get_project_version(project_id)
+    if version is None:
+        return None
+    return project_version_etag(project_id, version)
+
+
+def _history_values(obj, attr: str) -> Set[Any]:
+    """获取属性的当前值和本次修改前的值"""
+    history = inspect(obj).attrs[attr].history
+    values = set(history.added or ()) | set(history.deleted or ()) | set(history.unchanged or ())
+    values.add(getattr(obj, attr, None))
+    values.discard(None)
+    return values
+
+
+def _record_change(connection, project_id: int, entity_type: str, entity_id: int, version: int, deleted: bool):
+    """写入实体的最近一次变化，不存在时插入"""
+    where = (
+        (ProjectChange.project_id == project_id) &
+        (ProjectChange.entity_type == entity_type) &
+        (ProjectChange.entity_id == entity_id)
+    )
+    values = {"version": version, "deleted": deleted}
+    if connection.execute(update(ProjectChange).where(where).values(**values)).rowcount:
+        return
+    try:
+        # 使用保存点，并发插入同一行时退回到更新
+        with connection.begin_nested():
+            connection.execute(insert(ProjectChange).values(
+                project_id=project_id, entity_type=entity_type, entity_id=entity_id, **values
+            ))
+    except IntegrityError:
+        connection.execute(update(ProjectChange).where(where).values(**values))
+
+
+@event.listens_for(Session, "after_flush")
+def _record_project_changes(session: Session, flush_context):
+    """
+    在同一事务内递增受影响项目的版本号，并记录变化的实体（删除记为墓碑）
+
+    UPDATE projects 持有行锁直到提交，同一项目的版本号按提交顺序递增。
+    """
+    # (实体类型, 实体ID) -> (是否删除, 直接所属项目, 所属列表, 所属卡片)
+    entities: Dict[Tuple[str, int], Tuple[bool, Set[int], Set[int], Set[int]]] = {}
+    touched_lists: Set[int] = set()
+    card_lists: Dict[int, int] = {}
+    # 资料被修改的用户：项目详情和卡片列表中嵌入了所有者、成员和被分配人的资料
+    changed_users: Set[int] = set()
+
+    def add(entity_type, obj, deleted, projects=(), lists=(), cards=()):
+        if obj.id is not None:
+            entities[(entity_type, obj.id)] = (deleted, set(projects), set(lists), set(cards))
+
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        deleted = obj in session.deleted
+        if isinstance(obj, Project):
+            if not deleted:
+                add("project", obj, False, projects={obj.id})
+        elif isinstance(obj, ProjectMember):
+            add("member", obj, deleted, projects=_history_values(obj, "project_id"))
+        elif isinstance(obj, List):
+            add("list", obj, deleted, projects=_history_values(obj, "project_id"))
+        elif isinstance(obj, Card):
+            list_ids = _history_values(obj, "list_id")
+            add("card", obj, deleted, lists=list_ids)
+            if obj.id is not None:
+                card_lists[obj.id] = obj.list_id
+            # 卡片增删和移动会改变列表的卡片数
+            if obj in session.new or deleted or inspect(obj).attrs.list_id.history.has_changes():
+                touched_lists |= list_ids
+        elif isinstance(obj, CardLabel):
+            add("label", obj, deleted, cards=_history_values(obj, "card_id"))
+        elif isinstance(obj, CardAssignment):
+            add("assignment", obj, deleted, cards=_history_values(obj, "card_id"))
+        elif isinstance(obj, User):
+            if not deleted and obj.id is not None and session.is_modified(obj, include_collections=False):
+                changed_users.add(obj.id)
+
+    if not entities and not changed_users:
+        return
+
+    connection = session.connection()
+
+    # 解析卡片 -> 列表 -> 项目
+    card_ids = set().union(*(cards for _, _, _, cards in entities.values())) - set(card_lists)
+    if card_ids:
+        card_lists.update(connection.execute(select(Card.id, Card.list_id).where(Card.id.in_(card_ids))).all())
+    list_ids = set(card_lists.values()) | touched_lists
+    for _, _, lists, _ in entities.values():
+        list_ids |= lists
+    list_ids.discard(None)
+    list_projects: Dict[int, int] = {}
+    if list_ids:
+        list_projects.update(connection.execute(select(List.id, List.project_id).where(List.id.in_(list_ids))).all())
+    for obj in session.deleted:
+        if isinstance(obj, List) and obj.id is not None:
+            list_projects.setdefault(obj.id, obj.project_id)
+
+    for list_id in touched_lists:
+        if list_id in list_projects and ("list", list_id) not in entities:
+            entities[("list", list_id)] = (False, {list_projects[list_id]}, set(), set())
+
+    # 每个项目中的变化: project_id -> [(实体类型, 实体ID, 是否删除)]
+    changes: Dict[int, ListType[Tuple[str, int, bool]]] = defaultdict(list)
+    for (entity_type, entity_id), (deleted, projects, lists, cards) in entities.items():
+        if entity_type == "card":
+            # 当前列表所在项目为更新，移出的项目记为删除
+            current = list_projects.get(card_lists.get(entity_id))
+            for project_id in {list_projects[lid] for lid in lists if lid in list_projects}:
+                changes[project_id].append((entity_type, entity_id, deleted or project_id != current))
+            continue
+        if cards:
+            projects = {list_projects.get(card_lists.get(card_id)) for card_id in cards}
+        for project_id in projects:
+            if project_id is not None:
+                changes[project_id].append((entity_type, entity_id, deleted))
+
+    if changed_users:
+        # 用户资料没有对应的实体变化，只递增版本号，使缓存的响应和ETag失效
+        user_projects = union(
+            select(Project.id).where(Project.owner_id.in_(changed_users)),
+            select(ProjectMember.project_id).where(ProjectMember.user_id.in_(changed_users)),
+            select(List.project_id).join(Card, Card.list_id == List.id).join(
+                CardAssignment, CardAssignment.card_id == Card.id
+            ).where(CardAssignment.user_id.in_(changed_users))
+        )
+        for (project_id,) in connection.execute(user_projects):
+            changes.setdefault(project_id, [])
+
+    deleted_projects = {obj.id for obj in session.deleted if isinstance(obj, Project)}
+    versions = session.info.setdefault("project_versions", {})
+    for project_id, project_changes in changes.items():
+        if project_id in deleted_projects:
+            continue
+        # 显式保留 updated_at，避免 onupdate（MySQL 为 ON UPDATE CURRENT_TIMESTAMP）把版本递增当成项目本身的修改
+        connection.execute(update(Project).where(Project.id == project_id).values(
+            version=Project.version + 1, updated_at=Project.updated_at
+        ))
+        version = connection.execute(select(Project.version).where(Project.id == project_id)).scalar()
+        if version is None:
+            continue
+        for entity_type, entity_id, deleted in project_changes:
+            _record_change(connection, project_id, entity_type, entity_id, version, deleted)
+        versions[project_id] = version
+
+
+@event.listens_for(Session, "after_commit")
+def _cache_after_commit(session: Session):
+    versions = session.info.pop("project_versions", None)
+    if versions:
+        _cache_versions(versions)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_after_rollback(session: Session):
+    session.info.pop("project_versions", None)
+
+
+# 增量同步返回的各类实体字段
+_ENTITY_COLUMNS = {
+    "project": (Project, (
+        Project.id, Project.name, Project.description, Project.owner_id,
+        Project.card_count, Project.done_card_count, Project.version_id, Project.created_at, Project.updated_at
+    )),
+    "member": (ProjectMember, (
+        ProjectMember.id, ProjectMember.project_id, ProjectMember.user_id, ProjectMember.role, ProjectMember.joined_at
+    )),
+    "list": (List, (
+        List.id, List.name, List.position, List.project_id, List.card_count, List.version_id,
+        List.created_at, List.updated_at
+    )),
+    "card": (Card, (
+        Card.id, Card.title, Card.description, Card.position, Card.due_date,
+        Card.list_id, Card.version_id, Card.created_at, Card.updated_at
+    )),
+    "label": (CardLabel, (CardLabel.id, CardLabel.card_id, CardLabel.label, CardLabel.color)),
+    "assignment": (CardAssignment, (
+        CardAssignment.id, CardAssignment.card_id, CardAssignment.user_id, CardAssignment.assigned_at
+    )),
+}
+
+
+def get_changes_since(db: Session, project_id: int, since: int, limit: int = 500) -> Dict[str, Any]:
+    """
+    返回版本号大于 since 的实体变化
+
+    每个实体只返回最近一次变化，未删除的实体附带当前状态，删除的实体为墓碑。
+    同一版本号的变化不会被拆分到两页，has_more 为真时以返回的 version 作为下一次的 since。
+    """
+    # 先读项目版本号：版本号不超过它的变化都已提交（UPDATE projects 的行锁保证提交顺序）
+    current_version = db.query(Project.version).filter(Project.id == project_id).scalar() or 0
+    columns = (ProjectChange.entity_type, ProjectChange.entity_id, ProjectChange.version, ProjectChange.deleted)
+    rows = db.query(*columns).filter(
+        ProjectChange.project_id == project_id,
+        ProjectChange.version > since,
+        ProjectChange.version <= current_version
+    ).order_by(ProjectChange.version, ProjectChange.id).limit(limit).all()
+    
+    has_more = len(rows) == limit
+    version = current_version
+    if has_more:
+        # 补齐最后一个版本号的全部变化
+        version = rows[-1].version
+        rows = [row for row in rows if row.version != version] + db.query(*columns).filter(
+            ProjectChange.project_id == project_id,
+            ProjectChange.version == version
+        ).order_by(ProjectChange.id).all()
+    
+    # 按类型批量读取未删除实体的当前状态
+    live_ids: Dict[str, Set[int]] = defaultdict(set)
+    for row in rows:
+        if not row.deleted:
+            live_ids[row.entity_type].add(row.entity_id)
+    states: Dict[Tuple[str, int], Dict[str, Any]] = {}
+    for entity_type, ids in live_ids.items():
+        model, columns = _ENTITY_COLUMNS[entity_type]
+        for state in db.query(*columns).filter(model.id.in_(ids)):
+            states[(entity_type, state.id)] = dict(state._mapping)
+
+    changes = []
+    for row in rows:
+        data = states.get((row.entity_type, row.entity_id))
+        changes.append({
+            "entity_type": row.entity_type,
+            "entity_id": row.entity_id,
+            "version": row.version,
+            # 记录为更新但实体已不存在（之后被删除且删除尚未提交）时按删除返回
+            "deleted": row.deleted or data is None,
+            "data": None if row.deleted else data
+        })
+
+    return {"project_id": project_id, "version": version, "changes": changes, "has_more": has_more}
@@ -3,7 +3,11 @@ from app.core.celery_app import celery_app
 from app.core.database import SessionLocal
 from app.core.redis import redis_client
 from app.models.models import ActivityLog
+from app.services.metrics_service import flush_rollups, get_daily_metrics
+from app.services.counter_service import check_counters
 from datetime import datetime, timedelta
+from typing import Dict, Any
+import json
 import logging
 
 logger = logging.getLogger(__name__)
@@ -145,31 +149,77 @@ def cleanup_inactive_users() -> Dict[str, Any]:
 
 
 @celery_app.task
+def flush_metric_rollups() -> Dict[str, Any]:
+    """将实时统计计数写入汇总表"""
+    try:
+        db = SessionLocal()
+        
+        flushed = flush_rollups(db)
+        
+        return {
+            "status": "success",
+            "message": f"写入了 {flushed} 个时间段的统计汇总",
+            "flushed_buckets": flushed
+        }
+    
+    except Exception as e:
+        logger.error(f"写入统计汇总失败: {str(e)}")
+        return {
+            "status": "error",
+            "message": f"写入统计汇总失败: {str(e)}"
+        }
+    finally:
+        db.close()
+
+
+@celery_app.task
+def check_counter_consistency(repair: bool = True) -> Dict[str, Any]:
+    """检查并修复卡片计数器偏差"""
+    try:
+        db = SessionLocal()
+        
+        drift = check_counters(db, repair=repair)
+        
+        if any(drift.values()):
+            logger.warning(f"卡片计数器存在偏差: {drift}")
+        
+        return {
+            "status": "success",
+            "message": "计数器检查完成",
+            "drift": drift,
+            "repaired": repair
+        }
+    
+    except Exception as e:
+        logger.error(f"检查计数器失败: {str(e)}")
+        return {
+            "status": "error",
+            "message": f"检查计数器失败: {str(e)}"
+        }
+    finally:
+        db.close()
+
+
+@celery_app.task(ignore_result=False)
 def generate_daily_report() -> Dict[str, Any]:
     """生成每日报告（可选任务）"""
     try:
         db = SessionLocal()
         
-        from app.models.models import User, Board, Card, ActivityLog
-        
         today = datetime.now().date()
-        today_start = datetime.combine(today, datetime.min.time())
-        today_end = datetime.combine(today, datetime.max.time())
+        
+        # 先写入最新的实时计数，再读取汇总表中当天的几行数据
+        flush_rollups(db)
+        metrics = get_daily_metrics(db, today)
         
         # 统计数据
         stats = {
             "date": today.isoformat(),
-            "new_users": db.query(User).filter(User.created_at >= today_start).count(),
-            "new_boards": db.query(Board).filter(Board.created_at >= today_start).count(),
-            "new_cards": db.query(Card).filter(Card.created_at >= today_start).count(),
-            "active_users": db.query(ActivityLog).filter(
-                ActivityLog.created_at >= today_start,
-                ActivityLog.created_at <= today_end
-            ).distinct(ActivityLog.user_id).count(),
-            "total_activities": db.query(ActivityLog).filter(
-                ActivityLog.created_at >= today_start,
-                ActivityLog.created_at <= today_end
-            ).count()
+            "new_users": metrics["new_users"],
+            "new_boards": metrics["new_projects"],
+            "new_cards": metrics["new_cards"],
+            "active_users": metrics["active_users"],
+            "total_activities": metrics["total_activities"]
         }
         
         # 将报告存储到Redis
@@ -1,113 +1,62 @@
 import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
+from string import Template
 from celery import current_task
 from app.core.celery_app import celery_app
 from app.core.config import settings
-from typing import Dict, Any
+from app.core.redis import redis_client
+from app.core.smtp import get_smtp_pool
+from typing import Dict, Any, List, Tuple
+import json
 import logging
 
 logger = logging.getLogger(__name__)
 
+# 待发送邮件队列（Redis列表），由 flush_email_outbox 批量取出发送
+EMAIL_OUTBOX_KEY = "email:outbox"
+# 正在发送的邮件：用 LMOVE 从待发送队列移入，发送完成（或放回待发送队列）后删除；
+# worker 在发送过程中崩溃时邮件留在这里，下一次 flush 会先把它们放回待发送队列
+EMAIL_PROCESSING_KEY = "email:outbox:processing"
+# 防止重复调度批量发送任务的标记
+EMAIL_FLUSH_SCHEDULED_KEY = "email:outbox:scheduled"
+# 同一时间只有一个 flush 在处理队列（持有期间每批续期）
+EMAIL_FLUSH_LOCK_KEY = "email:outbox:lock"
+EMAIL_FLUSH_LOCK_TTL = 300
+EMAIL_MAX_ATTEMPTS = 3
 
-@celery_app.task(bind=True, max_retries=3, default_retry_delay=60)
-def send_email(
-    self,
-    to_email: str,
-    subject: str,
-    body: str,
-    html_body: str = None,
-    from_email: str = None
-) -> Dict[str, Any]:
-    """发送邮件任务"""
-    try:
-        # 邮件服务器配置
-        smtp_server = "smtp.gmail.com"
-        smtp_port = 587
-        smtp_username = "your-email@gmail.com"  # 在实际项目中应该从配置中获取
-        smtp_password = "your-app-password"    # 在实际项目中应该从配置中获取
-        
-        if from_email is None:
-            from_email = smtp_username
-        
-        # 创建邮件消息
-        message = MIMEMultipart("alternative")
-        message["Subject"] = subject
-        message["From"] = from_email
-        message["To"] = to_email
-        
-        # 添加文本内容
-        text_part = MIMEText(body, "plain", "utf-8")
-        message.attach(text_part)
-        
-        # 添加HTML内容（如果有）
-        if html_body:
-            html_part = MIMEText(html_body, "html", "utf-8")
-            message.attach(html_part)
-        
-        # 发送邮件
-        with smtplib.SMTP(smtp_server, smtp_port) as server:
-            server.starttls()
-            server.login(smtp_username, smtp_password)
-            server.send_message(message)
-        
-        logger.info(f"邮件发送成功: {to_email} - {subject}")
-        
-        return {
-            "status": "success",
-            "message": "邮件发送成功",
-            "to_email": to_email,
-            "subject": subject
-        }
-    
-    except Exception as e:
-        logger.error(f"邮件发送失败: {str(e)}")
-        
-        # 重试逻辑
-        if self.request.retries < self.max_retries:
-            logger.info(f"邮件发送失败，正在重试 (尝试 {self.request.retries + 1}/{self.max_retries})")
-            raise self.retry(exc=e, countdown=60 * (self.request.retries + 1))
-        
-        return {
-            "status": "failed",
-            "message": f"邮件发送失败: {str(e)}",
-            "to_email": to_email,
-            "subject": subject
-        }
 
+# 邮件模板，使用 $name 占位符
+EMAIL_TEMPLATES: Dict[str, Dict[str, str]] = {
+    "welcome": {
+        "subject": "欢迎使用 Taskly!",
+        "body": """
+    亲爱的 $user_name，
 
-@celery_app.task
-def send_welcome_email(user_email: str, user_name: str) -> Dict[str, Any]:
-    """发送欢迎邮件"""
-    subject = "欢迎使用 Taskly!"
-    body = f"""
-    亲爱的 {user_name}，
-    
     欢迎加入 Taskly！我们很高兴您能成为我们的一员。
-    
+
     Taskly 是一个强大的任务管理和协作平台，帮助您和您的团队更高效地工作。
-    
+
     主要功能：
     • 看板式任务管理
     • 实时协作
     • 团队沟通
     • 数据分析
-    
+
     如果您有任何问题或需要帮助，请随时联系我们的支持团队。
-    
+
     祝您使用愉快！
-    
+
     Taskly 团队
-    """
-    
-    html_body = f"""
+    """,
+        "html_body": """
     <html>
     <body>
-        <h2>亲爱的 {user_name}，</h2>
+        <h2>亲爱的 $user_name，</h2>
         <p>欢迎加入 <strong>Taskly</strong>！我们很高兴您能成为我们的一员。</p>
-        
+
         <p>Taskly 是一个强大的任务管理和协作平台，帮助您和您的团队更高效地工作。</p>
-        
+
         <h3>主要功能：</h3>
         <ul>
             <li>看板式任务管理</li>
@@ -115,99 +64,354 @@ def send_welcome_email(user_email: str, user_name: str) -> Dict[str, Any]:
             <li>团队沟通</li>
             <li>数据分析</li>
         </ul>
-        
+
         <p>如果您有任何问题或需要帮助，请随时联系我们的支持团队。</p>
-        
+
         <p>祝您使用愉快！</p>
-        
+
         <p><strong>Taskly 团队</strong></p>
     </body>
     </html>
-    """
-    
-    return send_email.delay(user_email, subject, body, html_body)
+    """,
+    },
+    "password_reset": {
+        "subject": "Taskly 密码重置",
+        "body": """
+    亲爱的 $user_name，
 
-
-@celery_app.task
-def send_password_reset_email(user_email: str, user_name: str, reset_token: str) -> Dict[str, Any]:
-    """发送密码重置邮件"""
-    subject = "Taskly 密码重置"
-    reset_link = f"http://localhost:3000/reset-password?token={reset_token}"
-    
-    body = f"""
-    亲爱的 {user_name}，
-    
     我们收到了您重置密码的请求。
-    
+
     请点击以下链接重置您的密码：
-    {reset_link}
-    
+    $reset_link
+
     如果您没有请求重置密码，请忽略此邮件。
-    
+
     此链接将在 24 小时后失效。
-    
+
     Taskly 团队
-    """
-    
-    html_body = f"""
+    """,
+        "html_body": """
     <html>
     <body>
-        <h2>亲爱的 {user_name}，</h2>
+        <h2>亲爱的 $user_name，</h2>
         <p>我们收到了您重置密码的请求。</p>
-        
+
         <p>请点击以下链接重置您的密码：</p>
-        <p><a href="{reset_link}" style="background-color: #007bff; color: white; padding: 10px 20px; text-decoration: none; border-radius: 4px;">重置密码</a></p>
-        
+        <p><a href="$reset_link" style="background-color: #007bff; color: white; padding: 10px 20px; text-decoration: none; border-radius: 4px;">重置密码</a></p>
+
         <p>如果您没有请求重置密码，请忽略此邮件。</p>
-        
+
         <p><strong>此链接将在 24 小时后失效。</strong></p>
-        
+
         <p>Taskly 团队</p>
     </body>
     </html>
-    """
-    
-    return send_email.delay(user_email, subject, body, html_body)
+    """,
+    },
+    "board_invitation": {
+        "subject": "$inviter_name 邀请您加入看板: $board_name",
+        "body": """
+    亲爱的 $user_name，
 
+    $inviter_name 邀请您加入看板 "$board_name"。
 
-@celery_app.task
-def send_board_invitation_email(
-    user_email: str, 
-    user_name: str, 
-    inviter_name: str, 
-    board_name: str,
-    board_link: str
-) -> Dict[str, Any]:
-    """发送看板邀请邮件"""
-    subject = f"{inviter_name} 邀请您加入看板: {board_name}"
-    
-    body = f"""
-    亲爱的 {user_name}，
-    
-    {inviter_name} 邀请您加入看板 "{board_name}"。
-    
     请点击以下链接查看看板：
-    {board_link}
-    
+    $board_link
+
     如果您不想加入此看板，请忽略此邮件。
-    
+
     Taskly 团队
-    """
-    
-    html_body = f"""
+    """,
+        "html_body": """
     <html>
     <body>
-        <h2>亲爱的 {user_name}，</h2>
-        <p><strong>{inviter_name}</strong> 邀请您加入看板 "<strong>{board_name}</strong>"。</p>
-        
+        <h2>亲爱的 $user_name，</h2>
+        <p><strong>$inviter_name</strong> 邀请您加入看板 "<strong>$board_name</strong>"。</p>
+
         <p>请点击以下链接查看看板：</p>
-        <p><a href="{board_link}" style="background-color: #28a745; color: white; padding: 10px 20px; text-decoration: none; border-radius: 4px;">查看看板</a></p>
-        
+        <p><a href="$board_link" style="background-color: #28a745; color: white; padding: 10px 20px; text-decoration: none; border-radius: 4px;">查看看板</a></p>
+
         <p>如果您不想加入此看板，请忽略此邮件。</p>
-        
+
         <p>Taskly 团队</p>
     </body>
     </html>
+    """,
+    },
+}
+
+
+def build_message(
+    to_email: str,
+    subject: str,
+    body: str,
+    html_body: str = None,
+    from_email: str = None
+) -> MIMEMultipart:
+    """构建邮件消息"""
+    message = MIMEMultipart("alternative")
+    message["Subject"] = subject
+    message["From"] = from_email or settings.email_from
+    message["To"] = to_email
+
+    # 添加文本内容
+    message.attach(MIMEText(body, "plain", "utf-8"))
+
+    # 添加HTML内容（如果有）
+    if html_body:
+        message.attach(MIMEText(html_body, "html", "utf-8"))
+
+    return message
+
+
+def is_transient_error(error: Exception) -> bool:
+    """SMTP错误是否值得重试：4xx 为临时错误，5xx（如收件人不存在）重试也不会成功"""
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return all(400 <= code < 500 for code, _ in error.recipients.values())
+    if isinstance(error, smtplib.SMTPResponseException):
+        return 400 <= error.smtp_code < 500
+    # 连接断开、超时等
+    return True
+
+
+def compile_templates(names) -> Dict[str, Dict[str, Template]]:
+    """编译一批邮件用到的模板（每批只编译一次）"""
+    compiled = {}
+    for name in names:
+        template = EMAIL_TEMPLATES[name]
+        compiled[name] = {part: Template(text) for part, text in template.items()}
+    return compiled
+
+
+def enqueue_email(item: Dict[str, Any]) -> Dict[str, Any]:
+    """将邮件写入待发送队列，并确保有一个批量发送任务被调度"""
+    redis_client.rpush(EMAIL_OUTBOX_KEY, json.dumps(item, ensure_ascii=False))
+
+    # 同一时间只调度一个批量发送任务
+    if redis_client.set(EMAIL_FLUSH_SCHEDULED_KEY, 1, nx=True, ex=60):
+        flush_email_outbox.delay()
+
+    return {
+        "status": "queued",
+        "to_email": item["to_email"],
+        "template": item.get("template")
+    }
+
+
+def enqueue_template_email(template: str, to_email: str, context: Dict[str, Any]) -> Dict[str, Any]:
+    """按模板将邮件写入待发送队列"""
+    if template not in EMAIL_TEMPLATES:
+        raise ValueError(f"Unknown email template: {template}")
+    return enqueue_email({"template": template, "to_email": to_email, "context": context})
+
+
+@celery_app.task(bind=True, max_retries=3, default_retry_delay=60, ignore_result=False)
+def send_email(
+    self,
+    to_email: str,
+    subject: str,
+    body: str,
+    html_body: str = None,
+    from_email: str = None
+) -> Dict[str, Any]:
+    """发送邮件任务"""
+    try:
+        message = build_message(to_email, subject, body, html_body, from_email)
+
+        # 从连接池借用已认证的连接发送
+        with get_smtp_pool().connection() as server:
+            server.send_message(message)
+
+        logger.info(f"邮件发送成功: {to_email} - {subject}")
+
+        return {
+            "status": "success",
+            "message": "邮件发送成功",
+            "to_email": to_email,
+            "subject": subject
+        }
+
+    except Exception as e:
+        logger.error(f"邮件发送失败: {str(e)}")
+
+        # 重试逻辑（只重试临时错误）
+        if is_transient_error(e) and self.request.retries < self.max_retries:
+            logger.info(f"邮件发送失败，正在重试 (尝试 {self.request.retries + 1}/{self.max_retries})")
+            raise self.retry(exc=e, countdown=60 * (self.request.retries + 1))
+
+        return {
+            "status": "failed",
+            "message": f"邮件发送失败: {str(e)}",
+            "to_email": to_email,
+            "subject": subject
+        }
+
+
+def _render(item: Dict[str, Any], templates: Dict[str, Dict[str, Template]]) -> MIMEMultipart:
+    if item.get("template"):
+        parts = templates[item["template"]]
+        context = item.get("context", {})
+        return build_message(
+            item["to_email"],
+            parts["subject"].safe_substitute(context),
+            parts["body"].safe_substitute(context),
+            parts["html_body"].safe_substitute(context) if "html_body" in parts else None,
+            item.get("from_email")
+        )
+    return build_message(
+        item["to_email"],
+        item["subject"],
+        item["body"],
+        item.get("html_body"),
+        item.get("from_email")
+    )
+
+
+def _take_batch(batch_size: int) -> List[str]:
+    """把最多 batch_size 封邮件从待发送队列移到处理中队列（每封邮件的移动是原子的）"""
+    pipe = redis_client.pipeline(transaction=False)
+    for _ in range(batch_size):
+        pipe.lmove(EMAIL_OUTBOX_KEY, EMAIL_PROCESSING_KEY, "LEFT", "RIGHT")
+    return [raw for raw in pipe.execute() if raw is not None]
+
+
+def _requeue_processing() -> int:
+    """把上一次 flush 崩溃时留下的邮件放回待发送队列的头部"""
+    count = 0
+    while redis_client.lmove(EMAIL_PROCESSING_KEY, EMAIL_OUTBOX_KEY, "RIGHT", "LEFT") is not None:
+        count += 1
+    return count
+
+
+@celery_app.task
+def flush_email_outbox(batch_size: int = None) -> Dict[str, Any]:
+    """
+    批量发送待发送队列中的邮件
+
+    邮件在发送前移入处理中队列，worker 崩溃不会丢失邮件（崩溃前已发出的邮件可能再发送一次）。
+    临时错误（4xx、连接异常）的邮件放回待发送队列，最多尝试 EMAIL_MAX_ATTEMPTS 次；永久错误（5xx）不重试。
     """
-    
-    return send_email.delay(user_email, subject, body, html_body)
\ No newline at end of file
+    batch_size = batch_size or settings.email_batch_size
+    sent = 0
+    failed = 0
+
+    # 先释放调度标记，处理期间新入队的邮件可以触发下一次调度
+    redis_client.delete(EMAIL_FLUSH_SCHEDULED_KEY)
+
+    if not redis_client.set(EMAIL_FLUSH_LOCK_KEY, 1, nx=True, ex=EMAIL_FLUSH_LOCK_TTL):
+        # 另一个 flush 正在处理，它结束时会检查队列中剩余的邮件
+        return {"status": "skipped", "sent": 0, "failed": 0}
+
+    try:
+        recovered = _requeue_processing()
+        if recovered:
+            logger.warning(f"{recovered} 封邮件在上一次发送中断后重新排队")
+
+        # 需要重试的邮件在本轮结束后统一放回队列，避免在同一轮中被反复取出
+        retry_items: List[Tuple[str, Dict[str, Any]]] = []
+        smtp_unavailable = False
+
+        while not smtp_unavailable:
+            raw_items = _take_batch(batch_size)
+            if not raw_items:
+                break
+            redis_client.expire(EMAIL_FLUSH_LOCK_KEY, EMAIL_FLUSH_LOCK_TTL)
+
+            items = [json.loads(raw) for raw in raw_items]
+            templates = compile_templates({item["template"] for item in items if item.get("template")})
+
+            pool = get_smtp_pool()
+            index = 0
+            while index < len(items):
+                connected = False
+                try:
+                    # 整批复用同一个连接，连接异常时换一个连接继续
+                    with pool.connection() as server:
+                        connected = True
+                        while index < len(items):
+                            item, raw = items[index], raw_items[index]
+                            try:
+                                server.send_message(_render(item, templates))
+                                sent += 1
+                                redis_client.lrem(EMAIL_PROCESSING_KEY, 1, raw)
+                            except (smtplib.SMTPRecipientsRefused, smtplib.SMTPDataError, smtplib.SMTPSenderRefused) as e:
+                                # 单封邮件被拒绝，不影响连接
+                                logger.error(f"邮件发送失败: {item['to_email']} - {str(e)}")
+                                if is_transient_error(e):
+                                    retry_items.append((raw, item))
+                                else:
+                                    failed += 1
+                                    redis_client.lrem(EMAIL_PROCESSING_KEY, 1, raw)
+                            index += 1
+                except Exception as e:
+                    logger.error(f"SMTP连接异常: {str(e)}")
+                    if not connected:
+                        # 无法建立连接：剩余邮件全部稍后重试
+                        retry_items.extend(zip(raw_items[index:], items[index:]))
+                        smtp_unavailable = True
+                        break
+                    # 发送过程中连接断开：当前邮件稍后重试，换连接继续发送剩余邮件
+                    retry_items.append((raw_items[index], items[index]))
+                    index += 1
+
+            if len(raw_items) < batch_size:
+                break
+
+        for raw, item in retry_items:
+            attempts = item.get("attempts", 0) + 1
+            pipe = redis_client.pipeline()
+            if attempts < EMAIL_MAX_ATTEMPTS:
+                item["attempts"] = attempts
+                pipe.rpush(EMAIL_OUTBOX_KEY, json.dumps(item, ensure_ascii=False))
+            else:
+                failed += 1
+            pipe.lrem(EMAIL_PROCESSING_KEY, 1, raw)
+            pipe.execute()
+    finally:
+        redis_client.delete(EMAIL_FLUSH_LOCK_KEY)
+
+    # 还有需要重试的邮件，稍后再调度一次
+    if redis_client.llen(EMAIL_OUTBOX_KEY) and redis_client.set(EMAIL_FLUSH_SCHEDULED_KEY, 1, nx=True, ex=60):
+        flush_email_outbox.apply_async(countdown=60)
+
+    logger.info(f"批量邮件发送完成: 成功 {sent} 封，失败 {failed} 封")
+
+    return {
+        "status": "success",
+        "sent": sent,
+        "failed": failed
+    }
+
+
+@celery_app.task
+def send_welcome_email(user_email: str, user_name: str) -> Dict[str, Any]:
+    """发送欢迎邮件"""
+    return enqueue_template_email("welcome", user_email, {"user_name": user_name})
+
+
+@celery_app.task
+def send_password_reset_email(user_email: str, user_name: str, reset_token: str) -> Dict[str, Any]:
+    """发送密码重置邮件"""
+    reset_link = f"http://localhost:3000/reset-password?token={reset_token}"
+    return enqueue_template_email("password_reset", user_email, {
+        "user_name": user_name,
+        "reset_link": reset_link
+    })
+
+
+@celery_app.task
+def send_board_invitation_email(
+    user_email: str,
+    user_name: str,
+    inviter_name: str,
+    board_name: str,
+    board_link: str
+) -> Dict[str, Any]:
+    """发送看板邀请邮件"""
+    return enqueue_template_email("board_invitation", user_email, {
+        "user_name": user_name,
+        "inviter_name": inviter_name,
+        "board_name": board_name,
+        "board_link": board_link
+    })
+
@@ -1,6 +1,7 @@
 from celery import current_task
 from app.core.celery_app import celery_app
 from app.core.redis import redis_client
+from app.services.notification_service import notification_store
 from app.core.database import SessionLocal
 from app.models.models import ActivityLog, User
 from app.services.activity_service import get_board_activities
@@ -23,27 +24,14 @@ def send_notification(
 ) -> Dict[str, Any]:
     """发送通知任务"""
     try:
-        # 创建通知数据
-        notification = {
-            "id": f"notification_{user_id}_{datetime.now().timestamp()}",
-            "user_id": user_id,
-            "type": notification_type,
-            "title": title,
-            "message": message,
-            "data": data or {},
-            "created_at": datetime.now().isoformat(),
-            "read": False
-        }
-        
-        # 将通知存储到Redis
-        redis_key = f"notifications:{user_id}"
-        redis_client.lpush(redis_key, json.dumps(notification, ensure_ascii=False))
-        
-        # 限制通知数量（保留最近100条）
-        redis_client.ltrim(redis_key, 0, 99)
-        
-        # 设置过期时间（30天）
-        redis_client.expire(redis_key, 30 * 24 * 60 * 60)
+        # 写入通知收件箱（有序集合 + 未读集合）
+        notification = notification_store.add(
+            user_id=user_id,
+            notification_type=notification_type,
+            title=title,
+            message=message,
+            data=data
+        )
         
         logger.info(f"通知发送成功: 用户 {user_id} - {title}")
         
@@ -132,6 +120,30 @@ def send_assignment_notification(
     )
 
 
+# 截止日期提醒：在到期前N天发送提醒（0表示当天到期）
+DUE_DATE_REMINDER_DAYS = (3, 1, 0)
+DUE_DATE_SWEEP_BATCH_SIZE = 500
+# 已发送提醒的去重集合，按扫描日期分键
+DUE_DATE_SENT_KEY = "reminders:due_date:{date}"
+
+
+def build_due_date_message(card_title: str, days_left: int) -> tuple:
+    """生成截止日期提醒的标题和内容"""
+    if days_left < 0:
+        title = "任务已过期"
+        message = f"任务 '{card_title}' 已过期，请尽快处理"
+    elif days_left == 0:
+        title = "任务今天到期"
+        message = f"任务 '{card_title}' 将在今天到期"
+    elif days_left == 1:
+        title = "任务即将到期"
+        message = f"任务 '{card_title}' 将在明天到期"
+    else:
+        title = "任务截止日期提醒"
+        message = f"任务 '{card_title}' 将在 {days_left} 天后到期"
+    return title, message
+
+
 @celery_app.task
 def send_due_date_notification(
     user_id: int,
@@ -142,15 +154,7 @@ def send_due_date_notification(
     days_left: int
 ) -> Dict[str, Any]:
     """发送截止日期提醒通知"""
-    if days_left <= 0:
-        title = "任务已过期"
-        message = f"任务 '{card_title}' 已过期，请尽快处理"
-    elif days_left == 1:
-        title = "任务即将到期"
-        message = f"任务 '{card_title}' 将在明天到期"
-    else:
-        title = "任务截止日期提醒"
-        message = f"任务 '{card_title}' 将在 {days_left} 天后到期"
+    title, message = build_due_date_message(card_title, days_left)
     
     return send_notification.delay(
         user_id=user_id,
@@ -167,6 +171,125 @@ def send_due_date_notification(
     )
 
 
+@celery_app.task
+def send_due_date_notifications_batch(reminders: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """批量写入截止日期提醒通知"""
+    sent = 0
+    for reminder in reminders:
+        title, message = build_due_date_message(reminder["card_title"], reminder["days_left"])
+        try:
+            notification_store.add(
+                user_id=reminder["user_id"],
+                notification_type="due_date",
+                title=title,
+                message=message,
+                data={
+                    "card_id": reminder["card_id"],
+                    "card_title": reminder["card_title"],
+                    "board_id": reminder["board_id"],
+                    "due_date": reminder["due_date"],
+                    "days_left": reminder["days_left"]
+                }
+            )
+            sent += 1
+        except Exception as e:
+            logger.error(f"截止日期提醒发送失败: 用户 {reminder['user_id']} 卡片 {reminder['card_id']} - {str(e)}")
+    
+    return {"status": "success", "sent": sent, "total": len(reminders)}
+
+
+@celery_app.task
+def schedule_due_date_reminders(batch_size: int = DUE_DATE_SWEEP_BATCH_SIZE) -> Dict[str, Any]:
+    """扫描即将到期的卡片并批量调度提醒
+
+    按 (due_date, id) 索引逐个日期窗口做键集分页，每页批量查询分配用户，
+    跳过Redis集合中今天已经提醒过的用户后批量投递通知任务，投递成功后再写入集合。
+    """
+    from app.models.models import Card, CardAssignment, List as BoardList
+    
+    db = SessionLocal()
+    today = datetime.now().date()
+    sent_key = DUE_DATE_SENT_KEY.format(date=today.isoformat())
+    scanned = 0
+    enqueued = 0
+    
+    try:
+        for days_left in DUE_DATE_REMINDER_DAYS:
+            due_date = today + timedelta(days=days_left)
+            last_id = 0
+            
+            while True:
+                # 等值 due_date + id 游标，完全走 (due_date, id) 索引
+                rows = db.query(
+                    Card.id, Card.title, BoardList.project_id
+                ).join(
+                    BoardList, BoardList.id == Card.list_id
+                ).filter(
+                    Card.due_date == due_date,
+                    Card.id > last_id
+                ).order_by(Card.id).limit(batch_size).all()
+                
+                if not rows:
+                    break
+                
+                scanned += len(rows)
+                last_id = rows[-1].id
+                cards = {row.id: row for row in rows}
+                
+                # 批量获取分配用户
+                assignments = db.query(
+                    CardAssignment.card_id, CardAssignment.user_id
+                ).filter(
+                    CardAssignment.card_id.in_(list(cards.keys()))
+                ).all()
+                
+                if assignments:
+                    # 跳过今天已经提醒过的 卡片:用户
+                    members = [f"{assignment.card_id}:{assignment.user_id}" for assignment in assignments]
+                    already_sent = redis_client.smismember(sent_key, members)
+                    
+                    reminders = []
+                    new_members = []
+                    for assignment, member, sent in zip(assignments, members, already_sent):
+                        if sent:
+                            continue
+                        new_members.append(member)
+                        card = cards[assignment.card_id]
+                        reminders.append({
+                            "user_id": assignment.user_id,
+                            "card_id": card.id,
+                            "card_title": card.title,
+                            "board_id": card.project_id,
+                            "due_date": due_date.isoformat(),
+                            "days_left": days_left
+                        })
+                    
+                    if reminders:
+                        send_due_date_notifications_batch.delay(reminders)
+                        # 投递成功后才记录为已提醒，投递失败时下一次扫描会重新调度
+                        redis_client.sadd(sent_key, *new_members)
+                        enqueued += len(reminders)
+                
+                if len(rows) < batch_size:
+                    break
+        
+        redis_client.expire(sent_key, 2 * 24 * 60 * 60)
+        
+        logger.info(f"截止日期提醒扫描完成: 扫描 {scanned} 张卡片，调度 {enqueued} 条提醒")
+        
+        return {
+            "status": "success",
+            "scanned_cards": scanned,
+            "enqueued": enqueued
+        }
+    
+    except Exception as e:
+        logger.error(f"截止日期提醒扫描失败: {str(e)}")
+        return {"status": "error", "message": str(e)}
+    finally:
+        db.close()
+
+
 @celery_app.task
 def process_activity_log(activity_log_id: int) -> Dict[str, Any]:
     """处理活动日志并发送相关通知"""
@@ -185,9 +308,9 @@ def process_activity_log(activity_log_id: int) -> Dict[str, Any]:
         
         # 根据活动类型处理
         if activity_log.entity_type == "card":
-            await process_card_activity(db, activity_log, user)
+            process_card_activity(db, activity_log, user)
         elif activity_log.entity_type == "board":
-            await process_board_activity(db, activity_log, user)
+            process_board_activity(db, activity_log, user)
         
         return {"status": "success", "message": "Activity log processed successfully"}
     
@@ -198,7 +321,7 @@ def process_activity_log(activity_log_id: int) -> Dict[str, Any]:
         db.close()
 
 
-async def process_card_activity(db, activity_log, user):
+def process_card_activity(db, activity_log, user):
     """处理卡片活动"""
     from app.models.models import Card, List, Board
     
@@ -240,7 +363,7 @@ async def process_card_activity(db, activity_log, user):
         )
 
 
-async def process_board_activity(db, activity_log, user):
+def process_board_activity(db, activity_log, user):
     """处理看板活动"""
     from app.models.models import Board
     
@@ -110,60 +110,28 @@ def serialize_labels(labels: list) -> str:
 
 
 def calculate_board_progress(board_id: int, db) -> dict:
-    """计算看板进度"""
-    from app.models.models import List, Card
+    """计算看板（项目）进度"""
+    from app.services.statistics_service import get_project_statistics
     
-    # 获取看板的所有列表和卡片
-    lists = db.query(List).filter(List.board_id == board_id).all()
-    
-    total_cards = 0
-    completed_cards = 0
-    
-    for lst in lists:
-        cards = db.query(Card).filter(Card.list_id == lst.id).all()
-        total_cards += len(cards)
-        
-        # 假设最后一个列表是"已完成"
-        if lst.name in ["已完成", "Done", "完成"]:
-            completed_cards += len(cards)
-    
-    progress = (completed_cards / total_cards * 100) if total_cards > 0 else 0
+    stats = get_project_statistics(db, board_id)
     
     return {
-        "total_cards": total_cards,
-        "completed_cards": completed_cards,
-        "progress": round(progress, 2)
+        "total_cards": stats["total_cards"],
+        "completed_cards": stats["completed_cards"],
+        "progress": stats["progress"]
     }
 
 
 def get_user_statistics(user_id: int, db) -> dict:
     """获取用户统计信息"""
-    from app.models.models import Board, Card, ActivityLog
-    
-    # 用户拥有的看板数量
-    owned_boards = db.query(Board).filter(Board.owner_id == user_id).count()
-    
-    # 用户参与的看板数量
-    participated_boards = db.query(Board).filter(
-        Board.members.any(id=user_id)
-    ).count()
-    
-    # 用户被分配的卡片数量
-    assigned_cards = db.query(Card).filter(Card.assigned_user_id == user_id).count()
-    
-    # 用户完成的卡片数量
-    completed_cards = db.query(Card).join(List).join(Board).filter(
-        Card.assigned_user_id == user_id,
-        List.name.in_(["已完成", "Done", "完成"])
-    ).count()
+    from app.services.statistics_service import get_user_statistics as get_cached_user_statistics
     
-    # 用户活动数量
-    activities = db.query(ActivityLog).filter(ActivityLog.user_id == user_id).count()
+    stats = get_cached_user_statistics(db, user_id)
     
     return {
-        "owned_boards": owned_boards,
-        "participated_boards": participated_boards,
-        "assigned_cards": assigned_cards,
-        "completed_cards": completed_cards,
-        "total_activities": activities
+        "owned_boards": stats["owned_projects"],
+        "participated_boards": stats["participated_projects"],
+        "assigned_cards": stats["assigned_cards"],
+        "completed_cards": stats["completed_cards"],
+        "total_activities": stats["total_activities"]
     }
\ No newline at end of file
@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""
+统计汇总回填脚本
+
+从历史数据（用户、项目、卡片、活动日志）按天重新计算小时/天汇总，
+用于首次上线汇总表或Redis计数丢失后修复数据。
+
+用法:
+    python backfill_metrics.py --start 2025-01-01 --end 2025-01-31
+    python backfill_metrics.py --days 7
+"""
+
+import argparse
+from datetime import date, datetime, timedelta
+
+from app.core.database import SessionLocal
+from app.services.metrics_service import backfill_rollups
+
+
+def parse_date(value: str) -> date:
+    return datetime.strptime(value, "%Y-%m-%d").date()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="回填统计汇总表")
+    parser.add_argument("--start", type=parse_date, help="开始日期 YYYY-MM-DD")
+    parser.add_argument("--end", type=parse_date, help="结束日期 YYYY-MM-DD（包含），默认今天")
+    parser.add_argument("--days", type=int, default=30, help="未指定开始日期时回填最近的天数")
+    parser.add_argument("--chunk-size", type=int, default=5000, help="每次从数据库读取的行数")
+    args = parser.parse_args()
+
+    end_date = args.end or date.today()
+    start_date = args.start or end_date - timedelta(days=args.days - 1)
+
+    print(f"📊 回填统计汇总: {start_date.isoformat()} ~ {end_date.isoformat()}")
+
+    db = SessionLocal()
+    try:
+        result = backfill_rollups(db, start_date, end_date, chunk_size=args.chunk_size)
+    finally:
+        db.close()
+
+    print(f"✅ 回填完成: {result['days']} 天，写入 {result['rows']} 行")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+基准测试结果统计与基线对比
+
+结果格式（JSON）:
+    {"meta": {...}, "scenarios": {"<场景>": {"requests": ..., "errors": ..., "rps": ...,
+                                            "p50_ms": ..., "p95_ms": ..., "p99_ms": ...,
+                                            "loop_lag_p99_ms": ..., "loop_lag_max_ms": ...}}}
+    loop_lag_* 为测量期间的事件循环延迟（只有 HTTP 场景有），async 接口中的同步调用越多越高。
+"""
+
+import json
+from typing import Dict, List, Optional, Tuple
+
+LATENCY_METRICS = ("p50_ms", "p95_ms", "p99_ms")
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(latencies: List[float], errors: int, elapsed: float) -> Dict[str, float]:
+    """latencies 为秒，返回吞吐量和毫秒分位数"""
+    requests = len(latencies) + errors
+    return {
+        "requests": requests,
+        "errors": errors,
+        "rps": round(requests / elapsed, 1) if elapsed > 0 else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+    }
+
+
+def summarize_loop_lag(samples: List[float]) -> Dict[str, float]:
+    """事件循环延迟采样（秒）的 p99 和最大值（毫秒）"""
+    return {
+        "loop_lag_p99_ms": round(percentile(samples, 99) * 1000, 2),
+        "loop_lag_max_ms": round(max(samples, default=0.0) * 1000, 2),
+    }
+
+
+def load(path: str) -> dict:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save(path: str, results: dict):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(results, f, ensure_ascii=False, indent=2, sort_keys=True)
+
+
+def print_table(scenarios: Dict[str, Dict[str, float]]):
+    print(
+        f"  {'场景':<24}{'请求':>8}{'错误':>6}{'吞吐/s':>10}{'p50ms':>10}{'p95ms':>10}{'p99ms':>10}"
+        f"{'循环延迟p99':>12}{'循环延迟max':>12}"
+    )
+    for name, stats in scenarios.items():
+        lag = (
+            f"{stats['loop_lag_p99_ms']:>16.2f}{stats['loop_lag_max_ms']:>16.2f}"
+            if "loop_lag_p99_ms" in stats else f"{'-':>16}{'-':>16}"
+        )
+        print(
+            f"  {name:<26}{stats['requests']:>8}{stats['errors']:>6}{stats['rps']:>10.1f}"
+            f"{stats['p50_ms']:>10.2f}{stats['p95_ms']:>10.2f}{stats['p99_ms']:>10.2f}{lag}"
+        )
+
+
+def compare(
+    current: Dict[str, Dict[str, float]],
+    baseline: Dict[str, Dict[str, float]],
+    threshold: float = 0.2,
+    min_delta_ms: float = 1.0
+) -> List[Tuple[str, str, float, float]]:
+    """
+    与基线对比，返回回归项 [(场景, 指标, 基线值, 当前值)]
+
+    延迟超过基线 (1 + threshold) 倍且绝对差值超过 min_delta_ms、吞吐量低于基线 (1 - threshold) 倍、
+    或出现基线中没有的错误时视为回归。基线中没有的场景不参与对比。
+    """
+    regressions = []
+    for name, stats in current.items():
+        base: Optional[Dict[str, float]] = baseline.get(name)
+        if base is None:
+            continue
+        for metric in LATENCY_METRICS:
+            if stats[metric] > base[metric] * (1 + threshold) and stats[metric] - base[metric] > min_delta_ms:
+                regressions.append((name, metric, base[metric], stats[metric]))
+        if stats["rps"] < base["rps"] * (1 - threshold):
+            regressions.append((name, "rps", base["rps"], stats["rps"]))
+        if stats["errors"] > base["errors"]:
+            regressions.append((name, "errors", base["errors"], stats["errors"]))
+    return regressions
+
+
+def print_comparison(current: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]]):
+    print(f"  {'场景':<24}{'指标':>8}{'基线':>12}{'当前':>12}{'变化':>10}")
+    for name, stats in current.items():
+        base = baseline.get(name)
+        if base is None:
+            print(f"  {name:<26}（基线中没有）")
+            continue
+        for metric in LATENCY_METRICS + ("rps",):
+            change = (stats[metric] - base[metric]) / base[metric] * 100 if base[metric] else 0.0
+            print(f"  {name:<26}{metric:>8}{base[metric]:>12.2f}{stats[metric]:>12.2f}{change:>+9.1f}%")
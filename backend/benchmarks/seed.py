@@ -0,0 +1,127 @@
+"""
+基准测试数据生成
+
+按配置的规模批量写入用户、项目、成员、列表、卡片、标签、分配和活动记录。
+使用 Core 批量插入（不经过ORM会话事件），写入后统一修复计数器。
+"""
+
+import random
+import uuid
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from typing import Dict, List
+
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session
+
+from app.models.models import (
+    ActivityLog, Card, CardAssignment, CardLabel, List as BoardList, Project, ProjectMember, User
+)
+from app.services.counter_service import check_counters
+
+LABELS = ("bug", "feature", "docs", "urgent", "backend", "frontend")
+LIST_NAMES = ("待办", "进行中", "已完成")
+CHUNK_SIZE = 1000
+
+
+@dataclass
+class SeedConfig:
+    projects: int = 5
+    members: int = 5  # 每个项目的成员数（含所有者）
+    lists: int = 3  # 每个项目的列表数
+    cards: int = 50  # 每个列表的卡片数
+    labels: int = 2  # 每张卡片的标签数
+    assignees: int = 1  # 每张卡片的分配人数
+    activities: int = 0  # 每个项目的活动记录数
+    seed: int = 42
+
+
+@dataclass
+class SeedResult:
+    user_ids: List[int] = field(default_factory=list)
+    project_ids: List[int] = field(default_factory=list)
+    project_members: Dict[int, List[int]] = field(default_factory=dict)
+    list_ids: Dict[int, List[int]] = field(default_factory=dict)  # project_id -> list_ids
+    card_ids: Dict[int, List[int]] = field(default_factory=dict)  # project_id -> card_ids
+
+
+def _insert_chunks(db: Session, model, rows: List[dict]):
+    for start in range(0, len(rows), CHUNK_SIZE):
+        db.execute(insert(model), rows[start:start + CHUNK_SIZE])
+
+
+def seed_database(db: Session, config: SeedConfig) -> SeedResult:
+    """生成测试数据，返回生成的ID"""
+    rng = random.Random(config.seed)
+    now = datetime.now()
+    result = SeedResult()
+
+    # 用户（每个项目一组成员），令牌由调用方直接签发，不需要真实密码；
+    # 用户名带上本次运行的标识，可以重复写入同一个数据库
+    run_id = uuid.uuid4().hex[:8]
+    user_count = config.projects * config.members
+    _insert_chunks(db, User, [{
+        "username": f"bench_{run_id}_{i}",
+        "email": f"bench_{run_id}_{i}@taskly-bench.com",
+        "password_hash": "!",
+        "full_name": f"Bench User {i}",
+        "created_at": now,
+        "updated_at": now
+    } for i in range(user_count)])
+    result.user_ids = list(db.execute(
+        select(User.id).where(User.username.like(f"bench_{run_id}_%")).order_by(User.id)
+    ).scalars())
+
+    for p in range(config.projects):
+        members = result.user_ids[p * config.members:(p + 1) * config.members]
+        project_id = db.execute(insert(Project).values(
+            name=f"Bench project {p}", description="benchmark", owner_id=members[0], created_at=now, updated_at=now
+        )).inserted_primary_key[0]
+        result.project_ids.append(project_id)
+        result.project_members[project_id] = members
+        _insert_chunks(db, ProjectMember, [{
+            "project_id": project_id, "user_id": user_id, "role": "owner" if i == 0 else "member", "joined_at": now
+        } for i, user_id in enumerate(members)])
+
+        list_ids = []
+        for position in range(config.lists):
+            list_ids.append(db.execute(insert(BoardList).values(
+                project_id=project_id, name=LIST_NAMES[position % len(LIST_NAMES)], position=position,
+                created_at=now, updated_at=now
+            )).inserted_primary_key[0])
+        result.list_ids[project_id] = list_ids
+
+        _insert_chunks(db, Card, [{
+            "list_id": list_id,
+            "title": f"Card {p}-{list_id}-{position}",
+            "description": f"Synthetic card {position} for {rng.choice(LABELS)} work",
+            "due_date": date.today() + timedelta(days=rng.randint(-10, 30)) if rng.random() < 0.5 else None,
+            "position": position,
+            "created_at": now - timedelta(minutes=rng.randint(0, 60 * 24 * 30)),
+            "updated_at": now - timedelta(minutes=rng.randint(0, 60 * 24 * 30))
+        } for list_id in list_ids for position in range(config.cards)])
+        card_ids = list(db.execute(
+            select(Card.id).where(Card.list_id.in_(list_ids)).order_by(Card.id)
+        ).scalars())
+        result.card_ids[project_id] = card_ids
+
+        _insert_chunks(db, CardLabel, [{
+            "card_id": card_id, "label": label, "color": "#007bff"
+        } for card_id in card_ids for label in rng.sample(LABELS, min(config.labels, len(LABELS)))])
+        _insert_chunks(db, CardAssignment, [{
+            "card_id": card_id, "user_id": user_id, "assigned_at": now
+        } for card_id in card_ids for user_id in rng.sample(members, min(config.assignees, len(members)))])
+        _insert_chunks(db, ActivityLog, [{
+            "project_id": project_id,
+            "user_id": rng.choice(members),
+            "action": "update",
+            "entity_type": "card",
+            "entity_id": rng.choice(card_ids) if card_ids else project_id,
+            "new_values": "{}",
+            "created_at": now - timedelta(minutes=rng.randint(0, 60 * 24 * 30))
+        } for _ in range(config.activities)])
+
+    db.commit()
+    for project_id in result.project_ids:
+        check_counters(db, repair=True, project_id=project_id)
+    return result
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Celery 任务吞吐量基准测试
+
+使用与 app.core.celery_app 相同的队列、路由与结果配置，在进程内启动 worker，
+测量每个队列的发布/消费吞吐量，以及在批量任务积压时实时通知的等待延迟
+（共用一个队列 vs 独立队列）。
+
+用法:
+    python -m benchmarks.task_throughput                       # 内存 broker
+    python -m benchmarks.task_throughput --broker redis://localhost:6379/15
+"""
+
+import argparse
+import statistics
+import threading
+import time
+from contextlib import ExitStack
+from typing import Dict, List
+
+from celery import Celery
+from celery.contrib.testing.worker import start_worker
+
+from app.core.celery_app import celery_app, TASK_QUEUES
+from benchmarks.report import percentile
+
+# 复用正式配置中影响吞吐量的部分
+SHARED_SETTINGS = (
+    "task_serializer",
+    "accept_content",
+    "task_queues",
+    "task_default_queue",
+    "task_default_routing_key",
+    "task_default_priority",
+    "task_queue_max_priority",
+    "task_ignore_result",
+    "task_store_errors_even_if_ignored",
+    "task_track_started",
+    "worker_prefetch_multiplier",
+    "broker_transport_options",
+)
+
+
+class Recorder:
+    """记录任务完成数量与排队延迟"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies: Dict[str, List[float]] = {}
+        self.expected = 0
+        self.finished_at = 0.0
+        self.done = threading.Event()
+
+    def reset(self, expected: int):
+        with self.lock:
+            self.latencies = {}
+            self.expected = expected
+            self.finished_at = 0.0
+            self.done.clear()
+
+    def record(self, kind: str, sent_at: float):
+        with self.lock:
+            self.latencies.setdefault(kind, []).append(time.perf_counter() - sent_at)
+            if sum(len(v) for v in self.latencies.values()) >= self.expected:
+                self.finished_at = time.perf_counter()
+                self.done.set()
+
+
+recorder = Recorder()
+
+
+def create_app(broker: str) -> Celery:
+    """创建基准测试用的 Celery 应用"""
+    app = Celery("taskly_benchmark", broker=broker, backend=None)
+    app.conf.update({name: celery_app.conf[name] for name in SHARED_SETTINGS})
+
+    @app.task(name="benchmark.noop")
+    def noop(kind: str, sent_at: float):
+        recorder.record(kind, sent_at)
+
+    @app.task(name="benchmark.work")
+    def work(kind: str, sent_at: float, duration_ms: float):
+        time.sleep(duration_ms / 1000)
+        recorder.record(kind, sent_at)
+
+    return app
+
+
+def purge(app: Celery):
+    with app.connection_for_write() as conn:
+        for queue in TASK_QUEUES:
+            conn.default_channel.queue_purge(queue)
+
+
+def wait_ready(app: Celery, timeout: float = 30):
+    """等待进程内 worker 响应 ping（worker 启动完成）"""
+    deadline = time.monotonic() + timeout
+    while not app.control.ping(timeout=0.5):
+        if time.monotonic() > deadline:
+            raise RuntimeError("worker 未在规定时间内启动")
+
+
+def bench_queue_throughput(app: Celery, queue: str, messages: int) -> Dict[str, float]:
+    """
+    先启动 worker 并等待就绪，再发布 messages 个空任务
+
+    消费耗时从开始发布到最后一个任务完成，不包含 worker 的启动和关闭。
+    """
+    noop = app.tasks["benchmark.noop"]
+    recorder.reset(messages)
+
+    with start_worker(app, perform_ping_check=False, queues=[queue]):
+        wait_ready(app)
+        start = time.perf_counter()
+        with app.producer_or_acquire() as producer:
+            for _ in range(messages):
+                noop.apply_async(args=(queue, time.perf_counter()), queue=queue, producer=producer)
+        publish_seconds = time.perf_counter() - start
+        if not recorder.done.wait(timeout=300):
+            raise RuntimeError(f"队列 {queue} 的任务未在规定时间内完成")
+    consume_seconds = recorder.finished_at - start
+
+    return {
+        "publish_per_sec": messages / publish_seconds,
+        "consume_per_sec": messages / consume_seconds,
+    }
+
+
+def bench_backlog_latency(app: Celery, separate: bool, bulk: int, interactive: int, bulk_ms: float) -> Dict[str, float]:
+    """在批量任务积压时测量实时通知的排队延迟"""
+    work = app.tasks["benchmark.work"]
+    noop = app.tasks["benchmark.noop"]
+    bulk_queue = "bulk" if separate else "default"
+    interactive_queue = "notifications" if separate else "default"
+    recorder.reset(bulk + interactive)
+
+    # 先积压批量任务，再发布实时通知
+    for _ in range(bulk):
+        work.apply_async(args=("bulk", time.perf_counter(), bulk_ms), queue=bulk_queue)
+    for _ in range(interactive):
+        noop.apply_async(args=("interactive", time.perf_counter()), queue=interactive_queue)
+
+    start = time.perf_counter()
+    with ExitStack() as stack:
+        if separate:
+            stack.enter_context(start_worker(app, perform_ping_check=False, queues=[bulk_queue]))
+            stack.enter_context(start_worker(app, perform_ping_check=False, queues=[interactive_queue]))
+        else:
+            stack.enter_context(start_worker(app, perform_ping_check=False, queues=[bulk_queue]))
+        recorder.done.wait(timeout=300)
+    # 到最后一个任务完成为止，不包含 worker 的关闭
+    total_seconds = (recorder.finished_at or time.perf_counter()) - start
+
+    latencies = recorder.latencies.get("interactive", [])
+    return {
+        "interactive_p50_ms": percentile(latencies, 50) * 1000,
+        "interactive_p95_ms": percentile(latencies, 95) * 1000,
+        "interactive_max_ms": max(latencies, default=0) * 1000,
+        "total_seconds": total_seconds,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Celery 任务吞吐量基准测试")
+    parser.add_argument("--broker", default="memory://", help="broker地址，默认进程内内存 broker")
+    parser.add_argument("--messages", type=int, default=2000, help="每个队列发布的空任务数量")
+    parser.add_argument("--bulk", type=int, default=200, help="积压的批量任务数量")
+    parser.add_argument("--bulk-ms", type=float, default=5.0, help="每个批量任务的耗时（毫秒）")
+    parser.add_argument("--interactive", type=int, default=50, help="实时通知任务数量")
+    args = parser.parse_args()
+
+    app = create_app(args.broker)
+    purge(app)
+
+    print(f"📊 队列吞吐量（{args.messages} 个空任务，broker={args.broker}）")
+    for queue in TASK_QUEUES:
+        result = bench_queue_throughput(app, queue, args.messages)
+        print(f"  {queue:<14} 发布 {result['publish_per_sec']:>9.0f}/s   消费 {result['consume_per_sec']:>9.0f}/s")
+
+    print(f"\n📊 批量任务积压时的实时通知延迟（{args.bulk} 个 {args.bulk_ms}ms 批量任务 + {args.interactive} 个通知）")
+    for separate in (False, True):
+        result = bench_backlog_latency(app, separate, args.bulk, args.interactive, args.bulk_ms)
+        label = "独立队列" if separate else "共用队列"
+        print(
+            f"  {label}  p50 {result['interactive_p50_ms']:8.1f}ms  "
+            f"p95 {result['interactive_p95_ms']:8.1f}ms  "
+            f"max {result['interactive_max_ms']:8.1f}ms  "
+            f"总耗时 {result['total_seconds']:.2f}s"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -13,7 +13,8 @@ CREATE TABLE IF NOT EXISTS users (
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
     INDEX idx_email (email),
-    INDEX idx_username (username)
+    INDEX idx_username (username),
+    INDEX ix_users_created_at_id (created_at, id)
 );
 
 -- 项目表（看板）
@@ -22,10 +23,15 @@ CREATE TABLE IF NOT EXISTS projects (
     name VARCHAR(100) NOT NULL,
     description TEXT,
     owner_id INT NOT NULL,
+    card_count INT NOT NULL DEFAULT 0,
+    done_card_count INT NOT NULL DEFAULT 0,
+    version BIGINT NOT NULL DEFAULT 0,
+    version_id INT NOT NULL DEFAULT 1,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
     FOREIGN KEY (owner_id) REFERENCES users(id) ON DELETE CASCADE,
-    INDEX idx_owner (owner_id)
+    INDEX idx_owner (owner_id),
+    INDEX ix_projects_created_at_id (created_at, id)
 );
 
 -- 项目成员表
@@ -38,8 +44,7 @@ CREATE TABLE IF NOT EXISTS project_members (
     FOREIGN KEY (project_id) REFERENCES projects(id) ON DELETE CASCADE,
     FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
     UNIQUE KEY unique_project_member (project_id, user_id),
-    INDEX idx_project (project_id),
-    INDEX idx_user (user_id)
+    INDEX ix_project_members_user_project (user_id, project_id)
 );
 
 -- 列表表
@@ -48,11 +53,12 @@ CREATE TABLE IF NOT EXISTS lists (
     project_id INT NOT NULL,
     name VARCHAR(100) NOT NULL,
     position INT DEFAULT 0,
+    card_count INT NOT NULL DEFAULT 0,
+    version_id INT NOT NULL DEFAULT 1,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
     FOREIGN KEY (project_id) REFERENCES projects(id) ON DELETE CASCADE,
-    INDEX idx_project (project_id),
-    INDEX idx_position (position)
+    INDEX ix_lists_project_position (project_id, position)
 );
 
 -- 卡片表
@@ -63,12 +69,14 @@ CREATE TABLE IF NOT EXISTS cards (
     description TEXT,
     due_date DATE,
     position INT DEFAULT 0,
+    version_id INT NOT NULL DEFAULT 1,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
     FOREIGN KEY (list_id) REFERENCES lists(id) ON DELETE CASCADE,
-    INDEX idx_list (list_id),
-    INDEX idx_position (position),
-    INDEX idx_due_date (due_date)
+    INDEX ix_cards_list_position (list_id, position),
+    INDEX ix_cards_due_date_id (due_date, id),
+    INDEX ix_cards_list_updated (list_id, updated_at, id),
+    INDEX ix_cards_updated_at_id (updated_at, id)
 );
 
 -- 卡片标签表
@@ -78,7 +86,8 @@ CREATE TABLE IF NOT EXISTS card_labels (
     label VARCHAR(50) NOT NULL,
     color VARCHAR(7) DEFAULT '#007bff',
     FOREIGN KEY (card_id) REFERENCES cards(id) ON DELETE CASCADE,
-    INDEX idx_card (card_id)
+    INDEX ix_card_labels_card_id (card_id),
+    INDEX ix_card_labels_label_card (label, card_id)
 );
 
 -- 卡片分配表
@@ -91,6 +100,19 @@ CREATE TABLE IF NOT EXISTS card_assignments (
     FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
     UNIQUE KEY unique_card_assignment (card_id, user_id),
     INDEX idx_card (card_id),
+    INDEX ix_card_assignments_user_card (user_id, card_id)
+);
+
+-- 项目成员工作量计数表（每个用户在项目中被分配/已完成的卡片数）
+CREATE TABLE IF NOT EXISTS project_workloads (
+    id INT PRIMARY KEY AUTO_INCREMENT,
+    project_id INT NOT NULL,
+    user_id INT NOT NULL,
+    assigned_cards INT NOT NULL DEFAULT 0,
+    done_cards INT NOT NULL DEFAULT 0,
+    FOREIGN KEY (project_id) REFERENCES projects(id) ON DELETE CASCADE,
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
+    UNIQUE KEY uq_project_workload (project_id, user_id),
     INDEX idx_user (user_id)
 );
 
@@ -107,9 +129,34 @@ CREATE TABLE IF NOT EXISTS activity_logs (
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     FOREIGN KEY (project_id) REFERENCES projects(id) ON DELETE CASCADE,
     FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
-    INDEX idx_project (project_id),
-    INDEX idx_user (user_id),
-    INDEX idx_created_at (created_at)
+    INDEX idx_created_at (created_at),
+    INDEX ix_activity_logs_project_created (project_id, created_at, id),
+    INDEX ix_activity_logs_user_created (user_id, created_at, id)
+);
+
+-- 项目数据变化表（增量同步，每个实体保留最近一次变化，删除为墓碑）
+CREATE TABLE IF NOT EXISTS project_changes (
+    id INT PRIMARY KEY AUTO_INCREMENT,
+    project_id INT NOT NULL,
+    entity_type ENUM('project', 'member', 'list', 'card', 'label', 'assignment') NOT NULL,
+    entity_id INT NOT NULL,
+    version BIGINT NOT NULL,
+    deleted BOOLEAN NOT NULL DEFAULT FALSE,
+    changed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    FOREIGN KEY (project_id) REFERENCES projects(id) ON DELETE CASCADE,
+    UNIQUE KEY uq_project_change_entity (project_id, entity_type, entity_id),
+    INDEX ix_project_changes_project_version (project_id, version)
+);
+
+-- 统计汇总表（按小时/按天的增量计数）
+CREATE TABLE IF NOT EXISTS metric_rollups (
+    id INT PRIMARY KEY AUTO_INCREMENT,
+    bucket_type ENUM('hour', 'day') NOT NULL,
+    bucket_start DATETIME NOT NULL,
+    metric VARCHAR(50) NOT NULL,
+    value INT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    UNIQUE KEY uq_metric_rollup_bucket (bucket_type, bucket_start, metric)
 );
 
 -- 插入默认数据
@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+"""
+卡片搜索索引重建脚本
+
+按ID分块读取全部卡片并重建Redis中的倒排索引，
+用于首次上线搜索功能、索引格式升级或索引数据丢失后修复。重建后删除旧版本索引的键。
+
+用法:
+    python rebuild_search_index.py [--chunk-size 1000]
+"""
+
+import argparse
+
+from app.core.database import SessionLocal
+from app.services.search_service import card_search_index, rebuild_search_index
+
+
+def main():
+    parser = argparse.ArgumentParser(description="重建卡片搜索索引")
+    parser.add_argument("--chunk-size", type=int, default=1000, help="每批索引的卡片数量")
+    args = parser.parse_args()
+
+    print("🔍 重建卡片搜索索引...")
+
+    db = SessionLocal()
+    try:
+        indexed = rebuild_search_index(db, chunk_size=args.chunk_size)
+    finally:
+        db.close()
+
+    print(f"✅ 重建完成: 索引了 {indexed} 张卡片")
+
+    dropped = card_search_index.drop_legacy_index()
+    if dropped:
+        print(f"🧹 删除了 {dropped} 个旧版本索引键")
+
+
+if __name__ == "__main__":
+    main()
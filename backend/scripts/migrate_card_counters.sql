@@ -0,0 +1,57 @@
+-- 已有数据库升级：卡片计数器和成员工作量计数（MySQL）
+-- 新建的数据库直接使用 database_schema.sql，不需要执行本脚本。
+-- 计数器由应用在写入卡片和分配时维护；本脚本按现有数据回填一次。
+-- 回填后也可以随时用 check_counters(db, repair=True) 重新检查和修复（定时任务 check_counter_consistency）。
+
+ALTER TABLE projects
+    ADD COLUMN card_count INT NOT NULL DEFAULT 0 AFTER owner_id,
+    ADD COLUMN done_card_count INT NOT NULL DEFAULT 0 AFTER card_count;
+ALTER TABLE lists
+    ADD COLUMN card_count INT NOT NULL DEFAULT 0 AFTER position;
+
+-- 项目成员工作量计数表（每个用户在项目中被分配/已完成的卡片数）
+CREATE TABLE IF NOT EXISTS project_workloads (
+    id INT PRIMARY KEY AUTO_INCREMENT,
+    project_id INT NOT NULL,
+    user_id INT NOT NULL,
+    assigned_cards INT NOT NULL DEFAULT 0,
+    done_cards INT NOT NULL DEFAULT 0,
+    FOREIGN KEY (project_id) REFERENCES projects(id) ON DELETE CASCADE,
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
+    UNIQUE KEY uq_project_workload (project_id, user_id),
+    INDEX idx_user (user_id)
+);
+
+-- 回填（"已完成"列表的名称与 app/services/counter_service.py 中的 DONE_LIST_NAMES 一致）
+UPDATE lists l
+JOIN (
+    SELECT list_id, COUNT(*) AS total
+    FROM cards
+    GROUP BY list_id
+) c ON c.list_id = l.id
+SET l.card_count = c.total;
+
+UPDATE projects p
+JOIN (
+    SELECT l.project_id,
+           COUNT(*) AS total,
+           SUM(l.name IN ('已完成', 'Done', '完成')) AS done
+    FROM cards c
+    JOIN lists l ON l.id = c.list_id
+    GROUP BY l.project_id
+) c ON c.project_id = p.id
+SET p.card_count = c.total,
+    p.done_card_count = c.done;
+
+INSERT INTO project_workloads (project_id, user_id, assigned_cards, done_cards)
+SELECT l.project_id,
+       a.user_id,
+       COUNT(*),
+       SUM(l.name IN ('已完成', 'Done', '完成'))
+FROM card_assignments a
+JOIN cards c ON c.id = a.card_id
+JOIN lists l ON l.id = c.list_id
+GROUP BY l.project_id, a.user_id
+ON DUPLICATE KEY UPDATE
+    assigned_cards = VALUES(assigned_cards),
+    done_cards = VALUES(done_cards);
@@ -0,0 +1,17 @@
+-- 已有数据库升级：卡片列表、标签和分配查询的复合索引（MySQL）
+-- 新建的数据库直接使用 database_schema.sql，不需要执行本脚本。
+
+-- 按列表取卡片并按更新时间排序/翻页；按更新时间做增量查询
+ALTER TABLE cards
+    ADD INDEX ix_cards_list_updated (list_id, updated_at, id),
+    ADD INDEX ix_cards_updated_at_id (updated_at, id);
+
+-- 按标签查找卡片
+ALTER TABLE card_labels
+    ADD INDEX ix_card_labels_label_card (label, card_id);
+
+-- 按用户查找分配的卡片，覆盖原来的 idx_user（先建立新索引，外键始终有可用的索引）
+ALTER TABLE card_assignments
+    ADD INDEX ix_card_assignments_user_card (user_id, card_id);
+ALTER TABLE card_assignments
+    DROP INDEX idx_user;
@@ -0,0 +1,11 @@
+-- 已有数据库升级：按截止日期查询卡片使用 (due_date, id) 复合索引（MySQL）
+-- 新建的数据库直接使用 database_schema.sql，不需要执行本脚本。
+
+-- 按截止日期筛选并按 (due_date, id) 翻页，覆盖原来的单列索引
+ALTER TABLE cards
+    ADD INDEX ix_cards_due_date_id (due_date, id);
+ALTER TABLE cards
+    DROP INDEX idx_due_date;
+
+-- 使用旧版 database_schema.sql 新建、已有 idx_due_date_id 的数据库只需改名：
+-- ALTER TABLE cards RENAME INDEX idx_due_date_id TO ix_cards_due_date_id;
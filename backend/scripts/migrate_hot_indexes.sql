@@ -0,0 +1,30 @@
+-- 已有数据库升级：热点外键查询使用复合索引（MySQL）
+-- 新建的数据库直接使用 database_schema.sql，不需要执行本脚本。
+-- 项目活动流的复合索引 (project_id, created_at, id) 以及删除 activity_logs 的 idx_project、idx_user
+-- 由 migrate_keyset_indexes.sql 完成；scripts/upgrade.sql 按顺序执行全部升级脚本。
+-- 执行前可用 python -m benchmarks.index_plans 对比索引前后的查询计划和耗时。
+
+-- 先建立新索引再删除被覆盖的旧索引（外键始终有可用的索引）
+
+-- 按用户查询参与的项目；按项目查询成员使用唯一约束 unique_project_member (project_id, user_id)
+ALTER TABLE project_members
+    ADD INDEX ix_project_members_user_project (user_id, project_id);
+ALTER TABLE project_members
+    DROP INDEX idx_project,
+    DROP INDEX idx_user;
+
+-- 按列表/项目取数据时同时按 position 排序，不需要额外的排序步骤
+ALTER TABLE lists
+    ADD INDEX ix_lists_project_position (project_id, position);
+ALTER TABLE lists
+    DROP INDEX idx_project,
+    DROP INDEX idx_position;
+
+ALTER TABLE cards
+    ADD INDEX ix_cards_list_position (list_id, position);
+ALTER TABLE cards
+    DROP INDEX idx_list,
+    DROP INDEX idx_position;
+
+ALTER TABLE card_labels
+    RENAME INDEX idx_card TO ix_card_labels_card_id;
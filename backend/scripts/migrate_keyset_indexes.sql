@@ -0,0 +1,17 @@
+-- 已有数据库升级：按 (created_at, id) 游标翻页使用的复合索引（MySQL）
+-- 新建的数据库直接使用 database_schema.sql，不需要执行本脚本。
+
+ALTER TABLE users
+    ADD INDEX ix_users_created_at_id (created_at, id);
+
+ALTER TABLE projects
+    ADD INDEX ix_projects_created_at_id (created_at, id);
+
+-- 按项目/用户查询活动日志并按时间翻页，覆盖原来的 idx_project、idx_user
+-- （先建立新索引再删除旧索引，外键始终有可用的索引）
+ALTER TABLE activity_logs
+    ADD INDEX ix_activity_logs_project_created (project_id, created_at, id),
+    ADD INDEX ix_activity_logs_user_created (user_id, created_at, id);
+ALTER TABLE activity_logs
+    DROP INDEX idx_project,
+    DROP INDEX idx_user;
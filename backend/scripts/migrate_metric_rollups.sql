@@ -0,0 +1,14 @@
+-- 已有数据库升级：统计汇总表（MySQL）
+-- 新建的数据库直接使用 database_schema.sql，不需要执行本脚本。
+-- 建表后用 python backfill_metrics.py --start <最早日期> --end <今天> 从历史数据回填汇总。
+
+-- 统计汇总表（按小时/按天的增量计数）
+CREATE TABLE IF NOT EXISTS metric_rollups (
+    id INT PRIMARY KEY AUTO_INCREMENT,
+    bucket_type ENUM('hour', 'day') NOT NULL,
+    bucket_start DATETIME NOT NULL,
+    metric VARCHAR(50) NOT NULL,
+    value INT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    UNIQUE KEY uq_metric_rollup_bucket (bucket_type, bucket_start, metric)
+);
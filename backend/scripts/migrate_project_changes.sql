@@ -0,0 +1,20 @@
+-- 已有数据库升级：项目版本号和数据变化表（增量同步，MySQL）
+-- 新建的数据库直接使用 database_schema.sql，不需要执行本脚本。
+-- 升级前已有的数据没有变化记录，只有升级后的修改会出现在 /changes 中，客户端第一次同步前先全量加载项目。
+
+ALTER TABLE projects
+    ADD COLUMN version BIGINT NOT NULL DEFAULT 0;
+
+-- 项目数据变化表（增量同步，每个实体保留最近一次变化，删除为墓碑）
+CREATE TABLE IF NOT EXISTS project_changes (
+    id INT PRIMARY KEY AUTO_INCREMENT,
+    project_id INT NOT NULL,
+    entity_type ENUM('project', 'member', 'list', 'card', 'label', 'assignment') NOT NULL,
+    entity_id INT NOT NULL,
+    version BIGINT NOT NULL,
+    deleted BOOLEAN NOT NULL DEFAULT FALSE,
+    changed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    FOREIGN KEY (project_id) REFERENCES projects(id) ON DELETE CASCADE,
+    UNIQUE KEY uq_project_change_entity (project_id, entity_type, entity_id),
+    INDEX ix_project_changes_project_version (project_id, version)
+);
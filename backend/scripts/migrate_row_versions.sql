@@ -0,0 +1,6 @@
+-- 已有数据库升级：项目、列表、卡片的行版本号（乐观并发控制，MySQL）
+-- 新建的数据库直接使用 database_schema.sql，不需要执行本脚本。
+
+ALTER TABLE projects ADD COLUMN version_id INT NOT NULL DEFAULT 1;
+ALTER TABLE lists ADD COLUMN version_id INT NOT NULL DEFAULT 1;
+ALTER TABLE cards ADD COLUMN version_id INT NOT NULL DEFAULT 1;
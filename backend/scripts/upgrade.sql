@@ -0,0 +1,14 @@
+-- 已有数据库升级到 database_schema.sql 的表结构（MySQL）
+-- 新建的数据库直接使用 database_schema.sql，不需要执行本脚本。
+-- 依次执行各升级脚本（按引入的先后顺序），需要在 backend 目录下用 mysql 命令行客户端执行：
+--     mysql -u <用户> -p <数据库> < scripts/upgrade.sql
+-- 已经执行过的脚本需要从下面删除，逐个执行时也按同样的顺序。
+
+SOURCE scripts/migrate_due_date_index.sql;
+SOURCE scripts/migrate_metric_rollups.sql;
+SOURCE scripts/migrate_card_counters.sql;
+SOURCE scripts/migrate_card_query_indexes.sql;
+SOURCE scripts/migrate_keyset_indexes.sql;
+SOURCE scripts/migrate_project_changes.sql;
+SOURCE scripts/migrate_hot_indexes.sql;
+SOURCE scripts/migrate_row_versions.sql;
@@ -0,0 +1,77 @@
+"""
+接口测试的公共夹具
+
+与 benchmarks/api_latency.py 相同：SQLite 临时数据库 + fakeredis（支持 Lua 脚本）+ TestClient，
+不需要 MySQL 和 Redis。环境变量必须在导入 app 之前设置。
+"""
+
+import os
+import tempfile
+
+_db_dir = tempfile.mkdtemp(prefix="taskly-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_db_dir}/test.db"
+# 限流和过载保护默认关闭（由各自的测试单独打开），避免影响其他测试
+os.environ["RATE_LIMIT_ENABLED"] = "false"
+os.environ["LOAD_SHEDDING_ENABLED"] = "false"
+
+import fakeredis
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.database import SessionLocal, engine
+from app.core.rate_limit import rate_limiter
+from app.core.redis import redis_client
+from app.core.security import jwt_manager
+from app.main import app
+from app.models.models import Base, User
+
+
+@pytest.fixture
+def redis():
+    """每个测试使用独立的 fakeredis 服务器"""
+    client = fakeredis.FakeRedis(server=fakeredis.FakeServer(), decode_responses=True)
+    redis_client._client = client
+    rate_limiter._script = None
+    rate_limiter._redis_retry_at = 0.0
+    rate_limiter.local._buckets.clear()
+    yield client
+    redis_client._client = None
+
+
+@pytest.fixture
+def db():
+    Base.metadata.create_all(engine)
+    session = SessionLocal()
+    yield session
+    session.close()
+    Base.metadata.drop_all(engine)
+
+
+@pytest.fixture
+def client(db, redis):
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+@pytest.fixture
+def user(db) -> User:
+    user = User(username="tester", email="tester@example.com", password_hash="!", full_name="Tester")
+    db.add(user)
+    db.commit()
+    return user
+
+
+@pytest.fixture
+def auth_headers(user) -> dict:
+    token = jwt_manager.create_access_token({"sub": str(user.id)})
+    return {"Authorization": f"Bearer {token}"}
+
+
+@pytest.fixture
+def project(client, auth_headers) -> dict:
+    """新建的项目（带默认的 待办/进行中/已完成 三个列表），返回 {"id", "lists"}"""
+    response = client.post("/api/v1/projects/", json={"name": "测试项目"}, headers=auth_headers)
+    assert response.status_code == 200
+    project_id = response.json()["id"]
+    lists = client.get(f"/api/v1/lists/?project_id={project_id}", headers=auth_headers).json()
+    return {"id": project_id, "lists": {item["name"]: item["id"] for item in lists}}
@@ -0,0 +1,156 @@
+"""乐观并发控制：If-Match / version_id 与当前版本不一致时返回409"""
+
+from fastapi import HTTPException
+
+from app.core.concurrency import commit_versioned
+from app.core.database import SessionLocal
+from app.models.models import Card
+
+
+def create_card(client, auth_headers, list_id: int, title: str = "卡片") -> dict:
+    response = client.post(f"/api/v1/cards/?list_id={list_id}", json={"title": title, "list_id": list_id}, headers=auth_headers)
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_card_update_with_current_if_match_bumps_version(client, auth_headers, project):
+    card = create_card(client, auth_headers, project["lists"]["待办"])
+
+    response = client.put(
+        f"/api/v1/cards/{card['id']}",
+        json={"title": "新标题"},
+        headers={**auth_headers, "If-Match": f'"{card["version_id"]}"'}
+    )
+
+    assert response.status_code == 200
+    assert response.json()["version_id"] == card["version_id"] + 1
+
+
+def test_card_update_with_stale_if_match_returns_409_with_current_state(client, auth_headers, project):
+    card = create_card(client, auth_headers, project["lists"]["待办"])
+    stale = f'W/"{card["version_id"]}"'
+    client.put(f"/api/v1/cards/{card['id']}", json={"title": "第一次修改"}, headers={**auth_headers, "If-Match": stale})
+
+    response = client.put(f"/api/v1/cards/{card['id']}", json={"title": "第二次修改"}, headers={**auth_headers, "If-Match": stale})
+
+    assert response.status_code == 409
+    detail = response.json()["detail"]
+    assert detail["version_id"] == card["version_id"] + 1
+    assert detail["current"]["title"] == "第一次修改"
+    assert response.headers["etag"] == f'"{card["version_id"] + 1}"'
+
+
+def test_card_update_with_stale_body_version_returns_409(client, auth_headers, project):
+    card = create_card(client, auth_headers, project["lists"]["待办"])
+    client.put(f"/api/v1/cards/{card['id']}", json={"title": "修改"}, headers=auth_headers)
+
+    response = client.put(
+        f"/api/v1/cards/{card['id']}",
+        json={"title": "旧版本上的修改", "version_id": card["version_id"]},
+        headers=auth_headers
+    )
+
+    assert response.status_code == 409
+
+
+def test_foreign_if_match_returns_412(client, auth_headers, project):
+    card = create_card(client, auth_headers, project["lists"]["待办"])
+    # 卡片列表（集合资源）的ETag是项目版本号，不是这张卡片的ETag
+    list_etag = client.get(f"/api/v1/cards/?list_id={project['lists']['待办']}", headers=auth_headers).headers["ETag"]
+
+    for tag in ("abc", list_etag):
+        response = client.put(f"/api/v1/cards/{card['id']}", json={"title": "x"}, headers={**auth_headers, "If-Match": tag})
+        assert response.status_code == 412
+        assert response.headers["etag"] == f'"{card["version_id"]}"'
+
+
+def test_card_responses_carry_the_etag_used_by_if_match(client, auth_headers, project):
+    card = create_card(client, auth_headers, project["lists"]["待办"])
+    etag = client.get(f"/api/v1/cards/{card['id']}", headers=auth_headers).headers["ETag"]
+    assert etag == f'"{card["version_id"]}"'
+
+    updated = client.put(f"/api/v1/cards/{card['id']}", json={"title": "新标题"}, headers={**auth_headers, "If-Match": etag})
+    assert updated.status_code == 200
+    assert updated.headers["ETag"] == f'"{updated.json()["version_id"]}"'
+
+    moved = client.post("/api/v1/cards/move", json={
+        "card_id": card["id"],
+        "source_list_id": project["lists"]["待办"],
+        "target_list_id": project["lists"]["进行中"],
+        "new_position": 0
+    }, headers={**auth_headers, "If-Match": updated.headers["ETag"]})
+    assert moved.status_code == 200
+    assert moved.headers["ETag"] == f'"{moved.json()["version_id"]}"'
+
+
+def test_project_if_match_uses_the_get_etag(client, auth_headers, project):
+    url = f"/api/v1/projects/{project['id']}"
+    etag = client.get(url, headers=auth_headers).headers["ETag"]
+
+    updated = client.put(url, json={"name": "改名"}, headers={**auth_headers, "If-Match": etag})
+    assert updated.status_code == 200
+    assert updated.headers["ETag"] == client.get(url, headers=auth_headers).headers["ETag"] != etag
+
+    # 读取之后项目有变化：409，附带当前的项目ETag
+    stale = client.put(url, json={"name": "再改名"}, headers={**auth_headers, "If-Match": etag})
+    assert stale.status_code == 409
+    assert stale.headers["ETag"] == updated.headers["ETag"]
+
+    # 其他项目的ETag
+    other = client.post("/api/v1/projects/", json={"name": "另一个项目"}, headers=auth_headers).json()["id"]
+    other_etag = client.get(f"/api/v1/projects/{other}", headers=auth_headers).headers["ETag"]
+    assert client.put(url, json={"name": "x"}, headers={**auth_headers, "If-Match": other_etag}).status_code == 412
+
+
+def test_card_move_with_stale_version_returns_409(client, auth_headers, project):
+    card = create_card(client, auth_headers, project["lists"]["待办"])
+
+    response = client.post(
+        "/api/v1/cards/move",
+        json={
+            "card_id": card["id"],
+            "source_list_id": project["lists"]["待办"],
+            "target_list_id": project["lists"]["进行中"],
+            "new_position": 0,
+            "version_id": card["version_id"] + 5
+        },
+        headers=auth_headers
+    )
+
+    assert response.status_code == 409
+
+
+def test_list_and_project_updates_with_stale_version_return_409(client, auth_headers, project):
+    list_id = project["lists"]["待办"]
+
+    assert client.post(f"/api/v1/lists/{list_id}/move?new_position=2&version_id=99", headers=auth_headers).status_code == 409
+    assert client.put(
+        f"/api/v1/lists/{list_id}", json={"name": "x"}, headers={**auth_headers, "If-Match": '"99"'}
+    ).status_code == 409
+    assert client.put(
+        f"/api/v1/projects/{project['id']}", json={"name": "x"}, headers={**auth_headers, "If-Match": '"99"'}
+    ).status_code == 409
+
+
+def test_concurrent_sessions_conflict_on_commit(client, auth_headers, project):
+    card = create_card(client, auth_headers, project["lists"]["待办"])
+    first, second = SessionLocal(), SessionLocal()
+    try:
+        first_card = first.get(Card, card["id"])
+        second_card = second.get(Card, card["id"])
+        first_card.title = "先提交"
+        first.commit()
+
+        second_card.title = "后提交"
+        try:
+            commit_versioned(second, second_card)
+        except HTTPException as e:
+            conflict = e
+        else:
+            conflict = None
+    finally:
+        first.close()
+        second.close()
+
+    assert conflict is not None and conflict.status_code == 409
+    assert conflict.detail["current"]["title"] == "先提交"
@@ -0,0 +1,105 @@
+"""卡片计数器：创建、移动、删除卡片和分配时列表/项目计数与成员工作量的增量维护"""
+
+from datetime import datetime
+
+from app.models.models import List, Project, ProjectWorkload
+from app.services.counter_service import check_counters
+
+
+def create_card(client, auth_headers, list_id: int) -> dict:
+    response = client.post(f"/api/v1/cards/?list_id={list_id}", json={"title": "卡片", "list_id": list_id}, headers=auth_headers)
+    assert response.status_code == 200
+    return response.json()
+
+
+def move_card(client, auth_headers, card_id: int, source: int, target: int):
+    response = client.post(
+        "/api/v1/cards/move",
+        json={"card_id": card_id, "source_list_id": source, "target_list_id": target, "new_position": 0},
+        headers=auth_headers
+    )
+    assert response.status_code == 200
+
+
+def counters(db, project: dict) -> dict:
+    db.expire_all()
+    stored = db.get(Project, project["id"])
+    return {
+        "project": (stored.card_count, stored.done_card_count),
+        "lists": {name: db.get(List, list_id).card_count for name, list_id in project["lists"].items()},
+    }
+
+
+def workload(db, project: dict, user_id: int):
+    db.expire_all()
+    row = db.query(ProjectWorkload).filter_by(project_id=project["id"], user_id=user_id).first()
+    return (row.assigned_cards, row.done_cards) if row else (0, 0)
+
+
+def test_create_move_and_delete_update_counters(client, auth_headers, project, db):
+    todo, done = project["lists"]["待办"], project["lists"]["已完成"]
+
+    first = create_card(client, auth_headers, todo)
+    create_card(client, auth_headers, todo)
+    assert counters(db, project) == {"project": (2, 0), "lists": {"待办": 2, "进行中": 0, "已完成": 0}}
+
+    move_card(client, auth_headers, first["id"], todo, done)
+    assert counters(db, project) == {"project": (2, 1), "lists": {"待办": 1, "进行中": 0, "已完成": 1}}
+
+    assert client.delete(f"/api/v1/cards/{first['id']}", headers=auth_headers).status_code == 200
+    assert counters(db, project) == {"project": (1, 0), "lists": {"待办": 1, "进行中": 0, "已完成": 0}}
+
+    assert check_counters(db, repair=False) == {"lists": 0, "projects": 0, "workloads": 0}
+
+
+def test_assignment_workload_follows_card_moves(client, auth_headers, project, user, db):
+    todo, done = project["lists"]["待办"], project["lists"]["已完成"]
+    card = create_card(client, auth_headers, todo)
+
+    response = client.post(
+        f"/api/v1/cards/{card['id']}/assignments",
+        json={"card_id": card["id"], "user_id": user.id},
+        headers=auth_headers
+    )
+    assert response.status_code == 200
+    assert workload(db, project, user.id) == (1, 0)
+
+    move_card(client, auth_headers, card["id"], todo, done)
+    assert workload(db, project, user.id) == (1, 1)
+
+    assert client.delete(f"/api/v1/cards/{card['id']}", headers=auth_headers).status_code == 200
+    assert workload(db, project, user.id) == (0, 0)
+
+    assert check_counters(db, repair=False) == {"lists": 0, "projects": 0, "workloads": 0}
+
+
+def test_renaming_list_to_done_moves_cards_into_done_count(client, auth_headers, project, db):
+    doing = project["lists"]["进行中"]
+    create_card(client, auth_headers, doing)
+
+    assert client.put(f"/api/v1/lists/{doing}", json={"name": "Done"}, headers=auth_headers).status_code == 200
+
+    assert counters(db, project)["project"] == (1, 1)
+
+
+def test_check_counters_repairs_drift(client, auth_headers, project, db):
+    create_card(client, auth_headers, project["lists"]["待办"])
+    db.query(Project).filter(Project.id == project["id"]).update({"card_count": 7})
+    db.commit()
+
+    assert check_counters(db, repair=True)["projects"] == 1
+    assert counters(db, project)["project"] == (1, 0)
+
+
+def test_counter_updates_keep_updated_at(client, auth_headers, project, db):
+    todo = project["lists"]["待办"]
+    stamp = datetime(2020, 1, 1)
+    db.get(Project, project["id"]).updated_at = stamp
+    db.get(List, todo).updated_at = stamp
+    db.commit()
+
+    create_card(client, auth_headers, todo)
+
+    assert counters(db, project)["project"] == (1, 0)
+    assert db.get(Project, project["id"]).updated_at == stamp
+    assert db.get(List, todo).updated_at == stamp
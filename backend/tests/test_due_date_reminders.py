@@ -0,0 +1,56 @@
+"""截止日期提醒：提醒文案和去重记录"""
+
+from datetime import date
+
+import pytest
+
+from app.tasks import notifications
+from app.tasks.notifications import DUE_DATE_SENT_KEY, build_due_date_message, schedule_due_date_reminders
+
+
+@pytest.mark.parametrize("days_left, title", [
+    (-1, "任务已过期"),
+    (0, "任务今天到期"),
+    (1, "任务即将到期"),
+    (3, "任务截止日期提醒"),
+])
+def test_due_date_message(days_left, title):
+    assert build_due_date_message("卡片", days_left)[0] == title
+
+
+@pytest.fixture
+def due_today_card(client, auth_headers, project, user):
+    list_id = project["lists"]["待办"]
+    card = client.post(
+        f"/api/v1/cards/?list_id={list_id}",
+        json={"title": "今天到期", "list_id": list_id, "due_date": f"{date.today().isoformat()}T00:00:00"},
+        headers=auth_headers
+    ).json()
+    response = client.post(
+        f"/api/v1/cards/{card['id']}/assignments",
+        json={"card_id": card["id"], "user_id": user.id},
+        headers=auth_headers
+    )
+    assert response.status_code == 200
+    return card
+
+
+def test_reminders_are_recorded_only_after_enqueue_succeeds(due_today_card, user, redis, monkeypatch):
+    sent_key = DUE_DATE_SENT_KEY.format(date=date.today().isoformat())
+
+    def broker_down(reminders):
+        raise ConnectionError("broker unavailable")
+
+    monkeypatch.setattr(notifications.send_due_date_notifications_batch, "delay", broker_down)
+    assert schedule_due_date_reminders()["status"] == "error"
+    assert redis.scard(sent_key) == 0
+
+    enqueued = []
+    monkeypatch.setattr(notifications.send_due_date_notifications_batch, "delay", enqueued.append)
+    assert schedule_due_date_reminders()["enqueued"] == 1
+    assert enqueued[0][0]["days_left"] == 0
+    assert redis.sismember(sent_key, f"{due_today_card['id']}:{user.id}")
+
+    # 同一天再次扫描不会重复提醒
+    assert schedule_due_date_reminders()["enqueued"] == 0
+    assert len(enqueued) == 1
@@ -0,0 +1,135 @@
+"""邮件批量发送：通过 SMTPConnectionPool 向本地 aiosmtpd 服务器发送待发送队列中的邮件"""
+
+import json
+import socket
+
+import pytest
+from aiosmtpd.controller import Controller
+
+from app.core import smtp
+from app.core.config import settings
+from app.tasks import email
+from app.tasks.email import EMAIL_OUTBOX_KEY, EMAIL_PROCESSING_KEY, enqueue_template_email, flush_email_outbox
+
+
+class RecordingHandler:
+    """记录收到的邮件和连接数；收件人以 bad 开头时返回550，以 busy 开头时返回450"""
+
+    def __init__(self):
+        self.messages = []
+        self.connections = 0
+
+    async def handle_EHLO(self, server, session, envelope, hostname, responses):
+        self.connections += 1
+        session.host_name = hostname
+        return responses
+
+    async def handle_RCPT(self, server, session, envelope, address, rcpt_options):
+        if address.startswith("bad"):
+            return "550 No such user"
+        if address.startswith("busy"):
+            return "450 Mailbox busy, try again later"
+        envelope.rcpt_tos.append(address)
+        return "250 OK"
+
+    async def handle_DATA(self, server, session, envelope):
+        self.messages.append((envelope.rcpt_tos[0], envelope.content))
+        return "250 Message accepted"
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture
+def smtp_server(monkeypatch, redis):
+    handler = RecordingHandler()
+    port = free_port()
+    controller = Controller(handler, hostname="127.0.0.1", port=port)
+    controller.start()
+    monkeypatch.setattr(settings, "smtp_server", "127.0.0.1")
+    monkeypatch.setattr(settings, "smtp_port", port)
+    monkeypatch.setattr(settings, "smtp_username", None)
+    monkeypatch.setattr(settings, "smtp_use_tls", False)
+    monkeypatch.setattr(smtp, "_pool", None)
+    # 入队时不调度 Celery 任务（测试中直接调用 flush_email_outbox）
+    redis.set(email.EMAIL_FLUSH_SCHEDULED_KEY, 1)
+    rescheduled = []
+    monkeypatch.setattr(flush_email_outbox, "apply_async", lambda *args, **kwargs: rescheduled.append(kwargs))
+    handler.rescheduled = rescheduled
+    yield handler
+    smtp.get_smtp_pool().close_all()
+    controller.stop()
+
+
+def enqueue_welcome(address: str):
+    enqueue_template_email("welcome", address, {"user_name": address.split("@")[0]})
+
+
+def test_flush_sends_batches_over_one_pooled_connection(smtp_server, redis):
+    for i in range(5):
+        enqueue_welcome(f"user{i}@example.com")
+
+    result = flush_email_outbox(batch_size=2)
+
+    assert result["sent"] == 5 and result["failed"] == 0
+    assert [to for to, _ in smtp_server.messages] == [f"user{i}@example.com" for i in range(5)]
+    assert b"user3" in smtp_server.messages[3][1]
+    assert smtp_server.connections == 1
+    assert redis.llen(EMAIL_OUTBOX_KEY) == 0
+    assert redis.llen(EMAIL_PROCESSING_KEY) == 0
+
+
+def test_permanent_rejection_is_not_retried(smtp_server, redis):
+    enqueue_welcome("bad@example.com")
+    enqueue_welcome("good@example.com")
+
+    result = flush_email_outbox()
+
+    assert result == {"status": "success", "sent": 1, "failed": 1}
+    assert redis.llen(EMAIL_OUTBOX_KEY) == 0
+    assert smtp_server.rescheduled == []
+
+
+def test_transient_rejection_is_requeued_until_max_attempts(smtp_server, redis):
+    enqueue_welcome("busy@example.com")
+
+    result = flush_email_outbox()
+
+    assert result["failed"] == 0
+    assert json.loads(redis.lindex(EMAIL_OUTBOX_KEY, 0))["attempts"] == 1
+    assert smtp_server.rescheduled == [{"countdown": 60}]
+
+    redis.delete(email.EMAIL_FLUSH_SCHEDULED_KEY)
+    flush_email_outbox()
+    redis.delete(email.EMAIL_FLUSH_SCHEDULED_KEY)
+    assert flush_email_outbox()["failed"] == 1
+    assert redis.llen(EMAIL_OUTBOX_KEY) == 0
+    assert redis.llen(EMAIL_PROCESSING_KEY) == 0
+
+
+def test_batch_left_in_processing_after_crash_is_sent(smtp_server, redis):
+    # 上一次 flush 在发送过程中崩溃：邮件已移入处理中队列但没有发出
+    enqueue_welcome("crashed@example.com")
+    redis.lmove(EMAIL_OUTBOX_KEY, EMAIL_PROCESSING_KEY, "LEFT", "RIGHT")
+
+    result = flush_email_outbox()
+
+    assert result["sent"] == 1
+    assert [to for to, _ in smtp_server.messages] == ["crashed@example.com"]
+    assert redis.llen(EMAIL_PROCESSING_KEY) == 0
+
+
+def test_smtp_unavailable_keeps_mail_queued(smtp_server, redis, monkeypatch):
+    monkeypatch.setattr(settings, "smtp_port", 1)
+    monkeypatch.setattr(settings, "smtp_timeout", 1)
+    monkeypatch.setattr(smtp, "_pool", None)
+    enqueue_welcome("later@example.com")
+
+    result = flush_email_outbox()
+
+    assert result["sent"] == 0 and result["failed"] == 0
+    assert redis.llen(EMAIL_OUTBOX_KEY) == 1
+    assert redis.llen(EMAIL_PROCESSING_KEY) == 0
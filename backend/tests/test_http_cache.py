@@ -0,0 +1,83 @@
+"""项目详情和卡片列表的版本号ETag、项目列表的内容哈希ETag"""
+
+from app.models.models import Card
+
+
+def get(client, auth_headers, url: str, etag: str = None):
+    headers = dict(auth_headers, **({"If-None-Match": etag} if etag else {}))
+    return client.get(url, headers=headers)
+
+
+def test_unchanged_project_and_cards_return_304(client, auth_headers, project):
+    list_id = project["lists"]["待办"]
+    client.post(f"/api/v1/cards/?list_id={list_id}", json={"title": "卡片", "list_id": list_id}, headers=auth_headers)
+
+    for url in (f"/api/v1/projects/{project['id']}", f"/api/v1/cards/?list_id={list_id}"):
+        first = get(client, auth_headers, url)
+        assert first.status_code == 200
+        etag = first.headers["ETag"]
+        assert etag.startswith(f'W/"p{project["id"]}.')
+
+        second = get(client, auth_headers, url, etag)
+        assert second.status_code == 304
+        assert second.headers["ETag"] == etag
+        assert second.content == b""
+
+
+def test_cached_body_from_an_older_version_is_not_served(client, auth_headers, project, db):
+    list_id = project["lists"]["待办"]
+    card_id = client.post(
+        f"/api/v1/cards/?list_id={list_id}", json={"title": "旧标题", "list_id": list_id}, headers=auth_headers
+    ).json()["id"]
+    url = f"/api/v1/cards/?list_id={list_id}"
+    old_etag = get(client, auth_headers, url).headers["ETag"]
+
+    # 绕过接口直接修改：响应缓存没有被删除，但项目版本号已递增
+    db.get(Card, card_id).title = "新标题"
+    db.commit()
+
+    response = get(client, auth_headers, url, old_etag)
+    assert response.status_code == 200
+    assert response.headers["ETag"] != old_etag
+    assert [card["title"] for card in response.json()] == ["新标题"]
+
+
+def test_profile_edit_invalidates_bodies_that_embed_the_user(client, auth_headers, project, user):
+    list_id = project["lists"]["待办"]
+    card_id = client.post(
+        f"/api/v1/cards/?list_id={list_id}", json={"title": "卡片", "list_id": list_id}, headers=auth_headers
+    ).json()["id"]
+    client.post(
+        f"/api/v1/cards/{card_id}/assignments", json={"card_id": card_id, "user_id": user.id}, headers=auth_headers
+    )
+    project_url, cards_url = f"/api/v1/projects/{project['id']}", f"/api/v1/cards/?list_id={list_id}"
+    etags = {url: get(client, auth_headers, url).headers["ETag"] for url in (project_url, cards_url)}
+
+    response = client.put(f"/api/v1/users/{user.id}", json={"full_name": "改名后"}, headers=auth_headers)
+    assert response.status_code == 200
+
+    project_response = get(client, auth_headers, project_url, etags[project_url])
+    assert project_response.status_code == 200
+    assert project_response.json()["owner"]["full_name"] == "改名后"
+    cards_response = get(client, auth_headers, cards_url, etags[cards_url])
+    assert cards_response.status_code == 200
+    assert cards_response.json()[0]["assignments"][0]["user"]["full_name"] == "改名后"
+
+
+def test_project_list_uses_a_content_hash_etag(client, auth_headers, project, user):
+    first = get(client, auth_headers, "/api/v1/projects/")
+    etag = first.headers["ETag"]
+    assert not etag.startswith("W/")
+    assert get(client, auth_headers, "/api/v1/projects/", etag).status_code == 304
+    # 不同的分页窗口是不同的缓存条目
+    assert get(client, auth_headers, "/api/v1/projects/?limit=1", etag).status_code == 200
+
+    client.put(f"/api/v1/projects/{project['id']}", json={"name": "新名字"}, headers=auth_headers)
+    renamed = get(client, auth_headers, "/api/v1/projects/", etag)
+    assert renamed.status_code == 200
+    assert renamed.json()["items"][0]["name"] == "新名字"
+
+    client.put(f"/api/v1/users/{user.id}", json={"full_name": "改名后"}, headers=auth_headers)
+    edited = get(client, auth_headers, "/api/v1/projects/", renamed.headers["ETag"])
+    assert edited.status_code == 200
+    assert edited.json()["items"][0]["owner"]["full_name"] == "改名后"
@@ -0,0 +1,90 @@
+"""Idempotency-Key：相同请求重放保存的响应，不同请求返回422，执行中返回409"""
+
+import json
+
+from app.core.idempotency import request_fingerprint
+from app.core.security import jwt_manager
+from app.models.models import Card, ProjectMember, User
+
+
+def card_body(list_id: int, title: str = "卡片") -> bytes:
+    # 直接发送编码好的请求体，重试时字节完全相同（请求指纹包含请求体）
+    return json.dumps({"title": title, "list_id": list_id}).encode()
+
+
+def post_card(client, headers, list_id: int, body: bytes):
+    return client.post(
+        f"/api/v1/cards/?list_id={list_id}",
+        content=body,
+        headers={**headers, "Content-Type": "application/json"}
+    )
+
+
+def test_retry_with_same_key_replays_response_without_creating_twice(client, auth_headers, project, db):
+    list_id = project["lists"]["待办"]
+    headers = {**auth_headers, "Idempotency-Key": "create-card-1"}
+
+    first = post_card(client, headers, list_id, card_body(list_id))
+    retry = post_card(client, headers, list_id, card_body(list_id))
+
+    assert first.status_code == retry.status_code == 200
+    assert "idempotent-replayed" not in first.headers
+    assert retry.headers["idempotent-replayed"] == "true"
+    assert retry.content == first.content
+    assert db.query(Card).filter(Card.list_id == list_id).count() == 1
+
+
+def test_same_key_with_different_request_returns_422(client, auth_headers, project, db):
+    list_id = project["lists"]["待办"]
+    headers = {**auth_headers, "Idempotency-Key": "create-card-2"}
+
+    assert post_card(client, headers, list_id, card_body(list_id, "第一张")).status_code == 200
+    response = post_card(client, headers, list_id, card_body(list_id, "第二张"))
+
+    assert response.status_code == 422
+    assert db.query(Card).filter(Card.list_id == list_id).count() == 1
+
+
+def test_request_still_in_progress_returns_409(client, auth_headers, project, user, redis):
+    path = f"/api/v1/projects/{project['id']}"
+    body = json.dumps({"name": "新名称"}).encode()
+    fingerprint = request_fingerprint({"method": "PUT", "path": path, "query_string": b""}, body)
+    redis.set(f"idempotency:{user.id}:in-progress", json.dumps({"fingerprint": fingerprint}))
+
+    response = client.put(
+        path,
+        content=body,
+        headers={**auth_headers, "Idempotency-Key": "in-progress", "Content-Type": "application/json"}
+    )
+
+    assert response.status_code == 409
+    assert response.headers["retry-after"] == "1"
+
+
+def test_keys_are_scoped_per_user(client, auth_headers, project, db):
+    other = User(username="other", email="other@example.com", password_hash="!", full_name="Other")
+    db.add(other)
+    db.flush()
+    db.add(ProjectMember(project_id=project["id"], user_id=other.id, role="member"))
+    db.commit()
+    other_headers = {"Authorization": f"Bearer {jwt_manager.create_access_token({'sub': str(other.id)})}"}
+    list_id = project["lists"]["待办"]
+
+    post_card(client, {**auth_headers, "Idempotency-Key": "shared"}, list_id, card_body(list_id))
+    response = post_card(client, {**other_headers, "Idempotency-Key": "shared"}, list_id, card_body(list_id))
+
+    assert response.status_code == 200
+    assert "idempotent-replayed" not in response.headers
+    assert db.query(Card).filter(Card.list_id == list_id).count() == 2
+
+
+def test_project_import_is_not_fingerprinted(client, auth_headers, project):
+    export = client.get(f"/api/v1/projects/{project['id']}/export", headers=auth_headers).content
+    headers = {**auth_headers, "Idempotency-Key": "import-1"}
+
+    first = client.post("/api/v1/projects/import", content=export, headers=headers)
+    second = client.post("/api/v1/projects/import", content=export, headers=headers)
+
+    assert first.status_code == second.status_code == 200
+    assert "idempotent-replayed" not in second.headers
+    assert first.json()["project_id"] != second.json()["project_id"]
@@ -0,0 +1,14 @@
+"""应用冷启动导入检查（与 check_import_time.py 相同的预算和按需加载要求）"""
+
+from check_import_time import DEFAULT_BUDGET_MS, eager_modules, measure
+
+# 取多次测量中最快的一次，排除机器负载造成的波动
+RUNS = 3
+
+
+def test_app_import_within_budget_without_eager_modules():
+    total, modules = measure("app.main")
+    assert eager_modules(modules) == []
+
+    fastest = min([total] + [measure("app.main")[0] for _ in range(RUNS - 1)])
+    assert fastest <= DEFAULT_BUDGET_MS, f"导入 app.main 耗时 {fastest:.1f} ms，超过预算 {DEFAULT_BUDGET_MS} ms"
@@ -0,0 +1,25 @@
+"""通知收件箱：通知ID计数器不受缓存清理任务影响"""
+
+from app.services.notification_service import NotificationStore
+from app.tasks.cleanup import cleanup_expired_cache
+
+
+def test_sequence_counter_is_not_expired_by_cache_cleanup(redis):
+    store = NotificationStore(redis)
+    first = store.add(1, "info", "第一条", "消息")
+
+    cleanup_expired_cache()
+
+    # 清理任务会给 notifications: 前缀下没有过期时间的键加上24小时过期，计数器不在其中
+    assert redis.ttl(store.sequence_key) == -1
+    second = store.add(1, "info", "第二条", "消息")
+    assert second["id"] > first["id"]
+    assert [item["id"] for item in store.get_page(1)["items"]] == [second["id"], first["id"]]
+
+
+def test_sequence_continues_from_legacy_counter(redis):
+    redis.set(NotificationStore.legacy_sequence_key, 41)
+    store = NotificationStore(redis)
+
+    assert store.add(1, "info", "标题", "消息")["id"] == 42
+    assert store.add(2, "info", "标题", "消息")["id"] == 43
@@ -0,0 +1,87 @@
+"""项目增量同步：墓碑、跨项目移动、按版本号分页和 410"""
+
+from datetime import datetime
+
+from app.models.models import Project
+
+
+def changes(client, auth_headers, project_id: int, since: int = 0, **params):
+    return client.get(
+        f"/api/v1/projects/{project_id}/changes", params={"since": since, **params}, headers=auth_headers
+    )
+
+
+def create_card(client, auth_headers, list_id: int, title: str = "卡片") -> int:
+    return client.post(
+        f"/api/v1/cards/?list_id={list_id}", json={"title": title, "list_id": list_id}, headers=auth_headers
+    ).json()["id"]
+
+
+def test_deleted_card_is_returned_as_a_tombstone(client, auth_headers, project):
+    card_id = create_card(client, auth_headers, project["lists"]["待办"])
+    since = changes(client, auth_headers, project["id"]).json()["version"]
+
+    client.delete(f"/api/v1/cards/{card_id}", headers=auth_headers)
+    feed = changes(client, auth_headers, project["id"], since).json()
+
+    card_changes = [change for change in feed["changes"] if change["entity_type"] == "card"]
+    assert card_changes == [{
+        "entity_type": "card", "entity_id": card_id, "version": feed["version"], "deleted": True, "data": None
+    }]
+
+
+def test_card_moved_to_another_project_is_a_tombstone_in_the_source(client, auth_headers, project):
+    other = client.post("/api/v1/projects/", json={"name": "另一个项目"}, headers=auth_headers).json()["id"]
+    target_list = client.get(f"/api/v1/lists/?project_id={other}", headers=auth_headers).json()[0]["id"]
+    source_list = project["lists"]["待办"]
+    card_id = create_card(client, auth_headers, source_list)
+    source_since = changes(client, auth_headers, project["id"]).json()["version"]
+    target_since = changes(client, auth_headers, other).json()["version"]
+
+    response = client.post("/api/v1/cards/move", json={
+        "card_id": card_id, "source_list_id": source_list, "target_list_id": target_list, "new_position": 0
+    }, headers=auth_headers)
+    assert response.status_code == 200
+
+    source = {(c["entity_type"], c["entity_id"]): c for c in changes(client, auth_headers, project["id"], source_since).json()["changes"]}
+    target = {(c["entity_type"], c["entity_id"]): c for c in changes(client, auth_headers, other, target_since).json()["changes"]}
+    assert source[("card", card_id)]["deleted"] is True
+    assert target[("card", card_id)]["deleted"] is False
+    assert target[("card", card_id)]["data"]["list_id"] == target_list
+    # 两个列表的卡片数都变了
+    assert source[("list", source_list)]["data"]["card_count"] == 0
+    assert target[("list", target_list)]["data"]["card_count"] == 1
+
+
+def test_a_version_is_never_split_across_pages(client, auth_headers, project):
+    # 创建项目：版本1为项目本身，版本2为所有者成员和三个默认列表
+    first = changes(client, auth_headers, project["id"], limit=2).json()
+    assert first["has_more"] is True
+    assert first["version"] == 2
+    assert [(c["entity_type"], c["version"]) for c in first["changes"]] == [("project", 1)] + [("member", 2)] + [("list", 2)] * 3
+
+    rest = changes(client, auth_headers, project["id"], first["version"]).json()
+    assert rest["has_more"] is False
+    assert all(change["version"] > first["version"] for change in rest["changes"])
+
+
+def test_client_ahead_of_the_project_gets_410(client, auth_headers, project):
+    version = changes(client, auth_headers, project["id"]).json()["version"]
+
+    assert changes(client, auth_headers, project["id"], version).status_code == 200
+    assert changes(client, auth_headers, project["id"], version + 1).status_code == 410
+
+
+def test_version_bump_keeps_project_updated_at(client, auth_headers, project, db):
+    card_id = create_card(client, auth_headers, project["lists"]["待办"])
+    stamp = datetime(2020, 1, 1)
+    db.get(Project, project["id"]).updated_at = stamp
+    db.commit()
+    version = db.get(Project, project["id"]).version
+
+    client.put(f"/api/v1/cards/{card_id}", json={"title": "新标题"}, headers=auth_headers)
+
+    db.expire_all()
+    row = db.get(Project, project["id"])
+    assert row.version > version
+    assert row.updated_at == stamp
@@ -0,0 +1,123 @@
+"""项目导出后再导入：ID重新映射、未知用户、记录顺序校验和分块写入"""
+
+import orjson
+import pytest
+from sqlalchemy import event
+
+from app.core.database import engine
+from app.models.models import Card, List, User
+from app.services.export_service import ProjectImporter, parse_line
+
+
+@pytest.fixture(params=["returning", "read_back"])
+def insert_mode(request, monkeypatch):
+    """分别覆盖 executemany RETURNING 和逐块读回新ID（MySQL）两种写入方式"""
+    monkeypatch.setattr(
+        engine.dialect, "insert_executemany_returning_sort_by_parameter_order", request.param == "returning"
+    )
+    return request.param
+
+
+@pytest.fixture
+def exported(client, auth_headers, project, user, db) -> list:
+    """导出一个带卡片、标签和分配的项目，返回解析后的记录"""
+    colleague = User(username="colleague", email="colleague@example.com", password_hash="!", full_name="Colleague")
+    db.add(colleague)
+    db.commit()
+    for list_name in ("待办", "已完成"):
+        list_id = project["lists"][list_name]
+        for i in range(3):
+            card_id = client.post(
+                f"/api/v1/cards/?list_id={list_id}",
+                json={"title": f"{list_name}{i}", "list_id": list_id}, headers=auth_headers
+            ).json()["id"]
+            client.post(f"/api/v1/cards/{card_id}/labels", json={"card_id": card_id, "label": f"标签{i}"}, headers=auth_headers)
+            for assignee in (user, colleague):
+                client.post(
+                    f"/api/v1/cards/{card_id}/assignments",
+                    json={"card_id": card_id, "user_id": assignee.id}, headers=auth_headers
+                )
+    response = client.get(f"/api/v1/projects/{project['id']}/export", headers=auth_headers)
+    assert response.status_code == 200
+    return [parse_line(line) for line in response.content.splitlines()]
+
+
+def ndjson(records: list) -> bytes:
+    return b"".join(orjson.dumps(record) + b"\n" for record in records)
+
+
+def board(client, auth_headers, project_id: int) -> dict:
+    """列表名 -> [(卡片标题, [标签], [被分配人邮箱])]"""
+    result = {}
+    for lst in client.get(f"/api/v1/lists/?project_id={project_id}", headers=auth_headers).json():
+        cards = client.get(f"/api/v1/cards/?list_id={lst['id']}", headers=auth_headers).json()
+        result[lst["name"]] = [(
+            card["title"],
+            sorted(label["label"] for label in card["labels"]),
+            sorted(assignment["user"]["email"] for assignment in card["assignments"])
+        ) for card in cards]
+    return result
+
+
+def test_round_trip_remaps_ids(client, auth_headers, project, exported, insert_mode):
+    response = client.post("/api/v1/projects/import", content=ndjson(exported), headers=auth_headers)
+    assert response.status_code == 200
+    result = response.json()
+    assert result["project_id"] != project["id"]
+    assert (result["lists"], result["cards"], result["labels"], result["assignments"]) == (3, 6, 6, 12)
+    assert result["skipped_assignments"] == 0
+
+    assert board(client, auth_headers, result["project_id"]) == board(client, auth_headers, project["id"])
+    imported_lists = client.get(f"/api/v1/lists/?project_id={result['project_id']}", headers=auth_headers).json()
+    assert not {lst["id"] for lst in imported_lists} & set(project["lists"].values())
+
+
+def test_small_chunks_map_ids_across_chunk_boundaries(project, exported, user, db, insert_mode):
+    card_inserts = []
+
+    def count_card_inserts(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith("INSERT INTO cards"):
+            card_inserts.append(statement)
+
+    importer = ProjectImporter(db, user, chunk_size=2)
+    event.listen(engine, "before_cursor_execute", count_card_inserts)
+    try:
+        for record in exported:
+            importer.feed(record)
+        result = importer.finish()
+    finally:
+        event.remove(engine, "before_cursor_execute", count_card_inserts)
+
+    if insert_mode == "read_back":
+        # 每块一条 executemany，不逐行插入
+        assert len(card_inserts) == 3
+
+    cards = {record["data"]["id"]: record["data"] for record in exported if record["type"] == "card"}
+    assert len(importer.id_maps["card"]) == 6
+    assert len(importer.id_maps["assignment"]) == 12
+    # 每个旧ID都映射到导入项目中的同名卡片
+    for old_id, new_id in importer.id_maps["card"].items():
+        card = db.get(Card, new_id)
+        assert card.title == cards[old_id]["title"]
+        assert db.get(List, card.list_id).project_id == result["project_id"]
+
+
+def test_assignments_of_unknown_users_are_skipped(client, auth_headers, exported):
+    for record in exported:
+        if record["type"] == "assignment" and record["data"]["user_email"] == "colleague@example.com":
+            record["data"]["user_email"] = "nobody@example.com"
+
+    result = client.post("/api/v1/projects/import", content=ndjson(exported), headers=auth_headers).json()
+    assert result["assignments"] == 6
+    assert result["skipped_assignments"] == 6
+
+
+@pytest.mark.parametrize("mutate", [
+    lambda records: records[2:] + records[:2],                         # 项目记录不在最前面
+    lambda records: sorted(records, key=lambda r: r["type"] != "card"),  # 卡片早于列表
+    lambda records: [r for r in records if r["type"] != "list"],       # 卡片引用不存在的列表
+])
+def test_out_of_order_records_are_rejected(client, auth_headers, exported, mutate):
+    response = client.post("/api/v1/projects/import", content=ndjson(mutate(exported)), headers=auth_headers)
+    assert response.status_code == 400
+    assert response.json()["detail"].startswith("Invalid import")
@@ -0,0 +1,83 @@
+"""令牌桶限流：超出用户或接口的额度返回429和 Retry-After；Redis 不可用时使用进程内令牌桶"""
+
+import pytest
+
+from app.core.config import settings
+from app.core.loop_monitor import loop_monitor
+from app.core.redis import redis_client
+
+
+@pytest.fixture
+def rate_limited(monkeypatch):
+    monkeypatch.setattr(settings, "rate_limit_enabled", True)
+    monkeypatch.setattr(settings, "rate_limit_user_rate", 50)
+    monkeypatch.setattr(settings, "rate_limit_user_burst", 100)
+    monkeypatch.setattr(settings, "rate_limit_routes", {"GET /api/v1/cards/": [0.1, 3]})
+
+
+def get_cards(client, headers, list_id: int):
+    return client.get(f"/api/v1/cards/?list_id={list_id}", headers=headers)
+
+
+def test_route_bucket_returns_429_with_retry_after(client, auth_headers, project, rate_limited, redis, user):
+    list_id = project["lists"]["待办"]
+
+    statuses = [get_cards(client, auth_headers, list_id).status_code for _ in range(4)]
+    limited = get_cards(client, auth_headers, list_id)
+
+    assert statuses == [200, 200, 200, 429]
+    assert limited.status_code == 429
+    assert int(limited.headers["retry-after"]) >= 1
+    # 其他接口使用各自的额度
+    assert client.get(f"/api/v1/lists/?project_id={project['id']}", headers=auth_headers).status_code == 200
+    assert redis.exists(f"ratelimit:{user.id}:GET /api/v1/cards/")
+
+
+def test_user_bucket_limits_across_routes(client, auth_headers, project, rate_limited, monkeypatch):
+    monkeypatch.setattr(settings, "rate_limit_user_rate", 0.1)
+    monkeypatch.setattr(settings, "rate_limit_user_burst", 2)
+
+    statuses = [
+        client.get(f"/api/v1/lists/?project_id={project['id']}", headers=auth_headers).status_code,
+        client.get(f"/api/v1/projects/{project['id']}", headers=auth_headers).status_code,
+        client.get(f"/api/v1/lists/?project_id={project['id']}", headers=auth_headers).status_code,
+    ]
+
+    assert statuses == [200, 200, 429]
+
+
+def test_anonymous_requests_are_limited_by_client_ip(client, rate_limited):
+    statuses = [client.get("/api/v1/cards/?list_id=1").status_code for _ in range(4)]
+
+    # 未登录的请求同样计入额度（HTTPBearer 对缺少令牌的请求返回403）
+    assert statuses == [403, 403, 403, 429]
+
+
+def test_falls_back_to_local_buckets_when_redis_is_down(client, auth_headers, project, rate_limited):
+    list_id = project["lists"]["待办"]
+
+    class UnavailableRedis:
+        def __getattr__(self, name):
+            def fail(*args, **kwargs):
+                raise ConnectionError("redis is down")
+            return fail
+
+    real = redis_client._client
+    redis_client._client = UnavailableRedis()
+    try:
+        statuses = [get_cards(client, auth_headers, list_id).status_code for _ in range(4)]
+    finally:
+        redis_client._client = real
+
+    assert statuses == [200, 200, 200, 429]
+
+
+def test_load_shedding_returns_503_except_health(client, auth_headers, project, monkeypatch):
+    monkeypatch.setattr(settings, "load_shedding_enabled", True)
+    monkeypatch.setattr(loop_monitor, "lag", settings.load_shed_loop_lag * 2)
+
+    response = client.get(f"/api/v1/lists/?project_id={project['id']}", headers=auth_headers)
+
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "1"
+    assert client.get("/health").status_code == 200
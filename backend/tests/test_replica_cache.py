@@ -0,0 +1,86 @@
+"""从落后的只读副本构建的响应不能带上主库的版本ETag（否则副本追上后客户端一直拿到304和旧数据）"""
+
+import shutil
+
+import pytest
+from sqlalchemy import create_engine
+
+from app.core import replicas
+from app.core.database import engine
+from app.core.security import jwt_manager
+from app.models.models import ProjectMember, User
+
+
+@pytest.fixture
+def replica(tmp_path, db):
+    """第二个 SQLite 文件作为副本，catch_up() 把主库当前的数据复制过去"""
+    path = tmp_path / "replica.db"
+    replica_engine = create_engine(f"sqlite:///{path}")
+
+    def catch_up():
+        replica_engine.dispose()
+        shutil.copyfile(engine.url.database, path)
+
+    replicas.register_replica(replica_engine, name="test")
+    yield catch_up
+    replicas._replicas[:] = [r for r in replicas._replicas if r.engine is not replica_engine]
+    replica_engine.dispose()
+
+
+@pytest.fixture
+def reader_headers(db, project) -> dict:
+    """项目的另一个成员：没有写入过，读请求走副本"""
+    reader = User(username="reader", email="reader@example.com", password_hash="!", full_name="Reader")
+    db.add(reader)
+    db.flush()
+    db.add(ProjectMember(project_id=project["id"], user_id=reader.id, role="member"))
+    db.commit()
+    return {"Authorization": f"Bearer {jwt_manager.create_access_token({'sub': str(reader.id)})}"}
+
+
+class ClientCache:
+    """模拟浏览器的HTTP缓存：带上 If-None-Match，304 时沿用缓存的响应体"""
+
+    def __init__(self, client, headers: dict, url: str):
+        self.client, self.headers, self.url = client, headers, url
+        self.etag, self.body = None, None
+
+    def get(self) -> dict:
+        headers = dict(self.headers, **({"If-None-Match": self.etag} if self.etag else {}))
+        response = self.client.get(self.url, headers=headers)
+        assert response.status_code in (200, 304)
+        if response.status_code == 200:
+            self.body = response.json()
+            self.etag = response.headers.get("ETag")
+        return self.body
+
+
+def test_lagging_replica_never_leads_to_a_stale_304(client, auth_headers, project, reader_headers, replica):
+    replica()
+    url = f"/api/v1/projects/{project['id']}"
+    reader = ClientCache(client, reader_headers, url)
+    assert reader.get()["name"] == "测试项目"
+
+    response = client.put(url, json={"name": "新名字"}, headers=auth_headers)
+    assert response.status_code == 200
+
+    # 副本还没有复制到这次写入：读到旧数据，但ETag是副本上的版本，不是主库的新版本
+    assert reader.get()["name"] == "测试项目"
+
+    replica()
+    assert reader.get()["name"] == "新名字"
+    # 没有ETag的新客户端也不会拿到以新版本缓存的旧响应
+    assert ClientCache(client, reader_headers, url).get()["name"] == "新名字"
+
+
+def test_lagging_replica_card_list(client, auth_headers, project, reader_headers, replica):
+    list_id = project["lists"]["待办"]
+    replica()
+    reader = ClientCache(client, reader_headers, f"/api/v1/cards/?list_id={list_id}")
+    assert reader.get() == []
+
+    client.post(f"/api/v1/cards/?list_id={list_id}", json={"title": "新卡片", "list_id": list_id}, headers=auth_headers)
+    assert reader.get() == []
+
+    replica()
+    assert [card["title"] for card in reader.get()] == ["新卡片"]
@@ -0,0 +1,100 @@
+"""卡片搜索：中英文分词、按项目权限过滤、游标分页和增量更新"""
+
+import pytest
+
+from app.core.security import jwt_manager
+from app.models.models import User
+from app.services.search_service import CardSearchIndex, card_search_index
+
+
+def create_card(client, auth_headers, list_id: int, title: str, description: str = None) -> int:
+    response = client.post(
+        f"/api/v1/cards/?list_id={list_id}",
+        json={"title": title, "description": description, "list_id": list_id},
+        headers=auth_headers
+    )
+    assert response.status_code == 200
+    return response.json()["id"]
+
+
+def search(client, auth_headers, q: str, **params) -> dict:
+    response = client.get("/api/v1/search/cards", params={"q": q, **params}, headers=auth_headers)
+    assert response.status_code == 200
+    return response.json()
+
+
+def ids(result: dict) -> list:
+    return [item["id"] for item in result["items"]]
+
+
+def test_search_matches_cjk_bigrams_and_words(client, auth_headers, project):
+    list_id = project["lists"]["待办"]
+    login = create_card(client, auth_headers, list_id, "修复登录页面", "Safari login redirect")
+    create_card(client, auth_headers, list_id, "登出按钮")
+
+    assert ids(search(client, auth_headers, "登录")) == [login]
+    assert ids(search(client, auth_headers, "LOGIN redirect")) == [login]
+    assert ids(search(client, auth_headers, "登录 chrome")) == []
+
+
+def test_pages_follow_the_cursor_across_projects(client, auth_headers, project):
+    other = client.post("/api/v1/projects/", json={"name": "另一个项目"}, headers=auth_headers).json()["id"]
+    other_list = client.get(f"/api/v1/lists/?project_id={other}", headers=auth_headers).json()[0]["id"]
+    created = []
+    for i in range(7):
+        list_id = project["lists"]["待办"] if i % 2 else other_list
+        created.append(create_card(client, auth_headers, list_id, f"发布任务 {i}"))
+
+    pages, cursor = [], None
+    while True:
+        result = search(client, auth_headers, "发布", limit=3, **({"cursor": cursor} if cursor else {}))
+        pages.append(ids(result))
+        cursor = result["next_cursor"]
+        if cursor is None:
+            break
+
+    assert pages == [sorted(created, reverse=True)[i:i + 3] for i in (0, 3, 6)]
+    assert ids(search(client, auth_headers, "发布", project_id=other)) == sorted(created[::2], reverse=True)
+
+
+def test_other_users_projects_are_not_searched(client, auth_headers, project, db):
+    create_card(client, auth_headers, project["lists"]["待办"], "机密计划")
+    outsider = User(username="outsider", email="outsider@example.com", password_hash="!", full_name="Outsider")
+    db.add(outsider)
+    db.commit()
+    headers = {"Authorization": f"Bearer {jwt_manager.create_access_token({'sub': str(outsider.id)})}"}
+
+    assert search(client, headers, "机密")["items"] == []
+
+
+def test_index_follows_updates_and_deletes(client, auth_headers, project):
+    card_id = create_card(client, auth_headers, project["lists"]["待办"], "旧标题")
+
+    client.put(f"/api/v1/cards/{card_id}", json={"title": "新标题"}, headers=auth_headers)
+    assert ids(search(client, auth_headers, "旧标")) == []
+    assert ids(search(client, auth_headers, "新标")) == [card_id]
+
+    client.delete(f"/api/v1/cards/{card_id}", headers=auth_headers)
+    assert ids(search(client, auth_headers, "新标")) == []
+
+
+def test_page_scan_stops_once_the_page_is_full(redis):
+    index = CardSearchIndex(redis)
+    # 2000 张卡片都包含 "任务"，只有ID为偶数的卡片包含 "发布"
+    index.index_cards([
+        {"id": i, "project_id": 1, "title": f"任务{' 发布' if i % 2 == 0 else ''}"}
+        for i in range(1, 2001)
+    ])
+
+    assert index.search("任务", [1], limit=5) == [2000, 1999, 1998, 1997, 1996]
+    assert index.search("任务 发布", [1], cursor=1000, limit=3) == [998, 996, 994]
+    assert index.search("任务 不存在", [1]) == []
+
+
+def test_drop_legacy_index_removes_only_old_keys(redis):
+    redis.sadd("search:p:1:t:任务", 1)
+    redis.hset("search:card:1", mapping={"project_id": 1, "terms": "任务"})
+    card_search_index.index_cards([{"id": 1, "project_id": 1, "title": "任务"}])
+
+    assert card_search_index.drop_legacy_index() == 2
+    assert card_search_index.search("任务", [1]) == [1]
@@ -0,0 +1,63 @@
+"""Add materialized card counters
+
+Revision ID: 3c9a1f2d7b64
+Revises: 861f470086b0
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3c9a1f2d7b64'
+down_revision: Union[str, None] = '861f470086b0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('lists', sa.Column('card_count', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('projects', sa.Column('card_count', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('projects', sa.Column('done_card_count', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('project_members', sa.Column('assigned_card_count', sa.Integer(), server_default='0', nullable=False))
+
+    # 从现有数据回填计数器
+    op.execute("""
+        UPDATE lists SET card_count = (
+            SELECT COUNT(*) FROM cards WHERE cards.list_id = lists.id
+        )
+    """)
+    op.execute("""
+        UPDATE projects SET
+            card_count = (
+                SELECT COALESCE(SUM(lists.card_count), 0)
+                FROM lists JOIN boards ON boards.id = lists.board_id
+                WHERE boards.project_id = projects.id
+            ),
+            done_card_count = (
+                SELECT COALESCE(SUM(lists.card_count), 0)
+                FROM lists JOIN boards ON boards.id = lists.board_id
+                WHERE boards.project_id = projects.id
+                  AND lists.name IN ('已完成', 'Done', '完成')
+            )
+    """)
+    op.execute("""
+        UPDATE project_members SET assigned_card_count = (
+            SELECT COUNT(*)
+            FROM cards
+            JOIN lists ON lists.id = cards.list_id
+            JOIN boards ON boards.id = lists.board_id
+            WHERE boards.project_id = project_members.project_id
+              AND cards.assignee_id = project_members.user_id
+        )
+    """)
+
+
+def downgrade() -> None:
+    op.drop_column('project_members', 'assigned_card_count')
+    op.drop_column('projects', 'done_card_count')
+    op.drop_column('projects', 'card_count')
+    op.drop_column('lists', 'card_count')
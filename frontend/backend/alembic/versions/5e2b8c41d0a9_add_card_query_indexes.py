@@ -0,0 +1,36 @@
+"""Add composite indexes for card queries
+
+Revision ID: 5e2b8c41d0a9
+Revises: 3c9a1f2d7b64
+Create Date: 2026-10-19 11:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5e2b8c41d0a9'
+down_revision: Union[str, None] = '3c9a1f2d7b64'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_cards_assignee_id_id', 'cards', ['assignee_id', 'id'], unique=False)
+    op.create_index('ix_cards_assignee_due', 'cards', ['assignee_id', 'due_date'], unique=False)
+    op.create_index('ix_cards_creator_id_id', 'cards', ['creator_id', 'id'], unique=False)
+    op.create_index('ix_cards_list_position', 'cards', ['list_id', 'position'], unique=False)
+    op.create_index('ix_lists_board_position', 'lists', ['board_id', 'position'], unique=False)
+    op.create_index(op.f('ix_boards_project_id'), 'boards', ['project_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_boards_project_id'), table_name='boards')
+    op.drop_index('ix_lists_board_position', table_name='lists')
+    op.drop_index('ix_cards_list_position', table_name='cards')
+    op.drop_index('ix_cards_creator_id_id', table_name='cards')
+    op.drop_index('ix_cards_assignee_due', table_name='cards')
+    op.drop_index('ix_cards_assignee_id_id', table_name='cards')
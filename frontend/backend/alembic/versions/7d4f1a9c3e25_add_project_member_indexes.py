@@ -0,0 +1,34 @@
+"""Add unique and lookup indexes for project members
+
+Revision ID: 7d4f1a9c3e25
+Revises: 5e2b8c41d0a9
+Create Date: 2026-10-19 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7d4f1a9c3e25'
+down_revision: Union[str, None] = '5e2b8c41d0a9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Drop duplicate memberships left by the old check-then-insert (keep the earliest row)
+    op.execute(
+        "DELETE FROM project_members WHERE id NOT IN ("
+        "SELECT keep_id FROM (SELECT MIN(id) AS keep_id FROM project_members GROUP BY project_id, user_id) AS keep"
+        ")"
+    )
+    op.create_index('uq_project_members_project_user', 'project_members', ['project_id', 'user_id'], unique=True)
+    op.create_index('ix_project_members_user_project', 'project_members', ['user_id', 'project_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_project_members_user_project', table_name='project_members')
+    op.drop_index('uq_project_members_project_user', table_name='project_members')
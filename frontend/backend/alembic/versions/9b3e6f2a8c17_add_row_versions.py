@@ -0,0 +1,30 @@
+"""Add row version columns for optimistic concurrency
+
+Revision ID: 9b3e6f2a8c17
+Revises: 7d4f1a9c3e25
+Create Date: 2026-10-19 15:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9b3e6f2a8c17'
+down_revision: Union[str, None] = '7d4f1a9c3e25'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('projects', sa.Column('version_id', sa.Integer(), server_default='1', nullable=False))
+    op.add_column('lists', sa.Column('version_id', sa.Integer(), server_default='1', nullable=False))
+    op.add_column('cards', sa.Column('version_id', sa.Integer(), server_default='1', nullable=False))
+
+
+def downgrade() -> None:
+    op.drop_column('cards', 'version_id')
+    op.drop_column('lists', 'version_id')
+    op.drop_column('projects', 'version_id')
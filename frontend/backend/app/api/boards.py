@@ -1,9 +1,11 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
+from typing import List, Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, status
 from sqlalchemy.orm import Session
+from app.core.concurrency import check_version, commit_versioned, entity_state
 from app.core.database import get_db
-from app.core.deps import get_current_active_user
+from app.core.deps import get_current_active_user, get_read_db
 from app.models import User, Project, Board, List as BoardList, ProjectMember
+from app.core.counters import list_renamed, remove_lists
 from app.schemas import (
     Board as BoardSchema,
     BoardCreate,
@@ -14,8 +16,7 @@ from app.schemas import (
     ListUpdate,
     ListPositionUpdate
 )
-from app.api.websocket import WebSocketNotifier
-import asyncio
+from app.api.websocket import WebSocketNotifier, notifier, notify
 
 router = APIRouter()
 
@@ -82,7 +83,7 @@ def create_board(
 def read_project_boards(
     project_id: int,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """获取项目的所有看板"""
     # 检查项目访问权限
@@ -95,7 +96,7 @@ def read_project_boards(
 def read_board(
     board_id: int,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """获取看板详情（包含列表）"""
     board = db.query(Board).filter(Board.id == board_id).first()
@@ -155,6 +156,8 @@ def delete_board(
     # 检查项目写入权限
     check_project_write_access(board.project_id, current_user.id, db)
     
+    # 看板下的列表和卡片会被一起删除，先更新计数器
+    remove_lists(db, board.lists, board.project_id)
     db.delete(board)
     db.commit()
     
@@ -197,18 +200,14 @@ def create_list(
     db.refresh(db_list)
     
     # 触发WebSocket通知
-    try:
-        from app.api.websocket import notifier
-        list_data_ws = {
-            "id": db_list.id,
-            "name": db_list.name,
-            "position": db_list.position,
-            "cards": []
-        }
-        asyncio.create_task(notifier.notify_list_created(board.project_id, list_data_ws, current_user.id))
-        print(f"WebSocket notification sent for list creation: {db_list.id}")
-    except Exception as e:
-        print(f"Failed to send WebSocket notification for list creation: {e}")
+    list_data_ws = {
+        "id": db_list.id,
+        "name": db_list.name,
+        "position": db_list.position,
+        "version_id": db_list.version_id,
+        "cards": []
+    }
+    notify(notifier.notify_list_created, board.project_id, list_data_ws, current_user.id)
     
     return db_list
 
@@ -236,10 +235,11 @@ def read_list(
 def update_list(
     list_id: int,
     list_update: ListUpdate,
+    if_match: Optional[str] = Header(None),
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
-    """更新列表信息"""
+    """更新列表信息（If-Match 或 version_id 与当前版本不一致时返回409）"""
     list_obj = db.query(BoardList).filter(BoardList.id == list_id).first()
     if not list_obj:
         raise HTTPException(
@@ -250,25 +250,31 @@ def update_list(
     # 检查项目写入权限
     board = db.query(Board).filter(Board.id == list_obj.board_id).first()
     check_project_write_access(board.project_id, current_user.id, db)
+    check_version(list_obj, if_match, list_update.version_id)
     
     # 更新列表信息
-    update_data = list_update.dict(exclude_unset=True)
+    old_name = list_obj.name
+    update_data = list_update.dict(exclude_unset=True, exclude={"version_id"})
     for field, value in update_data.items():
         setattr(list_obj, field, value)
     
-    db.commit()
+    list_renamed(db, list_obj, old_name, board.project_id)
+    commit_versioned(db, list_obj)
     db.refresh(list_obj)
     
+    notify(notifier.notify_list_updated, board.project_id, entity_state(list_obj), current_user.id)
+    
     return list_obj
 
 @router.put("/lists/{list_id}/position", response_model=ListSchema)
 def update_list_position(
     list_id: int,
     position_update: ListPositionUpdate,
+    if_match: Optional[str] = Header(None),
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
-    """更新列表位置"""
+    """更新列表位置（If-Match 或 version_id 与当前版本不一致时返回409）"""
     list_obj = db.query(BoardList).filter(BoardList.id == list_id).first()
     if not list_obj:
         raise HTTPException(
@@ -279,6 +285,7 @@ def update_list_position(
     # 检查项目写入权限
     board = db.query(Board).filter(Board.id == list_obj.board_id).first()
     check_project_write_access(board.project_id, current_user.id, db)
+    check_version(list_obj, if_match, position_update.version_id)
     
     old_position = list_obj.position
     new_position = position_update.position
@@ -304,9 +311,11 @@ def update_list_position(
     # 更新当前列表位置
     list_obj.position = new_position
     
-    db.commit()
+    commit_versioned(db, list_obj)
     db.refresh(list_obj)
     
+    notify(notifier.notify_list_updated, board.project_id, entity_state(list_obj), current_user.id)
+    
     return list_obj
 
 @router.delete("/lists/{list_id}")
@@ -333,6 +342,7 @@ def delete_list(
         BoardList.position > list_obj.position
     ).update({BoardList.position: BoardList.position - 1})
     
+    remove_lists(db, [list_obj], board.project_id)
     db.delete(list_obj)
     db.commit()
     
@@ -1,9 +1,12 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
+from typing import List, Optional
+from datetime import datetime
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, status
 from sqlalchemy.orm import Session
+from app.core.concurrency import check_version, commit_versioned, entity_state
 from app.core.database import get_db
-from app.core.deps import get_current_active_user
+from app.core.deps import get_current_active_user, get_read_db
 from app.models import User, Project, Board, List as BoardList, Card, ProjectMember
+from app.core.counters import adjust_card_counters, adjust_assignee_counter
 from app.schemas import (
     Card as CardSchema,
     CardCreate,
@@ -75,12 +78,9 @@ def create_card(
     # 检查列表访问权限
     list_obj, board = check_list_access(card.list_id, current_user.id, db)
     
-    # 如果没有指定位置，设置为列表中的最后一个位置
+    # 如果没有指定位置，设置为列表中的最后一个位置（使用列表的卡片计数器）
     if card.position == 0:
-        max_position = db.query(Card).filter(
-            Card.list_id == card.list_id
-        ).count()
-        card.position = max_position
+        card.position = list_obj.card_count
     
     # 如果指定了assignee_id，检查该用户是否是项目成员
     if card.assignee_id:
@@ -107,12 +107,12 @@ def create_card(
     )
     
     db.add(db_card)
+    adjust_card_counters(db, list_obj, board.project_id, 1, db_card.assignee_id)
     db.commit()
     db.refresh(db_card)
     
     # 触发WebSocket通知
-    from app.api.websocket import notifier
-    import asyncio
+    from app.api.websocket import notifier, notify
     
     # 准备卡片数据用于WebSocket通知
     card_data = {
@@ -123,16 +123,11 @@ def create_card(
         "list_id": db_card.list_id,
         "creator_id": db_card.creator_id,
         "assignee_id": db_card.assignee_id,
-        "due_date": db_card.due_date.isoformat() if db_card.due_date else None
+        "due_date": db_card.due_date.isoformat() if db_card.due_date else None,
+        "version_id": db_card.version_id
     }
     
-    # 异步发送WebSocket通知
-    try:
-        asyncio.create_task(
-            notifier.notify_card_created(board.project_id, card_data, current_user.id)
-        )
-    except Exception as e:
-        print(f"WebSocket notification error: {e}")
+    notify(notifier.notify_card_created, board.project_id, card_data, current_user.id)
     
     return db_card
 
@@ -140,7 +135,7 @@ def create_card(
 def read_list_cards(
     list_id: int,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """获取列表中的所有卡片"""
     # 检查列表访问权限
@@ -166,11 +161,13 @@ def read_card(
 def update_card(
     card_id: int,
     card_update: CardUpdate,
+    if_match: Optional[str] = Header(None),
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
-    """更新卡片信息"""
+    """更新卡片信息（If-Match 或 version_id 与当前版本不一致时返回409）"""
     card, list_obj, board = check_card_access(card_id, current_user.id, db)
+    check_version(card, if_match, card_update.version_id)
     
     # 如果更新了assignee_id，检查该用户是否是项目成员
     if card_update.assignee_id is not None:
@@ -189,24 +186,34 @@ def update_card(
             card_update.assignee_id = None
     
     # 更新卡片信息
-    update_data = card_update.dict(exclude_unset=True)
+    old_assignee_id = card.assignee_id
+    update_data = card_update.dict(exclude_unset=True, exclude={"version_id"})
     for field, value in update_data.items():
         setattr(card, field, value)
     
-    db.commit()
+    if card.assignee_id != old_assignee_id:
+        adjust_assignee_counter(db, board.project_id, old_assignee_id, -1)
+        adjust_assignee_counter(db, board.project_id, card.assignee_id, 1)
+    
+    commit_versioned(db, card)
     db.refresh(card)
     
+    from app.api.websocket import notifier, notify
+    notify(notifier.notify_card_updated, board.project_id, entity_state(card), current_user.id)
+    
     return card
 
 @router.put("/{card_id}/move", response_model=CardSchema)
 def move_card(
     card_id: int,
     card_move: CardMove,
+    if_match: Optional[str] = Header(None),
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
-    """移动卡片到不同列表或位置"""
+    """移动卡片到不同列表或位置（If-Match 或 version_id 与当前版本不一致时返回409）"""
     card, old_list, old_board = check_card_access(card_id, current_user.id, db)
+    check_version(card, if_match, card_move.version_id)
     
     # 检查目标列表访问权限
     new_list, new_board = check_list_access(card_move.list_id, current_user.id, db)
@@ -254,25 +261,34 @@ def move_card(
             Card.list_id == new_list_id,
             Card.position >= new_position
         ).update({Card.position: Card.position + 1})
+        
+        # 更新计数器（同一项目内移动，分配关系不变）
+        adjust_card_counters(db, old_list, old_board.project_id, -1)
+        adjust_card_counters(db, new_list, new_board.project_id, 1)
     
     # 更新卡片的列表和位置
     card.list_id = new_list_id
     card.position = new_position
     
-    db.commit()
+    commit_versioned(db, card)
     db.refresh(card)
     
+    from app.api.websocket import notifier, notify
+    notify(notifier.notify_card_moved, new_board.project_id, entity_state(card), current_user.id)
+    
     return card
 
 @router.put("/{card_id}/position", response_model=CardSchema)
 def update_card_position(
     card_id: int,
     position_update: CardPositionUpdate,
+    if_match: Optional[str] = Header(None),
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
-    """更新卡片在当前列表中的位置"""
+    """更新卡片在当前列表中的位置（If-Match 或 version_id 与当前版本不一致时返回409）"""
     card, list_obj, board = check_card_access(card_id, current_user.id, db)
+    check_version(card, if_match, position_update.version_id)
     
     old_position = card.position
     new_position = position_update.position
@@ -298,9 +314,12 @@ def update_card_position(
     # 更新当前卡片位置
     card.position = new_position
     
-    db.commit()
+    commit_versioned(db, card)
     db.refresh(card)
     
+    from app.api.websocket import notifier, notify
+    notify(notifier.notify_card_moved, board.project_id, entity_state(card), current_user.id)
+    
     return card
 
 @router.put("/{card_id}/assign", response_model=CardSchema)
@@ -326,6 +345,10 @@ def assign_card(
                 detail="Assignee is not a member of this project"
             )
     
+    if card.assignee_id != assignment.assignee_id:
+        adjust_assignee_counter(db, board.project_id, card.assignee_id, -1)
+        adjust_assignee_counter(db, board.project_id, assignment.assignee_id, 1)
+    
     card.assignee_id = assignment.assignee_id
     
     db.commit()
@@ -348,31 +371,57 @@ def delete_card(
         Card.position > card.position
     ).update({Card.position: Card.position - 1})
     
+    adjust_card_counters(db, list_obj, board.project_id, -1, card.assignee_id)
     db.delete(card)
     db.commit()
     
     return {"message": "Card deleted successfully"}
 
+def _user_cards_page(
+    query,
+    project_id: Optional[int],
+    due_from: Optional[datetime],
+    due_to: Optional[datetime],
+    before_id: Optional[int],
+    limit: int
+):
+    """按项目/截止日期过滤，并按 id 倒序做键集分页（下一页传入本页最后一张卡片的 id）"""
+    if project_id is not None:
+        query = query.join(BoardList, BoardList.id == Card.list_id).join(
+            Board, Board.id == BoardList.board_id
+        ).filter(Board.project_id == project_id)
+    if due_from is not None:
+        query = query.filter(Card.due_date >= due_from)
+    if due_to is not None:
+        query = query.filter(Card.due_date <= due_to)
+    if before_id is not None:
+        query = query.filter(Card.id < before_id)
+    return query.order_by(Card.id.desc()).limit(limit).all()
+
 @router.get("/user/assigned", response_model=List[CardSchema])
 def read_user_assigned_cards(
+    project_id: Optional[int] = None,
+    due_from: Optional[datetime] = None,
+    due_to: Optional[datetime] = None,
+    before_id: Optional[int] = None,
+    limit: int = Query(50, ge=1, le=200),
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
-    """获取分配给当前用户的所有卡片"""
-    cards = db.query(Card).filter(
-        Card.assignee_id == current_user.id
-    ).all()
-    
-    return cards
+    """获取分配给当前用户的卡片（分页）"""
+    query = db.query(Card).filter(Card.assignee_id == current_user.id)
+    return _user_cards_page(query, project_id, due_from, due_to, before_id, limit)
 
 @router.get("/user/created", response_model=List[CardSchema])
 def read_user_created_cards(
+    project_id: Optional[int] = None,
+    due_from: Optional[datetime] = None,
+    due_to: Optional[datetime] = None,
+    before_id: Optional[int] = None,
+    limit: int = Query(50, ge=1, le=200),
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
-    """获取当前用户创建的所有卡片"""
-    cards = db.query(Card).filter(
-        Card.creator_id == current_user.id
-    ).all()
-    
-    return cards
\ No newline at end of file
+    """获取当前用户创建的卡片（分页）"""
+    query = db.query(Card).filter(Card.creator_id == current_user.id)
+    return _user_cards_page(query, project_id, due_from, due_to, before_id, limit)
@@ -1,8 +1,10 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
+from typing import List, Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, status
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
+from app.core.concurrency import check_version, commit_versioned, entity_state
 from app.core.database import get_db
-from app.core.deps import get_current_active_user
+from app.core.deps import get_current_active_user, get_read_db
 from app.models import User, Project, ProjectMember, Board
 from app.schemas import (
     Project as ProjectSchema,
@@ -58,7 +60,7 @@ def read_projects(
     skip: int = 0,
     limit: int = 100,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """获取用户参与的所有项目"""
     projects = db.query(Project).join(ProjectMember).filter(
@@ -71,7 +73,7 @@ def read_projects(
 def read_project(
     project_id: int,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """获取项目详情"""
     # 检查用户是否是项目成员
@@ -99,10 +101,11 @@ def read_project(
 def update_project(
     project_id: int,
     project_update: ProjectUpdate,
+    if_match: Optional[str] = Header(None),
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
-    """更新项目信息"""
+    """更新项目信息（If-Match 或 version_id 与当前版本不一致时返回409）"""
     # 检查用户是否有权限（owner或admin）
     member = db.query(ProjectMember).filter(
         ProjectMember.project_id == project_id,
@@ -123,12 +126,14 @@ def update_project(
             detail="Project not found"
         )
     
+    check_version(project, if_match, project_update.version_id)
+    
     # 更新项目信息
-    update_data = project_update.dict(exclude_unset=True)
+    update_data = project_update.dict(exclude_unset=True, exclude={"version_id"})
     for field, value in update_data.items():
         setattr(project, field, value)
     
-    db.commit()
+    commit_versioned(db, project)
     db.refresh(project)
     
     return project
@@ -212,19 +217,7 @@ def add_project_member(
             detail="User not found"
         )
     
-    # 检查用户是否已经是项目成员
-    existing_member = db.query(ProjectMember).filter(
-        ProjectMember.project_id == project_id,
-        ProjectMember.user_id == member_data.user_id
-    ).first()
-    
-    if existing_member:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="User is already a member of this project"
-        )
-    
-    # 添加新成员
+    # 添加新成员（重复添加由唯一索引 uq_project_members_project_user 拒绝，并发请求也不会插入两条）
     db_member = ProjectMember(
         project_id=project_id,
         user_id=member_data.user_id,
@@ -232,7 +225,14 @@ def add_project_member(
     )
     
     db.add(db_member)
-    db.commit()
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="User is already a member of this project"
+        )
     db.refresh(db_member)
     
     return db_member
@@ -6,6 +6,7 @@ from app.core.auth import verify_token
 from app.models import User
 import json
 import asyncio
+import anyio.from_thread
 from typing import Optional
 
 router = APIRouter()
@@ -185,4 +186,11 @@ class WebSocketNotifier:
         await WebSocketService.handle_board_update(project_id, board_data, user_id)
 
 # 导出通知器实例
-notifier = WebSocketNotifier()
\ No newline at end of file
+notifier = WebSocketNotifier()
+
+def notify(notification, *args):
+    """在同步接口中发送WebSocket通知（接口在线程池中执行，回到事件循环发送），失败不影响接口响应"""
+    try:
+        anyio.from_thread.run(notification, *args)
+    except Exception as e:
+        print(f"WebSocket notification error: {e}")
@@ -0,0 +1,76 @@
+"""
+乐观并发控制
+
+Project、List、Card 的 version_id 是 SQLAlchemy 的 version_id_col：ORM 每次更新时加1，
+并在 UPDATE 中检查读取时的版本，并发修改同一行时后提交的请求得到 StaleDataError。
+接口接受 If-Match 请求头或请求体中的 version_id，版本不一致时返回409和实体的当前状态。
+"""
+
+from typing import Any, Dict, Optional, Set
+
+from fastapi import HTTPException, status
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import inspect
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.exc import StaleDataError
+
+
+def parse_if_match(if_match: Optional[str]) -> Optional[Set[int]]:
+    """If-Match 中的版本号（"3"、W/"3"，可逗号分隔多个）；未提供或为 * 时返回 None"""
+    if not if_match or if_match.strip() == "*":
+        return None
+    versions = set()
+    for tag in if_match.split(","):
+        tag = tag.strip()
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        try:
+            versions.add(int(tag.strip('"')))
+        except ValueError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="If-Match must contain the entity version_id"
+            )
+    return versions
+
+
+def entity_state(obj) -> Dict[str, Any]:
+    """实体的列值（不含关系）"""
+    return jsonable_encoder({attr.key: getattr(obj, attr.key) for attr in inspect(obj).mapper.column_attrs})
+
+
+def version_conflict(obj) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_409_CONFLICT,
+        detail={
+            "message": f"{type(obj).__name__} was modified by another request",
+            "version_id": obj.version_id,
+            "current": entity_state(obj)
+        },
+        headers={"ETag": f'"{obj.version_id}"'}
+    )
+
+
+def check_version(obj, if_match: Optional[str], version_id: Optional[int] = None):
+    """If-Match（优先）或请求体 version_id 与实体当前版本不一致时返回409"""
+    expected = parse_if_match(if_match)
+    if expected is None and version_id is not None:
+        expected = {version_id}
+    if expected is not None and obj.version_id not in expected:
+        raise version_conflict(obj)
+
+
+def commit_versioned(db: Session, obj):
+    """提交；实体在读取之后被其他请求修改时回滚并返回409，已被删除时返回404"""
+    model, obj_id = type(obj), obj.id
+    try:
+        db.commit()
+    except StaleDataError:
+        db.rollback()
+        current = db.query(model).filter(model.id == obj_id).populate_existing().first()
+        if current is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"{model.__name__} not found"
+            )
+        raise version_conflict(current)
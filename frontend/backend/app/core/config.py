@@ -22,6 +22,20 @@ class Settings(BaseSettings):
     DATABASE_PASSWORD: str = "123456"
     DATABASE_NAME: str = "test"
     
+    # Connection pool settings (per process)
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30  # seconds to wait for a free connection before failing with 503
+    DB_POOL_RECYCLE: int = 300
+    DB_POOL_USE_LIFO: bool = False
+    DB_POOL_WARMUP: int = 0  # connections opened at startup (capped at DB_POOL_SIZE)
+    
+    # Read replicas used by read-only endpoints, as a JSON list (empty: everything goes to DATABASE_URL)
+    DATABASE_REPLICA_URLS: List[str] = []
+    REPLICA_STICKY_SECONDS: float = 5  # reads go to the primary for this long after a user's write
+    REPLICA_MAX_LAG_SECONDS: float = 5  # replicas further behind than this are skipped
+    REPLICA_LAG_CHECK_INTERVAL: float = 5  # minimum seconds between lag checks per connection
+    
     # JWT settings
     SECRET_KEY: str = "your-secret-key-here-change-in-production"
     ALGORITHM: str = "HS256"
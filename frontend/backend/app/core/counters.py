@@ -0,0 +1,159 @@
+from typing import Dict, Iterable, Optional
+from sqlalchemy import case, func
+from sqlalchemy.orm import Session
+from app.models import Project, ProjectMember, Board, List as BoardList, Card
+
+# 视为"已完成"的列表名称
+DONE_LIST_NAMES = ("已完成", "Done", "完成")
+
+
+def is_done_list(name: Optional[str]) -> bool:
+    """判断列表是否为"已完成"列表"""
+    return name in DONE_LIST_NAMES
+
+
+def adjust_card_counters(
+    db: Session,
+    list_obj: BoardList,
+    project_id: int,
+    delta: int,
+    assignee_id: Optional[int] = None
+):
+    """
+    卡片加入(delta=1)或离开(delta=-1)列表时更新计数器
+
+    只发出原子 UPDATE，不提交，随调用方的事务一起提交
+    """
+    db.query(BoardList).filter(BoardList.id == list_obj.id).update(
+        {BoardList.card_count: BoardList.card_count + delta},
+        synchronize_session=False
+    )
+    done_delta = delta if is_done_list(list_obj.name) else 0
+    db.query(Project).filter(Project.id == project_id).update(
+        {
+            Project.card_count: Project.card_count + delta,
+            Project.done_card_count: Project.done_card_count + done_delta
+        },
+        synchronize_session=False
+    )
+    if assignee_id:
+        adjust_assignee_counter(db, project_id, assignee_id, delta)
+
+
+def adjust_assignee_counter(db: Session, project_id: int, user_id: Optional[int], delta: int):
+    """更新成员在项目中被分配的卡片数"""
+    if not user_id:
+        return
+    db.query(ProjectMember).filter(
+        ProjectMember.project_id == project_id,
+        ProjectMember.user_id == user_id
+    ).update(
+        {ProjectMember.assigned_card_count: ProjectMember.assigned_card_count + delta},
+        synchronize_session=False
+    )
+
+
+def list_renamed(db: Session, list_obj: BoardList, old_name: str, project_id: int):
+    """列表改名导致"已完成"状态变化时更新项目已完成数"""
+    was_done = is_done_list(old_name)
+    now_done = is_done_list(list_obj.name)
+    if was_done == now_done:
+        return
+    card_count = list_obj.card_count if now_done else -list_obj.card_count
+    db.query(Project).filter(Project.id == project_id).update(
+        {Project.done_card_count: Project.done_card_count + card_count},
+        synchronize_session=False
+    )
+
+
+def remove_lists(db: Session, lists: Iterable[BoardList], project_id: int):
+    """删除列表（及其卡片）前从项目和成员计数器中减去"""
+    lists = list(lists)
+    if not lists:
+        return
+    total = sum(lst.card_count for lst in lists)
+    done = sum(lst.card_count for lst in lists if is_done_list(lst.name))
+    db.query(Project).filter(Project.id == project_id).update(
+        {
+            Project.card_count: Project.card_count - total,
+            Project.done_card_count: Project.done_card_count - done
+        },
+        synchronize_session=False
+    )
+    assignee_counts = db.query(Card.assignee_id, func.count(Card.id)).filter(
+        Card.list_id.in_([lst.id for lst in lists]),
+        Card.assignee_id.isnot(None)
+    ).group_by(Card.assignee_id).all()
+    for assignee_id, count in assignee_counts:
+        adjust_assignee_counter(db, project_id, assignee_id, -count)
+
+
+def check_counters(db: Session, repair: bool = True) -> Dict[str, int]:
+    """重新计算所有计数器并与存储值比较，repair=True 时修复偏差"""
+    drift = {"lists": 0, "projects": 0, "members": 0}
+
+    # 列表卡片数
+    list_counts = db.query(
+        BoardList.id, BoardList.card_count, func.count(Card.id)
+    ).outerjoin(Card, Card.list_id == BoardList.id).group_by(BoardList.id, BoardList.card_count).all()
+    for list_id, stored, actual in list_counts:
+        if stored != actual:
+            drift["lists"] += 1
+            if repair:
+                db.query(BoardList).filter(BoardList.id == list_id).update(
+                    {BoardList.card_count: actual}, synchronize_session=False
+                )
+
+    # 项目卡片数/已完成数
+    is_done = case((BoardList.name.in_(DONE_LIST_NAMES), 1), else_=0)
+    card_totals = db.query(
+        Board.project_id.label("project_id"),
+        func.count(Card.id).label("total"),
+        func.coalesce(func.sum(is_done), 0).label("done")
+    ).join(BoardList, BoardList.board_id == Board.id).join(
+        Card, Card.list_id == BoardList.id
+    ).group_by(Board.project_id).subquery()
+    project_counts = db.query(
+        Project.id,
+        Project.card_count,
+        Project.done_card_count,
+        func.coalesce(card_totals.c.total, 0),
+        func.coalesce(card_totals.c.done, 0)
+    ).outerjoin(card_totals, card_totals.c.project_id == Project.id).all()
+    for project_id, stored_total, stored_done, total, done in project_counts:
+        if (stored_total, stored_done) != (total, done):
+            drift["projects"] += 1
+            if repair:
+                db.query(Project).filter(Project.id == project_id).update(
+                    {Project.card_count: total, Project.done_card_count: done},
+                    synchronize_session=False
+                )
+
+    # 成员被分配的卡片数
+    assigned = db.query(
+        Board.project_id.label("project_id"),
+        Card.assignee_id.label("user_id"),
+        func.count(Card.id).label("total")
+    ).join(BoardList, BoardList.board_id == Board.id).join(
+        Card, Card.list_id == BoardList.id
+    ).filter(Card.assignee_id.isnot(None)).group_by(Board.project_id, Card.assignee_id).subquery()
+    member_counts = db.query(
+        ProjectMember.id,
+        ProjectMember.assigned_card_count,
+        func.coalesce(assigned.c.total, 0)
+    ).outerjoin(
+        assigned,
+        (assigned.c.project_id == ProjectMember.project_id) & (assigned.c.user_id == ProjectMember.user_id)
+    ).all()
+    for member_id, stored, actual in member_counts:
+        if stored != actual:
+            drift["members"] += 1
+            if repair:
+                db.query(ProjectMember).filter(ProjectMember.id == member_id).update(
+                    {ProjectMember.assigned_card_count: actual}, synchronize_session=False
+                )
+
+    if repair:
+        db.commit()
+
+    return drift
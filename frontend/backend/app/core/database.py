@@ -1,19 +1,164 @@
-from sqlalchemy import create_engine
+import logging
+import threading
+import time
+from sqlalchemy import create_engine, event, exc
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, Session
-from typing import Generator
+from sqlalchemy.pool import QueuePool
+from typing import Dict, Generator
 from .config import settings
+from .replicas import RoutingSession, register_replica, replica_status
+
+logger = logging.getLogger(__name__)
+
+
+class PoolStats:
+    """
+    Connection pool counters (primary and replicas combined): connections in use,
+    checkout wait time and timeouts
+    """
+
+    def __init__(self):
+        self.in_use = 0
+        self.peak_in_use = 0
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self._lock = threading.Lock()
+
+    def record_wait(self, elapsed: float, timed_out: bool = False):
+        with self._lock:
+            self.wait_total += elapsed
+            self.wait_max = max(self.wait_max, elapsed)
+            if timed_out:
+                self.timeouts += 1
+
+    def checked_out(self):
+        with self._lock:
+            self.in_use += 1
+            self.checkouts += 1
+            self.peak_in_use = max(self.peak_in_use, self.in_use)
+
+    def checked_in(self):
+        with self._lock:
+            self.in_use -= 1
+
+    def snapshot(self) -> Dict[str, float]:
+        with self._lock:
+            return {
+                "in_use": self.in_use,
+                "peak_in_use": self.peak_in_use,
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "avg_wait_ms": round(self.wait_total / self.checkouts * 1000, 3) if self.checkouts else 0.0,
+                "max_wait_ms": round(self.wait_max * 1000, 3),
+            }
+
+
+pool_stats = PoolStats()
+
+
+class TimedQueuePool(QueuePool):
+    """
+    QueuePool that records how long each checkout waited for a connection
+    """
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            pool_stats.record_wait(time.perf_counter() - start, timed_out=True)
+            logger.warning(f"Timed out waiting {self.timeout()}s for a database connection: {self.status()}")
+            raise
+        pool_stats.record_wait(time.perf_counter() - start)
+        return connection
+
+
+def _pool_options(database_url: str) -> dict:
+    """
+    Pool sizing for databases that use QueuePool (SQLite in-memory keeps its default pool)
+    """
+    url = make_url(database_url)
+    if url.get_dialect().get_pool_class(url) is not QueuePool:
+        return {}
+    return {
+        "poolclass": TimedQueuePool,
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_use_lifo": settings.DB_POOL_USE_LIFO,
+    }
+
+
+def create_db_engine(database_url: str):
+    """
+    Create an engine with the configured pool and pool usage counters
+    """
+    db_engine = create_engine(
+        database_url,
+        pool_pre_ping=True,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        echo=settings.DEBUG,
+        **_pool_options(database_url)
+    )
+    event.listen(db_engine, "checkout", _on_checkout)
+    event.listen(db_engine, "checkin", _on_checkin)
+    return db_engine
+
+
+def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+    pool_stats.checked_out()
+
+
+def _on_checkin(dbapi_connection, connection_record):
+    pool_stats.checked_in()
+
 
 # Create database engine
-engine = create_engine(
-    settings.DATABASE_URL,
-    pool_pre_ping=True,
-    pool_recycle=300,
-    echo=settings.DEBUG
-)
+engine = create_db_engine(settings.DATABASE_URL)
+
+# Read replicas: read-only endpoints route their SELECTs here (see app.core.replicas)
+replica_engines = [create_db_engine(url) for url in settings.DATABASE_REPLICA_URLS]
+for index, replica_engine in enumerate(replica_engines):
+    register_replica(replica_engine, name=str(index))
+
+
+def pool_status() -> dict:
+    """
+    Pool configuration and counters, reported by /health
+    """
+    status = {"status": engine.pool.status(), **pool_stats.snapshot()}
+    if isinstance(engine.pool, QueuePool):
+        status["size"] = engine.pool.size()
+        status["overflow"] = engine.pool.overflow()
+    if replica_engines:
+        status["replicas"] = replica_status()
+    return status
+
+
+def warm_up_pool(connections: int) -> int:
+    """
+    Open up to `connections` connections (capped at the pool size) so the first
+    burst of requests does not pay for connection setup; returns how many were opened
+    """
+    if isinstance(engine.pool, QueuePool):
+        connections = min(connections, engine.pool.size())
+    opened = []
+    try:
+        for _ in range(connections):
+            opened.append(engine.connect())
+    except exc.SQLAlchemyError as e:
+        logger.warning(f"Database pool warm-up failed after {len(opened)} connections: {e}")
+    finally:
+        for connection in opened:
+            connection.close()
+    return len(opened)
 
 # Create SessionLocal class
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+SessionLocal = sessionmaker(class_=RoutingSession, autocommit=False, autoflush=False, bind=engine)
 
 # Create Base class for models
 Base = declarative_base()
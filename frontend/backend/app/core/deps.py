@@ -3,6 +3,7 @@ from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
 from .database import get_db
+from .replicas import use_replica
 from .auth import verify_token
 from app.models import User
 from app.schemas import TokenData
@@ -37,6 +38,8 @@ def get_current_user(
             headers={"WWW-Authenticate": "Bearer"},
         )
     
+    # 记录会话所属用户，写入后该用户的读请求在一段时间内走主库
+    db.info["user_id"] = user.id
     return user
 
 def get_current_active_user(current_user: User = Depends(get_current_user)) -> User:
@@ -48,6 +51,14 @@ def get_current_active_user(current_user: User = Depends(get_current_user)) -> U
         )
     return current_user
 
+def get_read_db(
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+) -> Session:
+    """只读接口的数据库会话：配置了只读副本时查询发送到副本（与 get_current_user 共用同一个会话）"""
+    use_replica(db, current_user.id)
+    return db
+
 def get_optional_current_user(
     db: Session = Depends(get_db),
     credentials: Optional[HTTPAuthorizationCredentials] = Depends(security)
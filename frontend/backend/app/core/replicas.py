@@ -0,0 +1,174 @@
+"""
+只读副本路由
+
+配置 DATABASE_REPLICA_URLS 后，依赖 get_read_db 的只读接口把查询发送到副本：
+- 用户提交写入后 REPLICA_STICKY_SECONDS 秒内，该用户的读请求走主库（粘滞标记保存在进程内，
+  多 worker 部署时只对处理写入的 worker 生效）；
+- 每个副本连接取出时（最多每 REPLICA_LAG_CHECK_INTERVAL 秒一次）测量复制延迟，
+  延迟超过 REPLICA_MAX_LAG_SECONDS 或连接失败的副本暂停使用，没有可用副本时回到主库。
+"""
+
+import logging
+import math
+import random
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import Select
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Replica:
+    name: str
+    engine: Engine
+    lag: float = 0.0  # 最近一次测量的复制延迟（秒），连接失败或复制中断时为 inf
+    checked_at: float = 0.0
+
+    def available(self) -> bool:
+        # 延迟过大的副本在下一个检查周期后重新尝试
+        if self.lag <= settings.REPLICA_MAX_LAG_SECONDS:
+            return True
+        return time.monotonic() - self.checked_at >= settings.REPLICA_LAG_CHECK_INTERVAL
+
+
+_replicas: List[Replica] = []
+_sticky_until: Dict[int, float] = {}  # user_id -> 粘滞到期时间
+_lock = threading.Lock()
+
+
+def _measure_lag(dbapi_connection, dialect_name: str) -> float:
+    """查询副本的复制延迟（秒）；不是副本或不支持的数据库（如 SQLite）返回0，复制中断返回 inf"""
+    cursor = dbapi_connection.cursor()
+    try:
+        if dialect_name == "mysql":
+            try:
+                cursor.execute("SHOW REPLICA STATUS")
+            except Exception:
+                cursor.execute("SHOW SLAVE STATUS")  # MySQL 8.0.22 之前及 MariaDB
+            row = cursor.fetchone()
+            if row is None:
+                return 0.0
+            status = dict(zip([column[0] for column in cursor.description], row))
+            lag = status.get("Seconds_Behind_Source", status.get("Seconds_Behind_Master"))
+            return math.inf if lag is None else float(lag)
+        if dialect_name == "postgresql":
+            cursor.execute(
+                "SELECT CASE WHEN pg_is_in_recovery() "
+                "THEN COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) ELSE 0 END"
+            )
+            return float(cursor.fetchone()[0])
+        return 0.0
+    finally:
+        cursor.close()
+
+
+def register_replica(engine: Engine, name: str):
+    """登记副本引擎：连接取出时测量延迟，连接失败时暂停使用"""
+    replica = Replica(name=name, engine=engine)
+
+    @event.listens_for(engine, "checkout")
+    def _check_lag(dbapi_connection, connection_record, connection_proxy):
+        # 延迟按连接记录，同时更新副本最近一次的测量值（用于选择副本）
+        now = time.monotonic()
+        if now - connection_record.info.get("lag_checked_at", 0.0) < settings.REPLICA_LAG_CHECK_INTERVAL:
+            return
+        try:
+            lag = _measure_lag(dbapi_connection, engine.dialect.name)
+        except Exception as e:
+            logger.warning(f"Failed to measure lag of replica {name}: {e}")
+            lag = math.inf
+        connection_record.info["lag_checked_at"] = now
+        connection_record.info["replica_lag"] = lag
+        replica.lag, replica.checked_at = lag, now
+        if lag > settings.REPLICA_MAX_LAG_SECONDS:
+            logger.warning(f"Replica {name} is {lag}s behind, reading from the primary")
+
+    @event.listens_for(engine, "handle_error")
+    def _on_error(exception_context):
+        if exception_context.is_disconnect or exception_context.connection is None:
+            replica.lag, replica.checked_at = math.inf, time.monotonic()
+
+    with _lock:
+        _replicas.append(replica)
+
+
+def replica_status() -> List[dict]:
+    """各副本最近一次测量的延迟和是否可用（/health 使用）"""
+    return [
+        {"name": replica.name, "lag": None if replica.lag == math.inf else replica.lag, "available": replica.available()}
+        for replica in _replicas
+    ]
+
+
+def _choose_replica() -> Optional[Replica]:
+    candidates = [replica for replica in _replicas if replica.available()]
+    return random.choice(candidates) if candidates else None
+
+
+class RoutingSession(Session):
+    """
+    按语句选择引擎的会话
+
+    只有 info["use_replica"] 为真（由 get_read_db 设置）的会话才会把普通 SELECT 发送到副本，
+    一个会话内固定使用同一个副本；flush、SELECT ... FOR UPDATE 以及会话写入之后的查询都走主库。
+    """
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if (
+            self.info.get("use_replica")
+            and not self._flushing
+            and isinstance(clause, Select)
+            and clause._for_update_arg is None
+        ):
+            replica = self.info.get("replica")
+            if replica is None or not replica.available():
+                replica = self.info["replica"] = _choose_replica()
+            if replica is not None:
+                return replica.engine
+        return super().get_bind(mapper=mapper, clause=clause, **kw)
+
+
+def use_replica(db: Session, user_id: int):
+    """允许会话的只读查询使用副本（用户最近有写入时仍走主库）"""
+    if not _replicas:
+        return
+    if _sticky_until.get(user_id, 0.0) > time.monotonic():
+        return
+    db.info["use_replica"] = True
+
+
+@event.listens_for(Session, "after_flush")
+def _record_write(session: Session, flush_context):
+    # 写入之后同一会话的查询都走主库
+    session.info["replica_wrote"] = True
+    session.info.pop("use_replica", None)
+
+
+@event.listens_for(Session, "after_commit")
+def _stick_to_primary(session: Session):
+    if not session.info.pop("replica_wrote", False) or not _replicas:
+        return
+    user_id = session.info.get("user_id")
+    if user_id is None:
+        return
+    now = time.monotonic()
+    with _lock:
+        _sticky_until[user_id] = now + settings.REPLICA_STICKY_SECONDS
+        # 顺便清理已过期的标记
+        if len(_sticky_until) > 10000:
+            for expired in [uid for uid, until in _sticky_until.items() if until <= now]:
+                del _sticky_until[expired]
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_write(session: Session):
+    session.info.pop("replica_wrote", None)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.core.database import Base
@@ -9,7 +9,7 @@ class Board(Base):
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(100), nullable=False)
     description = Column(Text, nullable=True)
-    project_id = Column(Integer, ForeignKey("projects.id"), nullable=False)
+    project_id = Column(Integer, ForeignKey("projects.id"), nullable=False, index=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
     
@@ -27,6 +27,8 @@ class List(Base):
     name = Column(String(100), nullable=False)
     position = Column(Integer, nullable=False, default=0)
     board_id = Column(Integer, ForeignKey("boards.id"), nullable=False)
+    card_count = Column(Integer, nullable=False, default=0, server_default="0")  # maintained by app.core.counters
+    version_id = Column(Integer, nullable=False, server_default="1")  # row version (optimistic concurrency)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
     
@@ -34,5 +36,10 @@ class List(Base):
     board = relationship("Board", back_populates="lists")
     cards = relationship("Card", back_populates="list", cascade="all, delete-orphan", order_by="Card.position")
     
+    __table_args__ = (
+        Index("ix_lists_board_position", "board_id", "position"),
+    )
+    __mapper_args__ = {"version_id_col": version_id}
+    
     def __repr__(self):
         return f"<List(id={self.id}, name='{self.name}', board_id={self.board_id}, position={self.position})>"
\ No newline at end of file
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, Enum
+from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, Enum, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.core.database import Base
@@ -19,6 +19,7 @@ class Card(Base):
     position = Column(Integer, nullable=False, default=0)
     priority = Column(Enum(Priority), default=Priority.MEDIUM)
     due_date = Column(DateTime(timezone=True), nullable=True)
+    version_id = Column(Integer, nullable=False, server_default="1")  # row version (optimistic concurrency)
     
     # Foreign Keys
     list_id = Column(Integer, ForeignKey("lists.id"), nullable=False)
@@ -34,5 +35,14 @@ class Card(Base):
     creator = relationship("User", back_populates="created_cards", foreign_keys=[creator_id])
     assignee = relationship("User", back_populates="assigned_cards", foreign_keys=[assignee_id])
     
+    __table_args__ = (
+        # Composite indexes for the per-user card views (keyset paginated on id)
+        Index("ix_cards_assignee_id_id", "assignee_id", "id"),
+        Index("ix_cards_assignee_due", "assignee_id", "due_date"),
+        Index("ix_cards_creator_id_id", "creator_id", "id"),
+        Index("ix_cards_list_position", "list_id", "position"),
+    )
+    __mapper_args__ = {"version_id_col": version_id}
+    
     def __repr__(self):
         return f"<Card(id={self.id}, title='{self.title}', list_id={self.list_id}, position={self.position})>"
\ No newline at end of file
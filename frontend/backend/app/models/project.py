@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.core.database import Base
@@ -10,6 +10,11 @@ class Project(Base):
     name = Column(String(100), nullable=False)
     description = Column(Text, nullable=True)
     owner_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    # Counters maintained by app.core.counters
+    card_count = Column(Integer, nullable=False, default=0, server_default="0")
+    done_card_count = Column(Integer, nullable=False, default=0, server_default="0")
+    # Row version for optimistic concurrency (app.core.concurrency)
+    version_id = Column(Integer, nullable=False, server_default="1")
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
     
@@ -18,6 +23,8 @@ class Project(Base):
     boards = relationship("Board", back_populates="project", cascade="all, delete-orphan")
     members = relationship("ProjectMember", back_populates="project", cascade="all, delete-orphan")
     
+    __mapper_args__ = {"version_id_col": version_id}
+    
     def __repr__(self):
         return f"<Project(id={self.id}, name='{self.name}', owner_id={self.owner_id})>"
 
@@ -28,11 +35,19 @@ class ProjectMember(Base):
     project_id = Column(Integer, ForeignKey("projects.id"), nullable=False)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     role = Column(String(20), default="member")  # owner, admin, member
+    assigned_card_count = Column(Integer, nullable=False, default=0, server_default="0")
     joined_at = Column(DateTime(timezone=True), server_default=func.now())
     
     # Relationships
     project = relationship("Project", back_populates="members")
     user = relationship("User", back_populates="project_memberships")
     
+    __table_args__ = (
+        # One membership per user and project; also serves the per-project permission checks
+        Index("uq_project_members_project_user", "project_id", "user_id", unique=True),
+        # Projects a user belongs to
+        Index("ix_project_members_user_project", "user_id", "project_id"),
+    )
+    
     def __repr__(self):
         return f"<ProjectMember(project_id={self.project_id}, user_id={self.user_id}, role='{self.role}')>"
\ No newline at end of file
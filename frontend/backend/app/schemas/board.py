@@ -41,11 +41,14 @@ class ListCreate(ListBase):
 class ListUpdate(BaseModel):
     name: Optional[str] = Field(None, min_length=1, max_length=100)
     position: Optional[int] = Field(None, ge=0)
+    version_id: Optional[int] = None  # 读取时的版本号，不一致时返回409（也可以用 If-Match 请求头）
 
 # List Response Schema
 class List(ListBase):
     id: int
     board_id: int
+    card_count: int = 0
+    version_id: int = 1
     created_at: datetime
     updated_at: datetime
     board: Optional[Board] = None
@@ -56,6 +59,7 @@ class List(ListBase):
 # List Position Update Schema
 class ListPositionUpdate(BaseModel):
     position: int = Field(..., ge=0)
+    version_id: Optional[int] = None
 
 # Board with Lists Schema
 class BoardWithLists(Board):
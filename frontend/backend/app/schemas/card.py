@@ -26,6 +26,7 @@ class CardUpdate(BaseModel):
     priority: Optional[Priority] = None
     due_date: Optional[datetime] = None
     assignee_id: Optional[int] = None
+    version_id: Optional[int] = None  # 读取时的版本号，不一致时返回409（也可以用 If-Match 请求头）
 
 # Card Response Schema
 class Card(CardBase):
@@ -33,6 +34,7 @@ class Card(CardBase):
     list_id: int
     creator_id: int
     assignee_id: Optional[int] = None
+    version_id: int = 1
     created_at: datetime
     updated_at: datetime
     creator: Optional[User] = None
@@ -46,10 +48,12 @@ class Card(CardBase):
 class CardMove(BaseModel):
     list_id: int
     position: int = Field(..., ge=0)
+    version_id: Optional[int] = None
 
 # Card Position Update Schema
 class CardPositionUpdate(BaseModel):
     position: int = Field(..., ge=0)
+    version_id: Optional[int] = None
 
 # Card Assignment Schema
 class CardAssignment(BaseModel):
@@ -16,11 +16,15 @@ class ProjectCreate(ProjectBase):
 class ProjectUpdate(BaseModel):
     name: Optional[str] = Field(None, min_length=1, max_length=100)
     description: Optional[str] = None
+    version_id: Optional[int] = None  # 读取时的版本号，不一致时返回409（也可以用 If-Match 请求头）
 
 # Project Response Schema
 class Project(ProjectBase):
     id: int
     owner_id: int
+    card_count: int = 0
+    done_card_count: int = 0
+    version_id: int = 1
     created_at: datetime
     updated_at: datetime
     owner: Optional[User] = None
@@ -42,6 +46,7 @@ class ProjectMember(ProjectMemberBase):
     id: int
     project_id: int
     user_id: int
+    assigned_card_count: int = 0
     joined_at: datetime
     user: Optional[User] = None
     
@@ -0,0 +1,31 @@
+#!/usr/bin/env python3
+"""
+卡片计数器一致性检查脚本
+
+重新计算列表、项目和成员的卡片计数并与存储值比较，默认修复偏差。
+用法:
+    python check_counters.py            # 检查并修复
+    python check_counters.py --dry-run  # 只检查
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.core.database import SessionLocal
+from app.core.counters import check_counters
+
+def main():
+    repair = "--dry-run" not in sys.argv
+
+    with SessionLocal() as session:
+        drift = check_counters(session, repair=repair)
+
+    if any(drift.values()):
+        action = "已修复" if repair else "未修复"
+        print(f"发现计数器偏差（{action}）: 列表 {drift['lists']} 个，项目 {drift['projects']} 个，成员 {drift['members']} 个")
+    else:
+        print("计数器一致")
+
+if __name__ == "__main__":
+    main()
@@ -1,19 +1,35 @@
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request, WebSocket, WebSocketDisconnect
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.orm.exc import StaleDataError
 from app.core.config import settings
-from app.core.database import engine, Base
+from app.core.database import engine, pool_status, replica_engines, warm_up_pool
 from app.api import auth, projects, boards, cards, websocket
 import json
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # The schema is managed by Alembic (`alembic upgrade head`); nothing touches
+    # the database until the first request checks out a connection, unless
+    # DB_POOL_WARMUP asks for connections to be opened up front.
+    if settings.DB_POOL_WARMUP > 0:
+        await run_in_threadpool(warm_up_pool, settings.DB_POOL_WARMUP)
+    yield
+    engine.dispose()
+    for replica_engine in replica_engines:
+        replica_engine.dispose()
+
 
 # Initialize FastAPI app
 app = FastAPI(
     title=settings.APP_NAME,
     version=settings.APP_VERSION,
-    description="A real-time collaborative Kanban board application"
+    description="A real-time collaborative Kanban board application",
+    lifespan=lifespan
 )
 
 # Configure CORS
@@ -25,6 +41,23 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.exception_handler(PoolTimeoutError)
+async def pool_timeout_handler(request: Request, exc: PoolTimeoutError):
+    # Pool exhausted: ask the client to retry instead of failing with a 500
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Database is busy, please retry"},
+        headers={"Retry-After": "1"}
+    )
+
+@app.exception_handler(StaleDataError)
+async def stale_data_handler(request: Request, exc: StaleDataError):
+    # Row version changed between read and commit (see app.core.concurrency)
+    return JSONResponse(
+        status_code=409,
+        content={"detail": "Resource was modified by another request, reload and retry"}
+    )
+
 # Include API routers
 app.include_router(auth.router, prefix="/api/auth", tags=["authentication"])
 app.include_router(projects.router, prefix="/api/projects", tags=["projects"])
@@ -38,7 +71,7 @@ async def root():
 
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy", "version": settings.APP_VERSION}
+    return {"status": "healthy", "version": settings.APP_VERSION, "database_pool": pool_status()}
 
 @app.get("/api")
 async def api_info():